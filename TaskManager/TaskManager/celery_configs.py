@@ -30,6 +30,10 @@ app.conf.beat_schedule = {
         "task": "todolist.tasks.delete_expired_tasks",
         "schedule": crontab(hour="0", minute="0"),  # Каждый день в полночь
     },
+    "reconcile-project-stats": {
+        "task": "todolist.tasks.reconcile_project_stats",
+        "schedule": crontab(hour="0", minute="5"),  # Каждую ночь после полуночи
+    },
     "send-task-reminders": {
         "task": "todolist.tasks.send_task_reminders",
         "schedule": crontab(minute="*"),  # Каждую минуту
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
 import os
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -52,6 +53,9 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    # Сжимает готовый ответ, поэтому стоит раньше остальных
+    "todolist.middleware.CompressionMiddleware",
+    "todolist.middleware.ReplicaRoutingMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -93,6 +97,50 @@ DATABASES = {
     }
 }
 
+# Профиль SQLite для продакшена (несколько воркеров gunicorn и Celery):
+# WAL — чтение не блокирует запись; synchronous=NORMAL в режиме WAL не
+# теряет целостность; транзакции начинаются с BEGIN IMMEDIATE, поэтому
+# писатели ждут друг друга (timeout), а не получают «database is locked»
+# при повышении блокировки. Сравнение: manage.py benchmark_sqlite
+SQLITE_PRODUCTION_OPTIONS = {
+    "init_command": (
+        "PRAGMA journal_mode=WAL;"
+        "PRAGMA synchronous=NORMAL;"
+        "PRAGMA mmap_size=268435456;"  # 256 МБ
+        "PRAGMA cache_size=-65536;"  # 64 МБ на соединение
+        "PRAGMA temp_store=MEMORY;"
+    ),
+    "transaction_mode": "IMMEDIATE",
+    "timeout": 20,  # busy timeout, секунды
+}
+if os.getenv("SQLITE_PRODUCTION", "false").lower() == "true":
+    DATABASES["default"]["OPTIONS"] = SQLITE_PRODUCTION_OPTIONS
+    # PRAGMA выполняются при открытии соединения: соединения переиспользуются
+    DATABASES["default"]["CONN_MAX_AGE"] = 600
+    DATABASES["default"]["CONN_HEALTH_CHECKS"] = True
+
+# Реплики для чтения: имена баз (пути к файлам SQLite) через запятую,
+# остальные параметры — как у default.
+# Пример: DATABASE_REPLICA_NAMES=/data/replica1.sqlite3,/data/replica2.sqlite3
+DATABASE_REPLICAS = []
+for _index, _name in enumerate(
+    filter(None, os.getenv("DATABASE_REPLICA_NAMES", "").split(",")), start=1
+):
+    DATABASES[f"replica_{_index}"] = {
+        **DATABASES["default"],
+        "NAME": _name.strip(),
+        # В тестах реплика — та же база, что и default
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(f"replica_{_index}")
+
+DATABASE_ROUTERS = ["todolist.db_routers.ReplicaRouter"]
+# Сколько секунд после записи клиент читает из основной базы
+REPLICA_PIN_SECONDS = int(os.getenv("REPLICA_PIN_SECONDS", "5"))
+
+# JSON-ответы меньше этого размера не сжимаются (CompressionMiddleware)
+RESPONSE_COMPRESSION_MIN_SIZE = int(os.getenv("RESPONSE_COMPRESSION_MIN_SIZE", "1024"))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -120,10 +168,14 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.AllowAny",
     ],
+    # Browsable API — только для разработки: в продакшене он не нужен,
+    # а для клиентов без Accept: application/json рендерит HTML
     "DEFAULT_RENDERER_CLASSES": [
-        "rest_framework.renderers.JSONRenderer",
-        "rest_framework.renderers.BrowsableAPIRenderer",
+        "todolist.renderers.FastJSONRenderer",
+        *(["rest_framework.renderers.BrowsableAPIRenderer"] if DEBUG else []),
     ],
+    # Курсорная пагинация для всех списков; ?page= — постраничная с count
+    "DEFAULT_PAGINATION_CLASS": "todolist.pagination.KeysetPagination",
 }
 
 
@@ -187,19 +239,44 @@ CELERY_APP = "TaskManager"
 USE_REDIS = os.getenv("USE_REDIS", "false").lower() == "true"
 
 if USE_REDIS:
+    # Локальный LRU процесса перед Redis: горячие ключи читаются без сети,
+    # изменения рассылаются другим процессам через pub/sub
     CACHES = {
         "default": {
+            "BACKEND": "todolist.cache_backends.TwoTierCache",
+            "LOCATION": "default",
+            "OPTIONS": {
+                "REMOTE_ALIAS": "redis",
+                "LOCAL_MAX_ENTRIES": 5000,
+                "LOCAL_TIMEOUT": 5,
+                "LOCK_TIMEOUT": 10,
+                "EARLY_REFRESH_BETA": 1.0,
+                # Счетчики кеша и буфер посещений меняются на каждом запросе
+                "REMOTE_ONLY_PREFIXES": ("cache_stats:", "page_visits:"),
+            },
+        },
+        "redis": {
             "BACKEND": "django_redis.cache.RedisCache",
             "LOCATION": f"redis://{REDIS_HOST}:6379/1",
             "OPTIONS": {
                 "CLIENT_CLASS": "django_redis.client.DefaultClient",
             },
-        }
+        },
     }
 else:
+    # Без Redis кеш должен быть общим для всех воркеров gunicorn
+    # (сессии, буфер посещений, кеш ответов), поэтому не LocMemCache.
+    # Файл по умолчанию — во временном каталоге, а не в исходниках
     CACHES = {
         "default": {
-            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "BACKEND": "todolist.cache_backends.SQLiteCache",
+            "LOCATION": os.getenv(
+                "CACHE_SQLITE_PATH",
+                os.path.join(tempfile.gettempdir(), "taskmanager-cache.sqlite3"),
+            ),
+            "OPTIONS": {
+                "MAX_ENTRIES": 50000,
+            },
         }
     }
 
@@ -0,0 +1,73 @@
+// Ленивые списки выбора: <select data-autocomplete="users|projects|tasks">
+// получает варианты из /api/autocomplete/ по мере ввода, а не все сразу.
+// Уже выбранные варианты и пустой вариант ("Выберите ...") сохраняются.
+(function () {
+    "use strict";
+
+    var DEBOUNCE_MS = 250;
+
+    function replaceOptions(select, items) {
+        Array.prototype.slice.call(select.options).forEach(function (option) {
+            if (!option.selected && option.value !== "") {
+                option.remove();
+            }
+        });
+        var present = {};
+        Array.prototype.forEach.call(select.options, function (option) {
+            present[option.value] = true;
+        });
+        items.forEach(function (item) {
+            if (!present[String(item.id)]) {
+                select.add(new Option(item.label, item.id));
+            }
+        });
+    }
+
+    function setup(select) {
+        var kind = select.dataset.autocomplete;
+        var input = document.createElement("input");
+        input.type = "search";
+        input.className = "form-control form-control-sm mb-1";
+        input.placeholder = select.dataset.autocompletePlaceholder || "Начните вводить";
+        select.parentNode.insertBefore(input, select);
+
+        var timer = null;
+        var loadedQuery = null;
+
+        function load(query) {
+            if (query === loadedQuery) {
+                return;
+            }
+            loadedQuery = query;
+            var params = new URLSearchParams({q: query, type: kind});
+            if (select.dataset.autocompleteLimit) {
+                params.set("limit", select.dataset.autocompleteLimit);
+            }
+            if (select.dataset.autocompleteExcludeProject) {
+                params.set("exclude_project", select.dataset.autocompleteExcludeProject);
+            }
+            fetch(select.dataset.autocompleteUrl + "?" + params.toString(), {
+                credentials: "same-origin",
+                headers: {Accept: "application/json"}
+            })
+                .then(function (response) { return response.json(); })
+                .then(function (data) {
+                    if (query === loadedQuery) {
+                        replaceOptions(select, data[kind] || []);
+                    }
+                });
+        }
+
+        input.addEventListener("input", function () {
+            clearTimeout(timer);
+            timer = setTimeout(function () { load(input.value.trim()); }, DEBOUNCE_MS);
+        });
+        // Первые варианты — при первом обращении к полю
+        input.addEventListener("focus", function () { load(input.value.trim()); });
+        select.addEventListener("focus", function () { load(input.value.trim()); });
+    }
+
+    document.addEventListener("DOMContentLoaded", function () {
+        document.querySelectorAll("select[data-autocomplete]").forEach(setup);
+    });
+})();
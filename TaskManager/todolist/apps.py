@@ -10,3 +10,8 @@ class TodolistConfig(AppConfig):
 
     default_auto_field = "django.db.models.BigAutoField"
     name = "todolist"
+
+    def ready(self):
+        """Подключение обработчиков сигналов"""
+        # pylint: disable=import-outside-toplevel, unused-import
+        from . import signals  # noqa: F401
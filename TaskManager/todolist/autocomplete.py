@@ -0,0 +1,210 @@
+""" Автодополнение по префиксу: пользователи, проекты и задачи """
+
+import hashlib
+from dataclasses import dataclass
+from typing import Callable
+
+from django.core.cache import cache
+from django.db.models import Min
+
+from .caching import normalize_query_params
+from .membership import get_member_project_ids, is_project_member
+from .models import AutocompleteTerm, Project, Task, UserProfile, UserProfileProject
+from .stemming import words
+
+AUTOCOMPLETE_CACHE_KEY = "autocomplete:{user_id}:{digest}"
+AUTOCOMPLETE_CACHE_TIMEOUT = 30  # короткий TTL: сигналы кеш не сбрасывают
+AUTOCOMPLETE_DEFAULT_LIMIT = 10
+AUTOCOMPLETE_MAX_LIMIT = 50
+# Верхняя граница диапазона: любая строка с префиксом p меньше p + MAX_CHAR
+MAX_CHAR = "\U0010ffff"
+
+
+def fold(text):
+    """Нормализованная строка: слова в нижнем регистре через пробел"""
+    return " ".join(words((text or "").casefold().replace("ё", "е")))
+
+
+@dataclass(frozen=True)
+class AutocompleteSource:
+    """Что и как индексируется для одного типа объектов"""
+
+    kind: str
+    model: type
+    term_fields: tuple  # поля, из слов которых строятся термы
+    index_fields: tuple  # поля, изменение которых требует переиндексации
+    get_label: Callable
+    get_project_id: Callable
+    ordering: tuple  # выдача без префикса: первые N по алфавиту
+
+    def terms(self, obj):
+        """Слова полей плюс вся подпись целиком (для запросов из нескольких слов)"""
+        max_length = AutocompleteTerm._meta.get_field("term").max_length
+        terms = {fold(self.get_label(obj))}
+        for field in self.term_fields:
+            terms.update(fold(getattr(obj, field)).split())
+        return {term[:max_length] for term in terms if term}
+
+
+SOURCES = {
+    source.kind: source
+    for source in (
+        AutocompleteSource(
+            "users",
+            UserProfile,
+            ("username", "first_name", "last_name"),
+            ("username", "first_name", "last_name"),
+            lambda user: user.get_full_name() or user.username,
+            lambda user: None,
+            ("username",),
+        ),
+        AutocompleteSource(
+            "projects",
+            Project,
+            ("name",),
+            ("name",),
+            lambda project: project.name,
+            lambda project: project.pk,
+            ("name", "id"),
+        ),
+        AutocompleteSource(
+            "tasks",
+            Task,
+            ("name",),
+            ("name", "project"),
+            lambda task: task.name,
+            lambda task: task.project_id,
+            ("name", "id"),
+        ),
+    )
+}
+SOURCES_BY_MODEL = {source.model: source for source in SOURCES.values()}
+
+
+def _term_rows(source, obj):
+    label = (source.get_label(obj) or "")[
+        : AutocompleteTerm._meta.get_field("label").max_length
+    ]
+    return [
+        AutocompleteTerm(
+            kind=source.kind,
+            object_id=obj.pk,
+            term=term,
+            label=label,
+            project_id=source.get_project_id(obj),
+        )
+        for term in source.terms(obj)
+    ]
+
+
+def index_object(obj, update_fields=None):
+    """Переиндексирует объект; сохранение без индексируемых полей пропускается"""
+    source = SOURCES_BY_MODEL[type(obj)]
+    if update_fields is not None and not set(update_fields) & set(source.index_fields):
+        return
+    remove_object(type(obj), obj.pk)
+    AutocompleteTerm.objects.bulk_create(_term_rows(source, obj))
+
+
+def index_batch(model, objects):
+    """Переиндексирует пакет объектов одной модели: одно удаление и одна вставка"""
+    source = SOURCES_BY_MODEL[model]
+    AutocompleteTerm.objects.filter(
+        kind=source.kind, object_id__in=[obj.pk for obj in objects]
+    ).delete()
+    AutocompleteTerm.objects.bulk_create(
+        [row for obj in objects for row in _term_rows(source, obj)]
+    )
+
+
+def remove_object(model, pk):
+    """Удаляет термы объекта"""
+    AutocompleteTerm.objects.filter(
+        kind=SOURCES_BY_MODEL[model].kind, object_id=pk
+    ).delete()
+
+
+def remove_batch(model, pks):
+    """Удаляет термы пакета объектов одним запросом"""
+    AutocompleteTerm.objects.filter(
+        kind=SOURCES_BY_MODEL[model].kind, object_id__in=list(pks)
+    ).delete()
+
+
+def rebuild_autocomplete(kind, batch_size=1000):
+    """Заново строит термы одного типа; возвращает число объектов"""
+    source = SOURCES[kind]
+    AutocompleteTerm.objects.filter(kind=kind).delete()
+    batch, total = [], 0
+    for obj in source.model._default_manager.iterator(chunk_size=batch_size):
+        batch.extend(_term_rows(source, obj))
+        total += 1
+        if len(batch) >= batch_size:
+            AutocompleteTerm.objects.bulk_create(batch)
+            batch = []
+    AutocompleteTerm.objects.bulk_create(batch)
+    return total
+
+
+def _visible_terms(request, source, exclude_project=None):
+    terms = AutocompleteTerm.objects.filter(kind=source.kind)
+    if source.kind != "users":
+        terms = terms.filter(project_id__in=get_member_project_ids(request))
+    elif exclude_project is not None and is_project_member(request, exclude_project):
+        # Кандидаты в участники: без тех, кто уже в проекте
+        terms = terms.exclude(
+            object_id__in=UserProfileProject.objects.filter(
+                project_id=exclude_project
+            ).values("user_profile_id")
+        )
+    return terms
+
+
+def _first_objects(request, source, limit, exclude_project=None):
+    """Без префикса: первые объекты по алфавиту прямо из исходной таблицы"""
+    queryset = source.model._default_manager.order_by(*source.ordering)
+    if source.kind == "users":
+        if exclude_project is not None and is_project_member(request, exclude_project):
+            queryset = queryset.exclude(userprofileproject__project=exclude_project)
+    elif source.kind == "projects":
+        queryset = queryset.filter(pk__in=get_member_project_ids(request))
+    else:
+        queryset = queryset.filter(project_id__in=get_member_project_ids(request))
+    return [
+        {"id": obj.pk, "label": source.get_label(obj)} for obj in queryset[:limit]
+    ]
+
+
+def find(request, source, query, limit, exclude_project=None):
+    """Top-N объектов типа, у которых одно из слов начинается с query"""
+    prefix = fold(query)
+    if not prefix:
+        return _first_objects(request, source, limit, exclude_project)
+    matches = (
+        _visible_terms(request, source, exclude_project)
+        .filter(term__gte=prefix, term__lt=prefix + MAX_CHAR)
+        .values("object_id", "label")
+        # По совпавшему слову: точное совпадение раньше его продолжений
+        .annotate(best_term=Min("term"))
+        .order_by("best_term", "label", "object_id")[:limit]
+    )
+    return [{"id": row["object_id"], "label": row["label"]} for row in matches]
+
+
+def autocomplete(request, query, kinds, limit, exclude_project=None):
+    """
+    Ответ автодополнения по типам. Кешируется на AUTOCOMPLETE_CACHE_TIMEOUT
+    по пользователю и параметрам запроса
+    """
+    digest = hashlib.md5(
+        normalize_query_params(request.query_params).encode("utf-8")
+    ).hexdigest()
+    key = AUTOCOMPLETE_CACHE_KEY.format(user_id=request.user.pk, digest=digest)
+    return cache.get_or_set(
+        key,
+        lambda: {
+            kind: find(request, SOURCES[kind], query, limit, exclude_project)
+            for kind in kinds
+        },
+        timeout=AUTOCOMPLETE_CACHE_TIMEOUT,
+    )
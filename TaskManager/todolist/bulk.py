@@ -0,0 +1,439 @@
+""" Пакетная запись задач: создание, изменение и удаление массивами """
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .autocomplete import SOURCES_BY_MODEL, index_batch, remove_batch
+from .caching import (
+    batched_invalidation,
+    bump_dashboard_versions,
+    bump_task_generations,
+)
+from .membership import get_member_project_ids
+from .models import Task, UserProfileProject
+from .search import index_objects, search_entry_model, unindex_objects
+from .serializers.todolists import TaskBulkItemSerializer
+from .stats import track_tasks_delete, track_tasks_save
+
+BULK_MAX_ITEMS = 500
+BULK_BATCH_SIZE = 100  # строк в одном INSERT/UPDATE
+RELATION_FIELDS = ("project", "assignee")
+NOT_FOUND_MESSAGE = "Задача не найдена"
+
+
+class BulkResults:
+    """Результаты по элементам пакета в порядке запроса"""
+
+    def __init__(self):
+        self.items = {}
+
+    def error(self, index, errors, pk=None):
+        """Элемент не прошел проверку"""
+        self.items[index] = {
+            "index": index,
+            "id": pk,
+            "status": "error",
+            "errors": errors,
+        }
+
+    def ok(self, index, pk, status):
+        """Элемент записан (created/updated/unchanged/deleted)"""
+        self.items[index] = {"index": index, "id": pk, "status": status}
+
+    def failed(self, index):
+        """Есть ли уже ошибка у элемента"""
+        return index in self.items
+
+    def as_dict(self):
+        """Тело ответа: результаты и число элементов по статусам"""
+        items = [self.items[index] for index in sorted(self.items)]
+        counts = {}
+        for item in items:
+            counts[item["status"]] = counts.get(item["status"], 0) + 1
+        return {"results": items, "counts": counts}
+
+
+def _apply(task, validated_data):
+    """Значения элемента в экземпляр; связи — по id"""
+    for name, value in validated_data.items():
+        if name in RELATION_FIELDS:
+            name = f"{name}_id"
+        setattr(task, name, value)
+
+
+def _condition_applies(condition, task):
+    """
+    Условие частичного ограничения для экземпляра без запроса к базе.
+    Поддерживается то, что встречается в моделях: AND из exact и isnull
+    """
+    if condition is None:
+        return True
+    if condition.connector != Q.AND or condition.negated:
+        raise NotImplementedError(f"Условие ограничения не поддерживается: {condition}")
+    for lookup, expected in condition.children:
+        name, _, lookup_type = lookup.partition("__")
+        value = getattr(task, Task._meta.get_field(name).attname)
+        if lookup_type == "isnull":
+            if (value is None) != expected:
+                return False
+        elif lookup_type in ("", "exact"):
+            if value != expected:
+                return False
+        else:
+            raise NotImplementedError(f"Условие ограничения не поддерживается: {lookup}")
+    return True
+
+
+def _unique_keys(task):
+    """
+    Ключи ограничений уникальности задачи: с NULL ограничение не действует,
+    частичное — только если задача подходит под его условие
+    """
+    keys = []
+    for constraint in Task._unique_constraints():
+        if not _condition_applies(constraint.condition, task):
+            continue
+        values = tuple(
+            getattr(task, Task._meta.get_field(name).attname)
+            for name in constraint.fields
+        )
+        if None not in values:
+            keys.append((constraint, values))
+    return keys
+
+
+def _check_batch(request, candidates, results):
+    """
+    Проверки на весь пакет вместо запросов на каждый элемент:
+    проект — по закешированному членству пользователя, исполнитель —
+    одним запросом к участникам проектов, уникальность — одним запросом
+    к существующим задачам (тех же проектов, исполнителей и без исполнителя). candidates — [(index, задача)] в порядке запроса
+    """
+    member_project_ids = get_member_project_ids(request)
+    project_ids = {task.project_id for _, task in candidates}
+    assignee_ids = {task.assignee_id for _, task in candidates} - {None}
+    memberships = set(
+        UserProfileProject.objects.filter(
+            project_id__in=project_ids, user_profile_id__in=assignee_ids
+        ).values_list("project_id", "user_profile_id")
+    )
+
+    batch_pks = {task.pk for _, task in candidates if task.pk}
+    names = {task.name for _, task in candidates}
+    taken = {}
+    for row in (
+        Task.objects.filter(name__in=names)
+        .filter(
+            Q(project_id__in=project_ids)
+            | Q(assignee_id__in=assignee_ids)
+            | Q(assignee__isnull=True)
+        )
+        .exclude(pk__in=batch_pks)
+        .values_list("pk", "project_id", "assignee_id", "name")
+    ):
+        existing = Task(pk=row[0], project_id=row[1], assignee_id=row[2], name=row[3])
+        for constraint, values in _unique_keys(existing):
+            taken[(constraint.name, values)] = existing.pk
+
+    for index, task in candidates:
+        errors = {}
+        if task.project_id not in member_project_ids:
+            errors["project"] = ["Проект не найден или вы в нем не состоите"]
+        # У изменяемой задачи исполнитель проверяется, только если он или
+        # проект меняются (как и прежде, без проверки при других правках)
+        moved = task.pk is None or set(task.get_dirty_fields()) & set(RELATION_FIELDS)
+        if (
+            task.assignee_id
+            and moved
+            and (task.project_id, task.assignee_id) not in memberships
+        ):
+            errors["assignee"] = ["Исполнитель не состоит в проекте"]
+        keys = _unique_keys(task)
+        owner = task.pk or task  # у новых задач id еще нет
+        for constraint, values in keys:
+            if taken.get((constraint.name, values), owner) != owner:
+                errors.setdefault(constraint.fields[-1], []).append(
+                    constraint.violation_error_message
+                )
+        if errors:
+            results.error(index, errors, task.pk)
+            continue
+        # Следующие элементы пакета не могут занять те же значения
+        for constraint, values in keys:
+            taken[(constraint.name, values)] = owner
+
+
+def _change_reason(task, fields):
+    """Причина изменения, как у TaskViewSet.update"""
+    changes = [
+        f"{name}: {task._loaded_values.get(task._meta.get_field(name).attname)} -> "
+        f"{getattr(task, task._meta.get_field(name).attname)}"
+        for name in fields
+    ]
+    max_length = Task.history.model._meta.get_field(
+        "history_change_reason"
+    ).max_length
+    return "; ".join(changes)[:max_length]
+
+
+def _history_rows(tasks, history_type, user, previous=None):
+    """
+    Исторические записи пакета. Пакетная вставка идет в обход сигнала
+    pre_create_historical_record, поэтому дифф changes считается здесь:
+    относительно значений, загруженных из БД (previous: pk -> снимок)
+    """
+    model = Task.history.model
+    now = timezone.now()
+    rows = []
+    for task in tasks:
+        row = model(
+            history_date=now,
+            history_user=user,
+            history_change_reason=getattr(task, "_change_reason", None),
+            history_type=history_type,
+            **{
+                field.attname: getattr(task, field.attname)
+                for field in model.tracked_fields
+            },
+        )
+        old_row = None
+        if previous is not None:
+            old_row = model(
+                **{
+                    field.attname: previous[task.pk].get(
+                        field.attname, getattr(task, field.attname)
+                    )
+                    for field in model.tracked_fields
+                }
+            )
+        row.changes = row.compute_changes(old_row)
+        rows.append(row)
+    return rows
+
+
+def _after_write(tasks, old_values=None):
+    """
+    Пакетные операции идут в обход post_save: поисковый индекс, термы
+    автодополнения и кеши обновляются здесь — по разу на пакет.
+    old_values — снимки измененных задач до записи (pk -> значения)
+    """
+    old_values = old_values or {}
+    entry_model = search_entry_model(Task)
+    text_fields = {entry_model.title_field, entry_model.body_field}
+    index_fields = set(SOURCES_BY_MODEL[Task].index_fields)
+    changed = {task.pk: set(getattr(task, "_bulk_fields", ())) for task in tasks}
+
+    def needs(task, fields):
+        return task.pk not in old_values or changed[task.pk] & fields
+
+    index_objects(
+        Task, [task for task in tasks if needs(task, text_fields)], connection
+    )
+    reindex = [task for task in tasks if needs(task, index_fields)]
+    if reindex:
+        index_batch(Task, reindex)
+    _invalidate(tasks, old_values.values())
+
+
+def _invalidate(tasks, old_values=()):
+    """Сброс кешей проектов и дашбордов затронутых пользователей одним проходом"""
+    project_ids = {task.project_id for task in tasks}
+    user_ids = {task.assignee_id for task in tasks}
+    for values in old_values:
+        project_ids.add(values.get("project_id"))
+        user_ids.add(values.get("assignee_id"))
+    project_ids.discard(None)
+    bump_task_generations(*project_ids)
+    bump_dashboard_versions(
+        [
+            *user_ids,
+            *UserProfileProject.objects.filter(project_id__in=project_ids).values_list(
+                "user_profile_id", flat=True
+            ),
+        ]
+    )
+
+
+def bulk_create_tasks(request, items):
+    """Создание задач пакетом: одна транзакция, bulk_create и история пакетом"""
+    results = BulkResults()
+    candidates = []
+    for index, item in enumerate(items):
+        serializer = TaskBulkItemSerializer(data=item)
+        if not serializer.is_valid():
+            results.error(index, serializer.errors)
+            continue
+        task = Task()
+        _apply(task, serializer.validated_data)
+        candidates.append((index, task))
+    _check_batch(request, candidates, results)
+    tasks = [(index, task) for index, task in candidates if not results.failed(index)]
+    if not tasks:
+        return results
+
+    objects = [task for _, task in tasks]
+    with Task.unique_violations():
+        Task.objects.bulk_create(objects, batch_size=BULK_BATCH_SIZE)
+        Task.history.model.objects.bulk_create(
+            _history_rows(objects, "+", request.user), batch_size=BULK_BATCH_SIZE
+        )
+        track_tasks_save(objects, created=True)
+    for task in objects:
+        task._remember_saved_values()  # pylint: disable=protected-access
+    _after_write(objects)
+    for index, task in tasks:
+        results.ok(index, task.pk, "created")
+    return results
+
+
+def _load_tasks(request, items, results, queryset=None):
+    """
+    Задачи пакета одним запросом (только из проектов пользователя).
+    Возвращает [(index, задача, элемент)]; повторный id — ошибка элемента
+    """
+    if queryset is None:
+        queryset = Task.objects.all()
+    ids = {}
+    for index, item in enumerate(items):
+        pk = item.get("id") if isinstance(item, dict) else item
+        if not isinstance(pk, int) or isinstance(pk, bool):
+            results.error(index, {"id": ["Нужен целочисленный id задачи"]})
+        elif pk in ids.values():
+            results.error(index, {"id": ["Задача повторяется в пакете"]}, pk)
+        else:
+            ids[index] = pk
+    found = queryset.filter(
+        pk__in=ids.values(), project_id__in=get_member_project_ids(request)
+    ).in_bulk()
+    loaded = []
+    for index, pk in ids.items():
+        if pk not in found:
+            results.error(index, {"id": [NOT_FOUND_MESSAGE]}, pk)
+        else:
+            loaded.append((index, found[pk], items[index]))
+    return loaded
+
+
+def bulk_update_tasks(request, items):
+    """
+    Частичное изменение задач пакетом: пишутся только измененные поля
+    (bulk_update одним набором столбцов), неизмененные задачи не трогаются
+    """
+    # pylint: disable=protected-access
+    results = BulkResults()
+    candidates = []
+    for index, task, item in _load_tasks(request, items, results):
+        if not isinstance(item, dict):
+            results.error(index, {"id": ["Ожидается объект с полями задачи"]}, task.pk)
+            continue
+        data = {name: value for name, value in item.items() if name != "id"}
+        serializer = TaskBulkItemSerializer(task, data=data, partial=True)
+        if not serializer.is_valid():
+            results.error(index, serializer.errors, task.pk)
+            continue
+        _apply(task, serializer.validated_data)
+        candidates.append((index, task))
+    _check_batch(request, candidates, results)
+
+    tasks, fields = [], set()
+    for index, task in candidates:
+        if results.failed(index):
+            continue
+        dirty = task.get_dirty_fields()
+        if not dirty:
+            results.ok(index, task.pk, "unchanged")
+            continue
+        task._bulk_fields = dirty
+        task._change_reason = _change_reason(task, dirty)
+        task.updated_at = timezone.now().date()
+        fields.update(dirty)
+        tasks.append((index, task))
+    if not tasks:
+        return results
+
+    objects = [task for _, task in tasks]
+    old_values = {task.pk: dict(task._loaded_values) for task in objects}
+    with Task.unique_violations():
+        Task.objects.bulk_update(
+            objects, [*fields, "updated_at"], batch_size=BULK_BATCH_SIZE
+        )
+        Task.history.model.objects.bulk_create(
+            _history_rows(objects, "~", request.user, old_values),
+            batch_size=BULK_BATCH_SIZE,
+        )
+        track_tasks_save(objects, created=False)
+    for task in objects:
+        task._remember_saved_values([*fields, "updated_at"])
+    _after_write(objects, old_values)
+    for index, task in tasks:
+        results.ok(index, task.pk, "updated")
+    return results
+
+
+def bulk_delete_tasks(request, ids):
+    """
+    Удаление задач пакетом одним QuerySet.delete() в транзакции.
+    Каскад и исторические записи — как обычно, а счетчики, поисковый
+    индекс, автодополнение и кеши обновляются здесь по разу на пакет
+    (сигналы задач и подзадач такое удаление пропускают)
+    """
+    results = BulkResults()
+    tasks = _load_tasks(request, ids, results)
+    objects = [task for _, task, _ in tasks]
+    if objects:
+        pks = [task.pk for task in objects]
+        queryset = Task.objects.filter(pk__in=pks)
+        queryset.batch_delete = True  # см. signals._deleted_in_batch
+        with batched_invalidation(), transaction.atomic():
+            queryset.delete()
+            track_tasks_delete(objects)
+            unindex_objects(Task, pks, connection)
+            remove_batch(Task, pks)
+            _invalidate(objects)
+    for index, task, _ in tasks:
+        results.ok(index, task.pk, "deleted")
+    return results
+
+
+def bulk_change_status(request, ids, new_status):
+    """
+    Перевод задач в new_status: задачи читаются одним запросом (с блокировкой
+    строк) с проверкой доступа, как в bulk_update_tasks, а все найденные
+    записываются одним UPDATE ... WHERE id IN (...) с историей пакетом.
+    Ограничений на переходы нет, как и у change_status.
+    Поисковый индекс и автодополнение от статуса не зависят
+    """
+    # pylint: disable=protected-access
+    results = BulkResults()
+    with transaction.atomic():
+        tasks = []
+        for index, task, _ in _load_tasks(
+            request, ids, results, Task.objects.select_for_update()
+        ):
+            if task.status == new_status:
+                results.ok(index, task.pk, "unchanged")
+            else:
+                task._change_reason = f"status: {task.status} -> {new_status}"
+                task.status = new_status
+                task.updated_at = timezone.now().date()
+                tasks.append((index, task))
+        if not tasks:
+            return results
+
+        objects = [task for _, task in tasks]
+        old_values = {task.pk: dict(task._loaded_values) for task in objects}
+        Task.objects.filter(pk__in=[task.pk for task in objects]).update(
+            status=new_status, updated_at=timezone.now().date()
+        )
+        Task.history.model.objects.bulk_create(
+            _history_rows(objects, "~", request.user, old_values),
+            batch_size=BULK_BATCH_SIZE,
+        )
+        track_tasks_save(objects, created=False)
+    for task in objects:
+        task._remember_saved_values(["status", "updated_at"])
+    _invalidate(objects, old_values.values())
+    for index, task in tasks:
+        results.ok(index, task.pk, "updated")
+    return results
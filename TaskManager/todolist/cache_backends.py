@@ -0,0 +1,689 @@
+""" Бэкенды кеша """
+
+# pylint: disable=logging-fstring-interpolation
+import json
+import logging
+import math
+import os
+import pickle
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+logger = logging.getLogger("todolist")
+
+_MISSING = object()
+
+# Обертка значений, записанных через get_or_set: хранит время вычисления
+# (delta) и момент истечения для вероятностного раннего обновления
+_Entry = namedtuple("_Entry", ["value", "delta", "expires_at"])
+
+
+def _unwrap(value):
+    return value.value if isinstance(value, _Entry) else value
+
+
+class LocalLRU:
+    """Ограниченный по размеру LRU-кеш процесса с TTL на каждую запись"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.pid = os.getpid()
+        # Метка источника инвалидации: свои записи уже учтены локально
+        self.token = uuid.uuid4().hex
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Значение либо _MISSING, если записи нет или она истекла"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return _MISSING
+            payload, expires_at = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return _MISSING
+            self._data.move_to_end(key)
+        # Храним pickle, чтобы изменение полученного объекта не портило кеш
+        return pickle.loads(payload)
+
+    def set(self, key, value, ttl):
+        """Запись с локальным TTL в секундах"""
+        payload = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._data[key] = (payload, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        """Удаление записи"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Полная очистка"""
+        with self._lock:
+            self._data.clear()
+
+
+# Локальные кеши общие для всех потоков процесса (как у LocMemCache)
+_local_stores = {}
+_local_stores_lock = threading.Lock()
+
+
+class TwoTierCache(BaseCache):
+    """
+    Двухуровневый кеш: LRU в памяти процесса перед удаленным кешем.
+
+    OPTIONS:
+        REMOTE_ALIAS — алиас удаленного кеша из CACHES (Redis, LocMem и т.п.);
+        LOCAL_MAX_ENTRIES — размер локального LRU;
+        LOCAL_TIMEOUT — сколько секунд доверять локальной копии;
+        LOCK_TIMEOUT — время жизни блокировки пересчета в get_or_set;
+        EARLY_REFRESH_BETA — агрессивность раннего обновления (0 — выключено);
+        SYNC_INTERVAL — как часто сверять версию инвалидации, если
+            у удаленного кеша нет pub/sub;
+        INVALIDATION_CHANNEL — канал pub/sub Redis для межпроцессной инвалидации;
+        REMOTE_ONLY_PREFIXES — префиксы ключей, которые пишутся на каждом
+            запросе (счетчики, буферы): они идут прямо в удаленный кеш,
+            минуя LRU, и не рассылают инвалидацию;
+        INVALIDATION_LOG_SIZE — глубина журнала инвалидации без pub/sub.
+
+    Межпроцессная инвалидация — по ключам: при наличии Redis запись публикует
+    измененные ключи в канал, и слушатели удаляют их из своих LRU. Без Redis
+    запись сдвигает версию в удаленном кеше и кладет список ключей в журнал
+    под этой версией; читатели не чаще SYNC_INTERVAL дочитывают журнал
+    и удаляют перечисленные ключи. Весь локальный уровень очищается только
+    при clear() и если журнал потерян (вытеснен или отстал больше чем
+    на INVALIDATION_LOG_SIZE записей).
+    """
+
+    version_key = "two_tier:invalidation_version"
+    log_key = "two_tier:invalidated:{version}"
+    log_size = 1000
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self.name = location or "two-tier"
+        self.remote_alias = options.get("REMOTE_ALIAS", "remote")
+        self.local_max_entries = int(options.get("LOCAL_MAX_ENTRIES", 1000))
+        self.local_timeout = float(options.get("LOCAL_TIMEOUT", 5))
+        self.lock_timeout = float(options.get("LOCK_TIMEOUT", 10))
+        self.early_refresh_beta = float(options.get("EARLY_REFRESH_BETA", 1.0))
+        self.sync_interval = float(options.get("SYNC_INTERVAL", 1))
+        self.channel = options.get("INVALIDATION_CHANNEL", "cache-invalidation")
+        self.remote_only_prefixes = tuple(options.get("REMOTE_ONLY_PREFIXES", ()))
+        self.log_size = int(options.get("INVALIDATION_LOG_SIZE", self.log_size))
+        self._synced_at = 0.0
+        self._seen_version = _MISSING  # журнал еще не сверялся
+
+    # --- инфраструктура ---------------------------------------------------
+
+    @property
+    def remote(self):
+        """Удаленный кеш (экземпляр на поток, как принято в Django)"""
+        return caches[self.remote_alias]
+
+    @property
+    def client(self):
+        """Клиент удаленного кеша, чтобы работал django_redis.get_redis_connection"""
+        return self.remote.client
+
+    def _redis(self):
+        client = getattr(self.remote, "client", None)
+        if client is None or not hasattr(client, "get_client"):
+            return None
+        return client.get_client(write=True)
+
+    @property
+    def local(self):
+        """LRU процесса; после fork создается заново"""
+        store = _local_stores.get(self.name)
+        if store is None or store.pid != os.getpid():
+            with _local_stores_lock:
+                store = _local_stores.get(self.name)
+                if store is None or store.pid != os.getpid():
+                    store = LocalLRU(self.local_max_entries)
+                    _local_stores[self.name] = store
+                    if self._redis() is not None:
+                        self._start_listener(store)
+        return store
+
+    def _start_listener(self, store):
+        """
+        Фоновый поток: удаляет из LRU ключи, измененные другими процессами.
+        При обрыве соединения переподписывается и очищает LRU — сообщения,
+        пришедшие за время обрыва, потеряны
+        """
+        pubsub = self._redis().pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self.channel)
+
+        def listen():
+            nonlocal pubsub
+            while True:
+                try:
+                    if pubsub is None:
+                        pubsub = self._redis().pubsub(ignore_subscribe_messages=True)
+                        pubsub.subscribe(self.channel)
+                        store.clear()
+                    for message in pubsub.listen():
+                        _apply_invalidation(store, json.loads(message["data"]))
+                except Exception:  # pylint: disable=broad-except
+                    logger.exception(
+                        "[CACHE] Слушатель инвалидации отключился, переподключение"
+                    )
+                    pubsub = None
+                    time.sleep(1)
+
+        threading.Thread(target=listen, name="two-tier-cache", daemon=True).start()
+
+    def _remote_only(self, key):
+        return bool(self.remote_only_prefixes) and key.startswith(
+            self.remote_only_prefixes
+        )
+
+    def _publish(self, keys):
+        """Сообщает другим процессам об изменении ключей (None — очистка)"""
+        message = {"token": self.local.token, "keys": keys}
+        redis = self._redis()
+        if redis is not None:
+            redis.publish(self.channel, json.dumps(message))
+            return
+        try:
+            version = self.remote.incr(self.version_key)
+        except ValueError:
+            # Начало от текущего времени: после сброса версии (clear,
+            # вытеснение) читатели не примут новые номера за старые
+            created = self.remote.add(self.version_key, time.time_ns(), timeout=None)
+            version = self.remote.incr(self.version_key)
+            if created and self._seen_version is None:
+                self._seen_version = version  # до нашей записи журнала не было
+        # Журнал живет дольше интервала сверки; потерянная запись — очистка
+        self.remote.set(
+            self.log_key.format(version=version),
+            message,
+            timeout=max(60, self.sync_interval * 10),
+        )
+
+    def _sync(self):
+        """
+        Дочитывает журнал инвалидации (только без pub/sub). Вызывается
+        перед каждым заполнением LRU, поэтому первая сверка — отправная точка
+        """
+        if self._redis() is not None:
+            return
+        now = time.monotonic()
+        if now - self._synced_at < self.sync_interval:
+            return
+        self._synced_at = now
+        version, seen = self.remote.get(self.version_key), self._seen_version
+        self._seen_version = version
+        if seen is _MISSING or version == seen:
+            return
+        if None in (seen, version) or not seen < version <= seen + self.log_size:
+            self.local.clear()  # версия сброшена или журнал отстал
+            return
+        log_keys = [
+            self.log_key.format(version=number)
+            for number in range(seen + 1, version + 1)
+        ]
+        messages = self.remote.get_many(log_keys)
+        if len(messages) < len(log_keys):
+            self.local.clear()  # часть журнала вытеснена
+            return
+        for log_key in log_keys:
+            _apply_invalidation(self.local, messages[log_key])
+
+    def _timeout(self, timeout):
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    def _local_ttl(self, timeout):
+        timeout = self._timeout(timeout)
+        if timeout is None:
+            return self.local_timeout
+        return min(self.local_timeout, timeout)
+
+    def _forget(self, *keys):
+        for key in keys:
+            self.local.delete(key)
+        if keys:
+            self._publish(list(keys))
+
+    def _get_raw(self, key, version):
+        local_key = self.make_and_validate_key(key, version=version)
+        self._sync()
+        value = self.local.get(local_key)
+        if value is _MISSING:
+            value = self.remote.get(key, _MISSING, version=version)
+            if value is not _MISSING:
+                self.local.set(local_key, value, self.local_timeout)
+        return value
+
+    # --- API кеша ---------------------------------------------------------
+
+    def get(self, key, default=None, version=None):
+        if self._remote_only(key):
+            return self.remote.get(key, default, version=version)
+        value = self._get_raw(key, version)
+        return default if value is _MISSING else _unwrap(value)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        self.remote.set(key, value, timeout=self._timeout(timeout), version=version)
+        if self._remote_only(key):
+            return
+        self._sync()
+        self._forget(local_key)
+        self.local.set(local_key, value, self._local_ttl(timeout))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        added = self.remote.add(
+            key, value, timeout=self._timeout(timeout), version=version
+        )
+        if added and not self._remote_only(key):
+            self._forget(local_key)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.remote.touch(key, timeout=self._timeout(timeout), version=version)
+
+    def delete(self, key, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        deleted = self.remote.delete(key, version=version)
+        if not self._remote_only(key):
+            self._forget(local_key)
+        return deleted
+
+    def incr(self, key, delta=1, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        value = self.remote.incr(key, delta, version=version)
+        if not self._remote_only(key):
+            self._forget(local_key)
+        return value
+
+    def decr(self, key, delta=1, version=None):
+        return self.incr(key, -delta, version=version)
+
+    def has_key(self, key, version=None):
+        if self._remote_only(key):
+            return self.remote.has_key(key, version=version)
+        return self._get_raw(key, version) is not _MISSING
+
+    def get_many(self, keys, version=None):
+        self._sync()
+        found, missing = {}, []
+        for key in keys:
+            if self._remote_only(key):
+                missing.append(key)
+                continue
+            value = self.local.get(self.make_and_validate_key(key, version=version))
+            if value is _MISSING:
+                missing.append(key)
+            else:
+                found[key] = _unwrap(value)
+        if missing:
+            for key, value in self.remote.get_many(missing, version=version).items():
+                if not self._remote_only(key):
+                    self.local.set(
+                        self.make_and_validate_key(key, version=version),
+                        value,
+                        self.local_timeout,
+                    )
+                found[key] = _unwrap(value)
+        return found
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.remote.set_many(
+            data, timeout=self._timeout(timeout), version=version
+        )
+        self._forget(*self._local_keys(data, version))
+        return failed
+
+    def delete_many(self, keys, version=None):
+        self.remote.delete_many(keys, version=version)
+        self._forget(*self._local_keys(keys, version))
+
+    def _local_keys(self, keys, version):
+        return [
+            self.make_and_validate_key(key, version=version)
+            for key in keys
+            if not self._remote_only(key)
+        ]
+
+    def clear(self):
+        self.remote.clear()
+        self.local.clear()
+        self._publish(None)
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None):
+        """
+        get_or_set с защитой от лавины пересчетов:
+        - пересчитывает только тот, кто захватил блокировку в удаленном кеше,
+          остальные ждут результата;
+        - горячие ключи обновляются заранее с вероятностью, растущей по мере
+          приближения к истечению (XFetch), пока остальные читают старое значение.
+        """
+        if self._remote_only(key):
+            return self.remote.get_or_set(key, default, timeout, version=version)
+        entry = self._get_raw(key, version)
+        if entry is not _MISSING and not self._should_refresh(entry):
+            return _unwrap(entry)
+
+        lock_key = f"{key}:lock"
+        if self.remote.add(lock_key, os.getpid(), self.lock_timeout, version=version):
+            try:
+                return self._recompute(key, default, timeout, version)
+            finally:
+                self.remote.delete(lock_key, version=version)
+
+        if entry is not _MISSING:
+            # Значение еще действительно, его обновляет другой процесс
+            return _unwrap(entry)
+
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            value = self.remote.get(key, _MISSING, version=version)
+            if value is not _MISSING:
+                return _unwrap(value)
+        logger.warning(f"[CACHE] Не дождались пересчета ключа {key}")
+        return self._recompute(key, default, timeout, version)
+
+    def _should_refresh(self, entry):
+        if not isinstance(entry, _Entry) or entry.expires_at is None:
+            return False
+        if self.early_refresh_beta <= 0:
+            return False
+        # 1 - random() лежит в (0, 1], поэтому логарифм определен
+        jitter = entry.delta * self.early_refresh_beta * -math.log(
+            1 - random.random()
+        )
+        return time.time() + jitter >= entry.expires_at
+
+    def _recompute(self, key, default, timeout, version):
+        started = time.monotonic()
+        value = default() if callable(default) else default
+        if value is None:
+            return None
+        delta = time.monotonic() - started
+        timeout = self._timeout(timeout)
+        expires_at = None if timeout is None else time.time() + timeout
+        self.set(key, _Entry(value, delta, expires_at), timeout, version)
+        return value
+
+
+def _apply_invalidation(store, message):
+    """Удаляет из LRU ключи из сообщения другого процесса (None — все)"""
+    if message["token"] == store.token:
+        return  # собственные записи уже учтены локально
+    if message["keys"] is None:
+        store.clear()
+        return
+    for key in message["keys"]:
+        store.delete(key)
+
+
+class SQLiteCache(BaseCache):
+    """
+    Кеш в отдельном файле SQLite, общий для всех процессов одного хоста.
+
+    Нужен, когда Redis не используется: в отличие от LocMemCache сессии,
+    буфер посещений и кеш ответов видны всем воркерам gunicorn и Celery.
+    Файл работает в режиме WAL, поэтому читатели не блокируют писателя.
+    Целые числа хранятся как INTEGER, и incr выполняется одним UPDATE
+    внутри BEGIN IMMEDIATE — атомарно между процессами. Остальные значения
+    сериализуются pickle. Истекшие записи удаляются лениво и при очистке.
+    Число записей ведут триггеры в таблице cache_meta, чтобы проверка
+    переполнения не считала COUNT(*) под блокировкой записи.
+
+    LOCATION — путь к файлу. OPTIONS: MAX_ENTRIES, CULL_FREQUENCY
+    (как у LocMemCache) и BUSY_TIMEOUT в секундах.
+    """
+
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self.path = location
+        self.busy_timeout = float(options.get("BUSY_TIMEOUT", 5))
+        self._local = threading.local()
+
+    # --- соединение -------------------------------------------------------
+
+    @property
+    def connection(self):
+        """Соединение на поток; после fork открывается заново"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(
+                self.path,
+                timeout=self.busy_timeout,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            # Иначе INSERT OR REPLACE удаляет старую строку без триггера
+            connection.execute("PRAGMA recursive_triggers=ON")
+            self._create_tables(connection)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    @staticmethod
+    def _create_tables(connection):
+        """Таблицы и триггеры счетчика записей (одной транзакцией на все процессы)"""
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value BLOB, expires REAL)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)"
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache_meta ("
+                "name TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+            )
+            connection.execute(
+                "CREATE TRIGGER IF NOT EXISTS cache_count_insert AFTER INSERT ON cache "
+                "BEGIN UPDATE cache_meta SET value = value + 1 "
+                "WHERE name = 'count'; END"
+            )
+            connection.execute(
+                "CREATE TRIGGER IF NOT EXISTS cache_count_delete AFTER DELETE ON cache "
+                "BEGIN UPDATE cache_meta SET value = value - 1 "
+                "WHERE name = 'count'; END"
+            )
+            # Файл без счетчика (создан до триггеров) считается один раз
+            if connection.execute(
+                "SELECT 1 FROM cache_meta WHERE name = 'count'"
+            ).fetchone() is None:
+                connection.execute(
+                    "INSERT INTO cache_meta (name, value) "
+                    "SELECT 'count', COUNT(*) FROM cache"
+                )
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    @contextmanager
+    def _write(self):
+        """Транзакция с немедленной блокировкой на запись"""
+        connection = self.connection
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    # --- сериализация -----------------------------------------------------
+
+    def _encode(self, value):
+        if type(value) is int:  # pylint: disable=unidiomatic-typecheck
+            return value
+        return pickle.dumps(value, self.pickle_protocol)
+
+    @staticmethod
+    def _decode(value):
+        return value if isinstance(value, int) else pickle.loads(value)
+
+    def _expires(self, timeout):
+        return self.get_backend_timeout(timeout)
+
+    # --- API кеша ---------------------------------------------------------
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self.connection.execute(
+            "SELECT value FROM cache WHERE key = ? "
+            "AND (expires IS NULL OR expires > ?)",
+            (key, time.time()),
+        ).fetchone()
+        return default if row is None else self._decode(row[0])
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._write() as connection:
+            self._cull(connection)
+            connection.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)",
+                (key, self._encode(value), self._expires(timeout)),
+            )
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._write() as connection:
+            self._cull(connection)
+            cursor = connection.execute(
+                "INSERT INTO cache (key, value, expires) VALUES (?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET "
+                "value = excluded.value, expires = excluded.expires "
+                "WHERE cache.expires IS NOT NULL AND cache.expires <= ?",
+                (key, self._encode(value), self._expires(timeout), time.time()),
+            )
+            return cursor.rowcount == 1
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self.connection.execute(
+            "UPDATE cache SET expires = ? WHERE key = ? "
+            "AND (expires IS NULL OR expires > ?)",
+            (self._expires(timeout), key, time.time()),
+        )
+        return cursor.rowcount == 1
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self.connection.execute("DELETE FROM cache WHERE key = ?", (key,))
+        return cursor.rowcount == 1
+
+    def has_key(self, key, version=None):
+        return self.get(key, _MISSING, version=version) is not _MISSING
+
+    def incr(self, key, delta=1, version=None):
+        cache_key = self.make_and_validate_key(key, version=version)
+        with self._write() as connection:
+            cursor = connection.execute(
+                "UPDATE cache SET value = value + ? WHERE key = ? "
+                "AND typeof(value) = 'integer' "
+                "AND (expires IS NULL OR expires > ?)",
+                (delta, cache_key, time.time()),
+            )
+            if cursor.rowcount == 0:
+                raise ValueError(f"Key '{key}' not found")
+            return connection.execute(
+                "SELECT value FROM cache WHERE key = ?", (cache_key,)
+            ).fetchone()[0]
+
+    def get_many(self, keys, version=None):
+        key_map = {
+            self.make_and_validate_key(key, version=version): key for key in keys
+        }
+        if not key_map:
+            return {}
+        placeholders = ", ".join("?" * len(key_map))
+        rows = self.connection.execute(
+            f"SELECT key, value FROM cache WHERE key IN ({placeholders}) "
+            "AND (expires IS NULL OR expires > ?)",
+            (*key_map, time.time()),
+        ).fetchall()
+        return {key_map[key]: self._decode(value) for key, value in rows}
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self._expires(timeout)
+        rows = [
+            (
+                self.make_and_validate_key(key, version=version),
+                self._encode(value),
+                expires,
+            )
+            for key, value in data.items()
+        ]
+        with self._write() as connection:
+            self._cull(connection, len(rows))
+            connection.executemany(
+                "INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)",
+                rows,
+            )
+        return []
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_and_validate_key(key, version=version) for key in keys]
+        with self._write() as connection:
+            connection.executemany(
+                "DELETE FROM cache WHERE key = ?", [(key,) for key in keys]
+            )
+
+    def clear(self):
+        self.connection.execute("DELETE FROM cache")
+
+    @staticmethod
+    def _count(connection):
+        return connection.execute(
+            "SELECT value FROM cache_meta WHERE name = 'count'"
+        ).fetchone()[0]
+
+    def _cull(self, connection, incoming=1):
+        """
+        Очистка при переполнении: сначала истекшие записи, затем каждая
+        CULL_FREQUENCY-я из самых старых по сроку жизни (как у LocMemCache).
+        Число записей берется из счетчика cache_meta при каждой записи
+        (incoming — сколько строк будет вставлено), поэтому MAX_ENTRIES
+        не превышается, а проверка не сканирует таблицу
+        """
+        if self._count(connection) + incoming <= self._max_entries:
+            return
+        connection.execute("DELETE FROM cache WHERE expires <= ?", (time.time(),))
+        count = self._count(connection)
+        if count + incoming <= self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            connection.execute("DELETE FROM cache")
+            return
+        connection.execute(
+            "DELETE FROM cache WHERE key IN ("
+            "SELECT key FROM cache ORDER BY expires IS NULL, expires LIMIT ?)",
+            (
+                max(
+                    count // self._cull_frequency,
+                    count + incoming - self._max_entries,
+                ),
+            ),
+        )
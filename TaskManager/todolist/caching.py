@@ -0,0 +1,236 @@
+""" Кеширование ответов API """
+
+# pylint: disable=logging-fstring-interpolation
+import hashlib
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.http import urlencode
+
+logger = logging.getLogger("todolist")
+
+RESPONSE_CACHE_TIMEOUT = 60 * 15  # 15 минут
+TASKS_GENERATION_KEY = "generation:tasks"
+USER_PROFILES_GENERATION_KEY = "generation:user_profiles"
+PROJECTS_GENERATION_KEY = "generation:projects"
+DASHBOARD_VERSION_KEY = "dashboard_version:{user_id}"
+CACHE_STATS_KEY = "cache_stats:{scope}:{kind}"
+PAGE_VISITS_HEAD_KEY = "page_visits:head"
+PAGE_VISITS_TAIL_KEY = "page_visits:tail"
+PAGE_VISIT_KEY = "page_visits:{index}"
+PAGE_VISIT_TIMEOUT = 60 * 60 * 24
+# Параметры, которые не влияют на данные ответа
+IGNORED_QUERY_PARAMS = {"format"}
+
+# Отложенные сдвиги внутри batched_invalidation(): ключи поколений и id
+# пользователей, чьи дашборды нужно сбросить
+_pending_invalidation = ContextVar("pending_invalidation", default=None)
+
+
+@contextmanager
+def batched_invalidation():
+    """
+    Сдвиги поколений и версий дашбордов внутри блока (например, из сигналов
+    при удалении пакета задач) копятся и выполняются один раз при выходе
+    """
+    pending = {"generations": set(), "dashboards": set()}
+    token = _pending_invalidation.set(pending)
+    try:
+        yield
+    finally:
+        _pending_invalidation.reset(token)
+        bump_generation(*pending["generations"])
+        bump_dashboard_versions(pending["dashboards"])
+
+
+def project_generation_key(project_id):
+    """Ключ поколения задач конкретного проекта"""
+    return f"generation:tasks:project:{project_id}"
+
+
+def get_generation(key):
+    """
+    Возвращает текущее поколение ключа.
+    Начальное значение берется из времени, чтобы после вытеснения ключа
+    из кеша поколение не вернулось к уже использованному числу.
+    """
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        generation = cache.get(key, 0)
+    return generation
+
+
+def bump_generation(*keys):
+    """Сдвигает поколения: все ключи, построенные на старых значениях, устаревают"""
+    pending = _pending_invalidation.get()
+    if pending is not None:
+        pending["generations"].update(keys)
+        return
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), timeout=None)
+
+
+def bump_task_generations(*project_ids):
+    """Инвалидирует закешированные списки задач (глобально и по проектам)"""
+    keys = [TASKS_GENERATION_KEY]
+    keys.extend(
+        project_generation_key(project_id)
+        for project_id in set(project_ids)
+        if project_id is not None
+    )
+    bump_generation(*keys)
+
+
+def normalize_query_params(query_params):
+    """Приводит параметры запроса к каноничному виду (порядок не важен)"""
+    items = []
+    for key in sorted(query_params):
+        if key in IGNORED_QUERY_PARAMS:
+            continue
+        for value in sorted(query_params.getlist(key)):
+            items.append((key, value))
+    return urlencode(items)
+
+
+def task_response_cache_key(scope, request, generation_keys=()):
+    """
+    Ключ кеша ответа со списком задач.
+    Учитывает путь, параметры (в т.ч. страницу), пользователя, текущую дату
+    и поколение: проектное, если список ограничен проектом, иначе глобальное.
+    generation_keys — поколения других данных в ответе (раскрытые связи).
+    """
+    project_id = request.query_params.get("project", "")
+    if project_id.isdigit():
+        generation = get_generation(project_generation_key(project_id))
+    else:
+        generation = get_generation(TASKS_GENERATION_KEY)
+    generation = ".".join(
+        [str(generation), *(str(get_generation(key)) for key in generation_keys)]
+    )
+
+    raw_key = "|".join(
+        [
+            request.path,
+            normalize_query_params(request.query_params),
+            str(request.user.pk or "anon"),
+            timezone.now().date().isoformat(),
+        ]
+    )
+    digest = hashlib.md5(raw_key.encode("utf-8")).hexdigest()
+    return f"response:{scope}:{generation}:{digest}"
+
+
+def user_profile_cache_key(pk):
+    """Ключ сериализованного профиля пользователя"""
+    return f"payload:user_profile:{pk}"
+
+
+def user_profile_list_cache_key(request):
+    """Ключ сериализованной страницы списка профилей"""
+    generation = get_generation(USER_PROFILES_GENERATION_KEY)
+    digest = hashlib.md5(
+        normalize_query_params(request.query_params).encode("utf-8")
+    ).hexdigest()
+    return f"payload:user_profiles:{generation}:{digest}"
+
+
+def invalidate_user_profile(*pks):
+    """Сброс кеша профилей и всех страниц списка профилей"""
+    cache.delete_many([user_profile_cache_key(pk) for pk in pks])
+    bump_generation(USER_PROFILES_GENERATION_KEY)
+
+
+def get_dashboard_version(user_id):
+    """Версия фрагментов дашборда пользователя"""
+    return get_generation(DASHBOARD_VERSION_KEY.format(user_id=user_id))
+
+
+def bump_dashboard_versions(user_ids):
+    """
+    Сбрасывает фрагменты дашборда пользователей одним обращением к кешу.
+    Новая версия берется из времени, а не через incr, чтобы обойтись set_many.
+    """
+    pending = _pending_invalidation.get()
+    if pending is not None:
+        pending["dashboards"].update(user_ids)
+        return
+    version = time.time_ns()
+    cache.set_many(
+        {
+            DASHBOARD_VERSION_KEY.format(user_id=user_id): version
+            for user_id in set(user_ids)
+            if user_id is not None
+        },
+        timeout=None,
+    )
+
+
+def _increment(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+def record_cache_hit(scope, key):
+    """Учет попадания в кеш"""
+    _increment(CACHE_STATS_KEY.format(scope=scope, kind="hits"))
+    logger.debug(f"[CACHE HIT] {key}")
+
+
+def record_cache_miss(scope, key):
+    """Учет промаха кеша"""
+    _increment(CACHE_STATS_KEY.format(scope=scope, kind="misses"))
+    logger.debug(f"[CACHE MISS] {key}")
+
+
+def get_cache_stats(*scopes):
+    """Счетчики попаданий и промахов по областям кеширования"""
+    keys = {
+        (scope, kind): CACHE_STATS_KEY.format(scope=scope, kind=kind)
+        for scope in scopes
+        for kind in ("hits", "misses")
+    }
+    values = cache.get_many(keys.values())
+    stats = {}
+    for (scope, kind), key in keys.items():
+        stats.setdefault(scope, {})[kind] = values.get(key, 0)
+    return stats
+
+
+def push_page_visit(visit_data):
+    """
+    Кладет посещение в буфер в кеше (вариант без Redis).
+    Номер записи выдает атомарный incr, поэтому параллельные воркеры
+    не перезаписывают посещения друг друга.
+    """
+    cache.add(PAGE_VISITS_TAIL_KEY, 0, timeout=None)
+    index = cache.incr(PAGE_VISITS_TAIL_KEY)
+    cache.set(PAGE_VISIT_KEY.format(index=index), visit_data, PAGE_VISIT_TIMEOUT)
+
+
+def pop_page_visits(limit=1000):
+    """Забирает из буфера до limit посещений в порядке поступления"""
+    tail = cache.get(PAGE_VISITS_TAIL_KEY, 0)
+    head = cache.get(PAGE_VISITS_HEAD_KEY, 0)
+    if head > tail:  # счетчик был вытеснен и начат заново
+        head = 0
+    keys = [
+        PAGE_VISIT_KEY.format(index=index)
+        for index in range(head + 1, min(tail, head + limit) + 1)
+    ]
+    if not keys:
+        return []
+    visits = cache.get_many(keys)
+    cache.delete_many(keys)
+    cache.set(PAGE_VISITS_HEAD_KEY, head + len(keys), timeout=None)
+    return [visits[key] for key in keys if key in visits]
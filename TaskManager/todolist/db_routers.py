@@ -0,0 +1,95 @@
+""" Маршрутизация запросов к БД: запись в основную базу, чтение с реплик """
+
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+@dataclass
+class RoutingState:
+    """Режим чтения в текущем запросе или задаче"""
+
+    replica_reads: bool = True  # можно ли читать с реплики
+    wrote: bool = False  # была ли запись (дальше чтение только с основной базы)
+
+
+# Вне replica_reads() (миграции, команды, обычные задачи Celery)
+# все запросы идут в основную базу
+_state = ContextVar("db_routing_state", default=None)
+
+
+def replica_aliases():
+    """Алиасы реплик из settings.DATABASE_REPLICAS"""
+    return getattr(settings, "DATABASE_REPLICAS", [])
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    """
+    Разрешает чтение с реплик внутри блока (запрос, отчетная задача Celery).
+    После первой записи блок до конца читает из основной базы.
+    Можно использовать как декоратор
+    """
+    token = _state.set(RoutingState(replica_reads=enabled))
+    try:
+        yield _state.get()
+    finally:
+        _state.reset(token)
+
+
+def _read_from_primary():
+    state = _state.get()
+    return (
+        state is None
+        or not state.replica_reads
+        or state.wrote
+        # Внутри транзакции читаем то, что в ней же записано
+        or connections[DEFAULT_DB_ALIAS].in_atomic_block
+    )
+
+
+class ReplicaRouter:
+    """
+    Запись — в default, чтение — со случайной реплики, если это разрешено
+    (replica_reads) и в текущем блоке еще не было записи
+    """
+
+    def db_for_read(self, model, **hints):
+        """База для чтения"""
+        # pylint: disable=unused-argument
+        replicas = replica_aliases()
+        if not replicas or _read_from_primary():
+            return DEFAULT_DB_ALIAS
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db:
+            # Связанные объекты — из той же базы, что и исходный объект
+            return instance._state.db
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        """База для записи: всегда default"""
+        # pylint: disable=unused-argument
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """Основная база и реплики содержат одни и те же данные"""
+        # pylint: disable=unused-argument
+        databases = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        """
+        Без ограничений: реплики PostgreSQL повторяют схему сами, а локальные
+        копии (два файла SQLite) мигрируются через migrate --database
+        """
+        # pylint: disable=unused-argument
+        return None
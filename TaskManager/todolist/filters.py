@@ -2,8 +2,10 @@
 
 import django_filters
 from django_filters import rest_framework as filters
+from rest_framework.filters import SearchFilter
 
 from .models import Task, UserBIO
+from .search import search_queryset
 
 
 class TaskFilter(filters.FilterSet):
@@ -31,6 +33,7 @@ class TaskFilter(filters.FilterSet):
         model = Task
         fields = [
             "due_date",
+            "project",
         ]
 
     def filter_by_current_user(self, queryset, _name, value):
@@ -49,3 +52,13 @@ class UserBIOFilter(filters.FilterSet):
         """Meta"""
         model = UserBIO
         fields = ["age", "role", "company"]
+
+
+class FullTextSearchFilter(SearchFilter):
+    """
+    Параметр ?search= как у SearchFilter, но поиск идет по полнотекстовому
+    индексу модели (со стеммингом) и результаты упорядочены по релевантности
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        return search_queryset(queryset, request.query_params.get(self.search_param))
@@ -1,7 +1,7 @@
 from django import forms
 from django.contrib.auth import get_user_model
 
-from .models import UserProfile, UserBIO, Subtask
+from .models import UserProfile, UserBIO, Subtask, Task
 
 
 class UserProfileForm(forms.ModelForm):
@@ -154,7 +154,7 @@ class SubtaskForm(forms.ModelForm):
 
     def clean(self):
         cleaned_data = super().clean()
-        if self.parent_task and self.parent_task.subtasks.count() >= 5:
+        if self.parent_task and self.parent_task.subtask_count >= Task.MAX_SUBTASKS:
             raise forms.ValidationError(
                 "Невозможно добавить подзадачу. Достигнут максимум (5 подзадач)."
             )
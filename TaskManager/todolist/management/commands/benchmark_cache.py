@@ -0,0 +1,100 @@
+""" Сравнение производительности бэкендов кеша """
+
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from ...cache_backends import SQLiteCache
+
+COUNTER_KEY = "benchmark:counter"
+
+
+def _make_backend(name, location):
+    if name == "locmem":
+        return LocMemCache("benchmark", {})
+    if name == "sqlite":
+        return SQLiteCache(location, {"OPTIONS": {"MAX_ENTRIES": 100000}})
+    # pylint: disable=import-outside-toplevel
+    from django_redis.cache import RedisCache
+
+    return RedisCache(location, {"KEY_PREFIX": "benchmark"})
+
+
+def _worker(name, location, operations, keys):
+    """Смешанная нагрузка: 80% get, 15% set, 5% incr общего счетчика"""
+    backend = _make_backend(name, location)
+    increments = 0
+    started = time.perf_counter()
+    for _ in range(operations):
+        key = f"benchmark:{random.randrange(keys)}"
+        roll = random.random()
+        if roll < 0.80:
+            backend.get(key)
+        elif roll < 0.95:
+            backend.set(key, {"id": key, "payload": "x" * 200}, 60)
+        else:
+            backend.incr(COUNTER_KEY)
+            increments += 1
+    return time.perf_counter() - started, increments
+
+
+class Command(BaseCommand):
+    """
+    Запускает одинаковую нагрузку в нескольких процессах на LocMemCache,
+    SQLiteCache и Redis (если доступен) и печатает число операций в секунду.
+    Для общих бэкендов также проверяется, что счетчик incr не потерял ни
+    одного увеличения; LocMemCache у каждого процесса свой, поэтому для него
+    проверка показывает, что данные между воркерами не разделяются.
+    """
+
+    help = "Сравнивает LocMemCache, SQLiteCache и Redis на смешанной нагрузке"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=4)
+        parser.add_argument("--operations", type=int, default=5000)
+        parser.add_argument("--keys", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        processes = options["processes"]
+        operations = options["operations"]
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            backends = [
+                ("locmem", None),
+                ("sqlite", os.path.join(tmp_dir, "cache.sqlite3")),
+            ]
+            if settings.USE_REDIS:
+                backends.append(("redis", f"redis://{settings.REDIS_HOST}:6379/15"))
+            else:
+                self.stdout.write("USE_REDIS выключен — Redis пропущен")
+
+            for name, location in backends:
+                self.run_backend(name, location, processes, operations, options)
+
+    def run_backend(self, name, location, processes, operations, options):
+        """Прогон нагрузки на одном бэкенде"""
+        # pylint: disable=too-many-arguments
+        backend = _make_backend(name, location)
+        backend.clear()
+        backend.set(COUNTER_KEY, 0, None)
+
+        with multiprocessing.get_context("fork").Pool(processes) as pool:
+            results = pool.starmap(
+                _worker,
+                [(name, location, operations, options["keys"])] * processes,
+            )
+
+        elapsed = max(seconds for seconds, _ in results)
+        expected = sum(increments for _, increments in results)
+        counter = backend.get(COUNTER_KEY)
+        self.stdout.write(
+            f"{name:>7}: {processes * operations / elapsed:10.0f} оп/с, "
+            f"счетчик {counter} из {expected}"
+        )
+        backend.clear()
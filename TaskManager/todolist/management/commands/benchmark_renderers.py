@@ -0,0 +1,112 @@
+""" Сравнение JSON-рендереров и сжатия ответа на странице задач """
+
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import compress_string
+from rest_framework.renderers import JSONRenderer
+
+from ...middleware import BROTLI_QUALITY, brotli
+from ...models import Project, Task
+from ...renderers import FastJSONRenderer, orjson
+from ...serializers.todolists import TaskSerializer
+
+WORDS = (
+    "задача проект исполнитель срок проверить обновить отчет клиент релиз "
+    "ошибка интерфейс сервер база данных тест документация встреча оценка "
+    "дизайн макет API пользователь настройка интеграция выгрузка уведомление"
+).split()
+
+
+def _best_time(function, repeat):
+    """Лучшее время из repeat запусков и результат последнего"""
+    best, result = None, None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+class Command(BaseCommand):
+    """
+    Строит страницу из --tasks задач (во временной транзакции, которая
+    откатывается), рендерит ее JSONRenderer DRF и FastJSONRenderer
+    и печатает время рендеринга, а также размер ответа без сжатия,
+    с gzip и с brotli (если установлен) и время сжатия
+    """
+
+    help = "Сравнивает JSONRenderer и FastJSONRenderer и сжатие страницы задач"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tasks", type=int, default=1000)
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            data = self.build_page(options["tasks"])
+            transaction.set_rollback(True)
+        repeat = options["repeat"]
+        self.stdout.write(f"Страница из {options['tasks']} задач, лучшее из {repeat}")
+
+        renderers = [("JSONRenderer", JSONRenderer())]
+        if orjson is not None:
+            renderers.append(("FastJSONRenderer", FastJSONRenderer()))
+        else:
+            self.stdout.write("orjson не установлен: FastJSONRenderer = JSONRenderer")
+        for name, renderer in renderers:
+            seconds, content = _best_time(lambda r=renderer: r.render(data), repeat)
+            self.stdout.write(f"{name:>18}: {seconds * 1000:7.2f} мс")
+
+        self.stdout.write(f"{'без сжатия':>18}: {len(content):9d} байт")
+        seconds, compressed = _best_time(lambda: compress_string(content), repeat)
+        self.report("gzip", content, compressed, seconds)
+        if brotli is not None:
+            seconds, compressed = _best_time(
+                lambda: brotli.compress(
+                    content, mode=brotli.MODE_TEXT, quality=BROTLI_QUALITY
+                ),
+                repeat,
+            )
+            self.report(f"brotli q{BROTLI_QUALITY}", content, compressed, seconds)
+        else:
+            self.stdout.write("brotli не установлен")
+
+    def report(self, name, content, compressed, seconds):
+        """Строка отчета о сжатии"""
+        self.stdout.write(
+            f"{name:>18}: {len(compressed):9d} байт "
+            f"({len(compressed) / len(content):.0%}), {seconds * 1000:.2f} мс"
+        )
+
+    def build_page(self, count):
+        """Данные страницы списка задач, как их отдает TaskViewSet"""
+        project = Project.objects.create(
+            name="benchmark_renderers", description="Временный проект"
+        )
+        today = timezone.now().date()
+        rng = random.Random(0)  # одинаковые данные от запуска к запуску
+        Task.objects.bulk_create(
+            Task(
+                name=f"Задача {index}",
+                description=" ".join(rng.choices(WORDS, k=40)),
+                status=[code for code, _ in Task.STATUS_CHOICES][index % 4],
+                priority=str(index % 5 + 1),
+                due_date=today + timedelta(days=index % 30),
+                category="Разработка",
+                reference_link=f"https://example.com/tasks/{index}",
+                project=project,
+            )
+            for index in range(count)
+        )
+        tasks = Task.objects.filter(project=project).prefetch_related("subtasks")
+        return {
+            "next": "http://testserver/api/task/?cursor=cD0xMDAw",
+            "previous": None,
+            "results": TaskSerializer(tasks, many=True).data,
+        }
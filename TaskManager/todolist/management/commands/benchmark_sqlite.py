@@ -0,0 +1,142 @@
+""" Сравнение настроек SQLite под конкурентной нагрузкой """
+
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+
+PROFILES = {
+    "default": {},  # настройки Django по умолчанию
+    "production": settings.SQLITE_PRODUCTION_OPTIONS,
+}
+
+
+def _alias(profile):
+    return f"benchmark_{profile}"
+
+
+def _worker(profile, operations, projects, write_ratio):
+    """
+    Смешанная нагрузка: чтение задач проекта и транзакции «прочитать,
+    затем записать» (как get_or_create или save с проверками)
+    """
+    alias = _alias(profile)
+    connection = connections[alias]
+    reads = writes = locked = 0
+    started = time.perf_counter()
+    for _ in range(operations):
+        project = random.randrange(projects)
+        try:
+            if random.random() < write_ratio:
+                with transaction.atomic(using=alias):
+                    with connection.cursor() as cursor:
+                        cursor.execute(
+                            "SELECT COUNT(*) FROM benchmark WHERE project = %s",
+                            [project],
+                        )
+                        cursor.execute(
+                            "INSERT INTO benchmark (project, name, payload) "
+                            "VALUES (%s, %s, %s)",
+                            [project, f"task {cursor.fetchone()[0]}", "x" * 200],
+                        )
+                writes += 1
+            else:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT id, name, payload FROM benchmark "
+                        "WHERE project = %s ORDER BY id DESC LIMIT 20",
+                        [project],
+                    )
+                    cursor.fetchall()
+                reads += 1
+        except OperationalError:  # database is locked
+            locked += 1
+    connection.close()
+    return time.perf_counter() - started, reads, writes, locked
+
+
+class Command(BaseCommand):
+    """
+    Запускает одинаковую нагрузку в нескольких процессах на файл SQLite
+    с настройками Django по умолчанию и с SQLITE_PRODUCTION_OPTIONS
+    (WAL, synchronous=NORMAL, mmap, cache_size, BEGIN IMMEDIATE) и печатает
+    число чтений и записей в секунду и число ошибок «database is locked»
+    """
+
+    help = "Сравнивает SQLite по умолчанию и продакшен-профиль на смешанной нагрузке"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=4)
+        parser.add_argument("--operations", type=int, default=2000)
+        parser.add_argument("--projects", type=int, default=50)
+        parser.add_argument("--write-ratio", type=float, default=0.2)
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for profile, profile_options in PROFILES.items():
+                databases = connections.configure_settings(
+                    {
+                        **connections.settings,
+                        _alias(profile): {
+                            "ENGINE": "django.db.backends.sqlite3",
+                            "NAME": os.path.join(tmp_dir, f"{profile}.sqlite3"),
+                            "OPTIONS": profile_options,
+                        },
+                    }
+                )
+                connections.settings[_alias(profile)] = databases[_alias(profile)]
+                try:
+                    self.prepare(profile, options["projects"])
+                    self.run_profile(profile, options)
+                finally:
+                    connections[_alias(profile)].close()
+                    del connections[_alias(profile)]
+                    del connections.settings[_alias(profile)]
+
+    def prepare(self, profile, projects):
+        """Таблица с индексом по проекту и начальными данными"""
+        connection = connections[_alias(profile)]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE TABLE benchmark (id INTEGER PRIMARY KEY, "
+                "project INTEGER NOT NULL, name TEXT, payload TEXT)"
+            )
+            cursor.execute("CREATE INDEX benchmark_project ON benchmark (project)")
+            cursor.executemany(
+                "INSERT INTO benchmark (project, name, payload) VALUES (%s, %s, %s)",
+                [(i % projects, f"task {i}", "x" * 200) for i in range(projects * 20)],
+            )
+        # Соединение не должно переходить в дочерние процессы
+        connection.close()
+
+    def run_profile(self, profile, options):
+        """Прогон нагрузки на одном профиле"""
+        processes = options["processes"]
+        with multiprocessing.get_context("fork").Pool(processes) as pool:
+            results = pool.starmap(
+                _worker,
+                [
+                    (
+                        profile,
+                        options["operations"],
+                        options["projects"],
+                        options["write_ratio"],
+                    )
+                ]
+                * processes,
+            )
+
+        elapsed = max(seconds for seconds, *_ in results)
+        reads = sum(result[1] for result in results)
+        writes = sum(result[2] for result in results)
+        locked = sum(result[3] for result in results)
+        self.stdout.write(
+            f"{profile:>10}: чтение {reads / elapsed:8.0f}/с, "
+            f"запись {writes / elapsed:7.0f}/с, "
+            f"database is locked: {locked} из {processes * options['operations']}"
+        )
@@ -0,0 +1,99 @@
+""" Проверка планов основных запросов """
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from ...models import Task, UserPageVisit, UserProfile, UserProfileProject
+from ...stats import overdue_tasks_q, urgent_tasks_q
+
+# Признаки полного просмотра таблицы в выводе EXPLAIN
+FULL_SCAN_MARKERS = {
+    "sqlite": ("SCAN todolist_",),
+    "postgresql": ("Seq Scan on todolist_",),
+    "mysql": ("type=ALL", " ALL "),
+}
+
+
+def hot_queries(user_id, project_id):
+    """Запросы из представлений, вьюсетов и задач Celery"""
+    today = timezone.now().date()
+    return {
+        "dashboard: задачи пользователя": Task.objects.filter(
+            assignee_id=user_id
+        ).order_by("status"),
+        "stats: задачи по статусу": Task.objects.filter(
+            assignee_id=user_id, status="IN_PROGRESS"
+        ),
+        "stats: просроченные задачи": Task.objects.filter(
+            overdue_tasks_q(today), assignee_id=user_id
+        ),
+        "stats: срочные задачи": Task.objects.filter(
+            urgent_tasks_q(today), assignee_id=user_id
+        ).order_by("due_date"),
+        "project_detail: задачи проекта": Task.objects.filter(project_id=project_id),
+        "membership: проекты пользователя": UserProfileProject.objects.filter(
+            user_profile_id=user_id
+        ),
+        "api: просроченные задачи": Task.objects.get_overdue(),
+        "celery: напоминания": Task.objects.filter(
+            due_date=today + timedelta(days=1)
+        ).exclude(status="DONE"),
+        "celery: удаление просроченных": Task.objects.filter(
+            status__in=["BACKLOG", "IN_PROGRESS"], due_date__lt=today
+        ),
+        "celery: очистка посещений": UserPageVisit.objects.filter(
+            visited_at__lt=timezone.now() - timedelta(days=30)
+        ),
+    }
+
+
+class Command(BaseCommand):
+    """
+    Выполняет EXPLAIN для основных запросов и сообщает, какие из них
+    просматривают таблицу целиком. Планировщик зависит от объема данных,
+    поэтому запускать стоит на базе, близкой к рабочей.
+    """
+
+    help = "EXPLAIN основных запросов с отчетом о полных просмотрах таблиц"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", type=int, help="id пользователя для запросов")
+        parser.add_argument("--project", type=int, help="id проекта для запросов")
+        parser.add_argument(
+            "--fail-on-scan",
+            action="store_true",
+            help="Завершиться с ошибкой, если найден полный просмотр",
+        )
+
+    def handle(self, *args, **options):
+        user_id = options["user"] or UserProfile.objects.values_list(
+            "pk", flat=True
+        ).first()
+        project_id = options["project"] or Task.objects.values_list(
+            "project_id", flat=True
+        ).first()
+        markers = FULL_SCAN_MARKERS.get(connection.vendor, ())
+        verbose = options["verbosity"] > 1
+
+        full_scans = []
+        for name, queryset in hot_queries(user_id or 0, project_id or 0).items():
+            plan = queryset.explain()
+            scan = any(marker in plan for marker in markers)
+            if scan:
+                full_scans.append(name)
+                self.stdout.write(self.style.WARNING(f"FULL SCAN  {name}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"OK         {name}"))
+            if scan or verbose:
+                for line in plan.splitlines():
+                    self.stdout.write(f"           {line}")
+
+        if not markers:
+            self.stdout.write(
+                f"Бэкенд {connection.vendor}: полные просмотры не распознаются"
+            )
+        if full_scans and options["fail_on_scan"]:
+            raise CommandError(f"Полный просмотр таблицы: {', '.join(full_scans)}")
@@ -0,0 +1,27 @@
+""" Перестроение слов автодополнения """
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from ...autocomplete import SOURCES, rebuild_autocomplete
+
+
+class Command(BaseCommand):
+    """Заново заполняет AutocompleteTerm для пользователей, проектов и задач"""
+
+    help = "Перестраивает индекс автодополнения (после миграции или импорта данных)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--type",
+            choices=list(SOURCES),
+            action="append",
+            help="Перестроить только указанный тип (можно повторять)",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        for kind in options["type"] or SOURCES:
+            with transaction.atomic():
+                total = rebuild_autocomplete(kind, batch_size=options["batch_size"])
+            self.stdout.write(self.style.SUCCESS(f"{kind}: {total}"))
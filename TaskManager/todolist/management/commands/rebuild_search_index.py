@@ -0,0 +1,34 @@
+""" Перестроение полнотекстового индекса """
+
+from django.core.management.base import BaseCommand
+
+from ...models import SEARCHABLE_MODELS
+from ...search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    """Заново индексирует задачи, проекты и комментарии"""
+
+    help = (
+        "Перестраивает полнотекстовый индекс (после импорта данных, "
+        "массовых QuerySet.update() или смены алгоритма стемминга)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--model",
+            choices=[model._meta.model_name for model in SEARCHABLE_MODELS],
+            action="append",
+            help="Перестроить только индекс указанной модели (можно повторять)",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        selected = options["model"]
+        for model in SEARCHABLE_MODELS:
+            if selected and model._meta.model_name not in selected:
+                continue
+            total = rebuild_search_index(model, batch_size=options["batch_size"])
+            self.stdout.write(
+                self.style.SUCCESS(f"{model._meta.verbose_name_plural}: {total}")
+            )
@@ -0,0 +1,20 @@
+""" Сверка статистики проектов """
+
+from django.core.management.base import BaseCommand
+
+from ...stats import reconcile_project_stats
+
+
+class Command(BaseCommand):
+    """Пересчитывает ProjectStats по данным и исправляет расхождения"""
+
+    help = (
+        "Сверяет ProjectStats с задачами, подзадачами и участниками "
+        "(после миграции или ручных правок БД)"
+    )
+
+    def handle(self, *args, **options):
+        fixed, created = reconcile_project_stats()
+        self.stdout.write(
+            self.style.SUCCESS(f"Исправлено строк: {fixed}, создано: {created}")
+        )
@@ -0,0 +1,15 @@
+""" Пересчет счетчиков подзадач """
+
+from django.core.management.base import BaseCommand
+
+from ...models import Task
+
+
+class Command(BaseCommand):
+    """Заполняет Task.subtask_count по фактическому числу подзадач"""
+
+    help = "Пересчитывает Task.subtask_count (после миграции или ручных правок БД)"
+
+    def handle(self, *args, **options):
+        updated = Task.objects.recount_subtasks()
+        self.stdout.write(self.style.SUCCESS(f"Обновлено задач: {updated}"))
@@ -0,0 +1,71 @@
+""" Доступ пользователей к проектам """
+
+from django.core.cache import cache
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+
+from .models import Project, Task, UserProfileProject
+
+MEMBERSHIP_CACHE_KEY = "membership:project_ids:{user_id}"
+MEMBERSHIP_CACHE_TIMEOUT = 60 * 60
+
+
+def get_member_project_ids(request):
+    """
+    Множество id проектов, в которых состоит пользователь запроса.
+    Загружается один раз за запрос и хранится в кеше между запросами;
+    кеш сбрасывается сигналами при изменении UserProfileProject.
+    """
+    project_ids = getattr(request, "_member_project_ids", None)
+    if project_ids is not None:
+        return project_ids
+
+    user_id = request.user.pk
+    if user_id is None:
+        project_ids = frozenset()
+    else:
+        key = MEMBERSHIP_CACHE_KEY.format(user_id=user_id)
+        project_ids = cache.get(key)
+        if project_ids is None:
+            project_ids = frozenset(
+                UserProfileProject.objects.filter(user_profile_id=user_id)
+                .values_list("project_id", flat=True)
+            )
+            cache.set(key, project_ids, MEMBERSHIP_CACHE_TIMEOUT)
+    request._member_project_ids = project_ids  # pylint: disable=protected-access
+    return project_ids
+
+
+def is_project_member(request, project_id):
+    """Состоит ли пользователь запроса в проекте"""
+    return project_id in get_member_project_ids(request)
+
+
+def get_member_project_or_404(request, pk):
+    """Проект по pk, если пользователь в нем состоит, иначе 404"""
+    try:
+        project_id = int(pk)
+    except (TypeError, ValueError) as exc:
+        raise Http404 from exc
+    if not is_project_member(request, project_id):
+        raise Http404("Проект не найден")
+    return get_object_or_404(Project, pk=project_id)
+
+
+def get_member_task_or_404(request, pk, queryset=Task):
+    """Задача по pk, если пользователь состоит в ее проекте, иначе 404"""
+    task = get_object_or_404(queryset, pk=pk)
+    if not is_project_member(request, task.project_id):
+        raise Http404("Задача не найдена")
+    return task
+
+
+def invalidate_memberships(user_ids):
+    """Сброс закешированных проектов пользователей"""
+    cache.delete_many(
+        [
+            MEMBERSHIP_CACHE_KEY.format(user_id=user_id)
+            for user_id in set(user_ids)
+            if user_id is not None
+        ]
+    )
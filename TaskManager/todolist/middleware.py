@@ -1,9 +1,120 @@
 import json
-from django.core.cache import cache
 from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
 from django_redis import get_redis_connection
 from django.conf import settings
 
+from .caching import push_page_visit
+from .db_routers import replica_reads
+
+try:
+    import brotli
+except ImportError:  # без brotli сжимаем только gzip
+    brotli = None
+
+REPLICA_PIN_COOKIE = "db_primary"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+BROTLI_QUALITY = 5  # на лету: почти как 11 по размеру, но в разы быстрее
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Чтение с реплик для безопасных запросов. Запросы с записью читают
+    из основной базы, а ответ ставит куку, по которой следующие
+    REPLICA_PIN_SECONDS секунд клиент тоже читает из основной базы
+    (свои изменения видны, пока реплика отстает)
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        pinned = (
+            request.method not in SAFE_METHODS
+            or REPLICA_PIN_COOKIE in request.COOKIES
+        )
+        with replica_reads(enabled=not pinned) as state:
+            response = self.get_response(request)
+        if state.wrote:
+            response.set_cookie(
+                REPLICA_PIN_COOKIE,
+                "1",
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+
+def accepted_encodings(header):
+    """Кодировки из Accept-Encoding, которые клиент принимает (q > 0)"""
+    accepted = set()
+    for item in header.split(","):
+        name, *params = [part.strip() for part in item.split(";")]
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name and quality > 0:
+            accepted.add(name.lower())
+    return accepted
+
+
+class CompressionMiddleware:
+    """
+    Сжатие JSON-ответов от RESPONSE_COMPRESSION_MIN_SIZE байт: brotli, если
+    он установлен и его принимает клиент, иначе gzip. Маленькие ответы
+    не сжимаются (выигрыш меньше затрат), потоковые выгрузки — тоже
+    """
+
+    max_random_bytes = 100  # gzip со случайной длиной заголовка, как GZipMiddleware
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        content_type = response.get("Content-Type", "").split(";")[0].strip()
+        if (
+            response.streaming
+            or response.has_header("Content-Encoding")
+            or not content_type.endswith("json")
+            or len(response.content) < settings.RESPONSE_COMPRESSION_MIN_SIZE
+        ):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        accepted = accepted_encodings(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if brotli is not None and "br" in accepted:
+            encoding = "br"
+            content = brotli.compress(
+                response.content, mode=brotli.MODE_TEXT, quality=BROTLI_QUALITY
+            )
+        elif accepted & {"gzip", "*"}:
+            encoding = "gzip"
+            content = compress_string(
+                response.content, max_random_bytes=self.max_random_bytes
+            )
+        else:
+            return response
+        if len(content) >= len(response.content):
+            return response
+
+        response.content = content
+        response["Content-Length"] = str(len(content))
+        response["Content-Encoding"] = encoding
+        # Сжатое тело отличается побайтно: ETag становится слабым
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        return response
+
+
 class PageVisitMiddleware:
 
     def __init__(self, get_response):
@@ -26,12 +137,8 @@ class PageVisitMiddleware:
                 redis_client = get_redis_connection("default")
                 redis_client.lpush('page_visits', json.dumps(visit_data))
             else:
-                # Fallback для не-Redis окружения
-                visits = cache.get('page_visits', [])
-                visits.insert(0, visit_data)
-                # Ограничиваем размер списка
-                visits = visits[:1000]
-                cache.set('page_visits', visits)
+                # Fallback для не-Redis окружения: буфер в общем кеше
+                push_page_visit(visit_data)
 
         except Exception as e:
             print(f"Error logging page visit: {e}")
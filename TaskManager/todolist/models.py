@@ -1,16 +1,18 @@
 """ Models """
 
 import os
+from contextlib import contextmanager
 from io import BytesIO
 
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AbstractUser
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.template.loader import get_template
 from django.urls import reverse
 from django.utils import timezone
-from django.db.models import Count
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from simple_history.models import HistoricalRecords
@@ -19,6 +21,8 @@ from xhtml2pdf.default import DEFAULT_FONT
 
 from django.conf import settings
 
+from .search import SearchEntry
+
 # class UserProfileManager(models.Manager):
 #     """Кастомный менеджер для UserProfile"""
 #
@@ -121,6 +125,10 @@ class UserPageVisit(models.Model):
         ordering = ['-visited_at']
         verbose_name = "Посещение страницы"
         verbose_name_plural = "Посещения страниц"
+        indexes = [
+            # Очистка по сроку хранения и сортировка по дате
+            models.Index(fields=["visited_at"], name="pagevisit_visited_at_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user or 'Аноним'} посетил {self.path} в {self.visited_at}"
@@ -163,7 +171,11 @@ class Project(models.Model):
 
     def get_pdf_report(self):
         """Generates PDF report for the project"""
-        if not self.tasks.exists():
+        from .stats import get_project_stats  # pylint: disable=import-outside-toplevel
+
+        # Сводка — из счетчиков проекта, без отдельных подсчетов по задачам
+        stats = get_project_stats(self)
+        if not stats.tasks_total:
             raise ValidationError("No tasks for report.")
 
         # Словари для перевода
@@ -223,6 +235,11 @@ class Project(models.Model):
             "project": project_data,  # теперь передаем как project
             "tasks": tasks_translated,
             "members": self.members.all(),
+            "stats": stats,
+            "status_counts": [
+                (TASK_STATUS_TRANSLATION.get(code, code), count)
+                for code, count in stats.tasks_by_status.items()
+            ],
         }
 
         html = template.render(context)
@@ -270,23 +287,251 @@ class UserProfileProject(models.Model):
     history = HistoricalRecords()
 
 
+class UniqueConstraintMessagesMixin:
+    """
+    Сообщения об ошибках уникальности берутся из violation_error_message
+    UniqueConstraint модели: и при валидации (full_clean, формы, админка),
+    и при IntegrityError, когда проверку выполнила сама база
+    """
+
+    @classmethod
+    def _unique_constraints(cls):
+        return [
+            constraint
+            for constraint in cls._meta.constraints
+            if isinstance(constraint, models.UniqueConstraint) and constraint.fields
+        ]
+
+    def unique_error_message(self, model_class, unique_check):
+        for constraint in self._unique_constraints():
+            if tuple(constraint.fields) == tuple(unique_check):
+                return ValidationError(
+                    constraint.violation_error_message, code="unique"
+                )
+        return super().unique_error_message(model_class, unique_check)
+
+    @classmethod
+    def unique_violation_error(cls, exc):
+        """
+        ValidationError для IntegrityError, вызванного нарушением
+        UniqueConstraint модели, или None, если ошибка другая.
+        PostgreSQL и MySQL называют ограничение по имени, SQLite — по столбцам.
+        """
+        message = str(exc)
+        # SQLite: «UNIQUE constraint failed: таблица.столбец, ...»
+        failed_columns = message.partition("UNIQUE constraint failed: ")[2]
+        table = cls._meta.db_table
+        for constraint in cls._unique_constraints():
+            columns = ", ".join(
+                f"{table}.{cls._meta.get_field(name).column}"
+                for name in constraint.fields
+            )
+            if constraint.name in message or failed_columns == columns:
+                return ValidationError(
+                    {constraint.fields[-1]: constraint.violation_error_message},
+                    code="unique",
+                )
+        return None
+
+    @classmethod
+    @contextmanager
+    def unique_violations(cls):
+        """
+        Запись одним запросом без предварительных exists(): нарушение
+        уникальности превращается в ValidationError с сообщением ограничения
+        """
+        try:
+            with transaction.atomic():
+                yield
+        except IntegrityError as exc:
+            error = cls.unique_violation_error(exc)
+            if error is None:
+                raise
+            raise error from exc
+
+
+class DirtyFieldsMixin:
+    """
+    Отслеживание изменений полей относительно значений, загруженных из БД.
+    save() без update_fields пишет только измененные столбцы, а если
+    ничего не изменилось, не обращается к базе вовсе (нет ни UPDATE,
+    ни post_save, ни исторической записи)
+    """
+
+    # Поля, которые обычное сохранение никогда не записывает
+    untracked_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def _tracked_fields(self):
+        return [
+            field
+            for field in self._meta.concrete_fields
+            if not field.primary_key and field.name not in self.untracked_fields
+        ]
+
+    def _field_changed(self, field):
+        loaded_values = getattr(self, "_loaded_values", None)
+        if loaded_values is None or field.attname not in loaded_values:
+            # Экземпляр не из БД или поле было отложено (defer/only):
+            # изменено, только если значение присвоено
+            return loaded_values is None or field.attname in self.__dict__
+        if field.attname not in self.__dict__:
+            return False
+        current = self.__dict__[field.attname]
+        if getattr(current, "_committed", True) is False:  # новый файл
+            return True
+        try:
+            return field.to_python(current) != field.to_python(
+                loaded_values[field.attname]
+            )
+        except ValidationError:
+            return True
+
+    def get_dirty_fields(self):
+        """Имена полей, значения которых отличаются от загруженных из БД"""
+        return [
+            field.name for field in self._tracked_fields() if self._field_changed(field)
+        ]
+
+    def has_changed(self, field_name):
+        """Изменилось ли поле с момента загрузки из БД"""
+        return self._field_changed(self._meta.get_field(field_name))
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if (
+            not self._state.adding
+            and update_fields is None
+            and not kwargs.get("force_insert")
+            and getattr(self, "_loaded_values", None) is not None
+        ):
+            update_fields = self.get_dirty_fields()
+            if not update_fields:
+                return
+            update_fields += [
+                field.name
+                for field in self._tracked_fields()
+                if getattr(field, "auto_now", False) and field.name not in update_fields
+            ]
+            kwargs["update_fields"] = update_fields
+        elif update_fields is None and not self._state.adding:
+            # Снимка нет: пишем все поля, кроме неотслеживаемых
+            kwargs["update_fields"] = [
+                field.name for field in self._tracked_fields()
+            ]
+        super().save(*args, **kwargs)
+        self._remember_saved_values(kwargs.get("update_fields"))
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(
+            using=using, fields=fields, from_queryset=from_queryset
+        )
+        if fields is not None:
+            fields = [self._meta.get_field(name).name for name in fields]
+        self._remember_saved_values(fields)
+
+    def _remember_saved_values(self, update_fields=None):
+        """После сохранения текущие значения становятся исходными"""
+        loaded_values = getattr(self, "_loaded_values", None) or {}
+        for field in self._meta.concrete_fields:
+            if update_fields is not None and field.name not in update_fields:
+                continue
+            if field.attname in self.__dict__:
+                value = self.__dict__[field.attname]
+                loaded_values[field.attname] = getattr(value, "name", value)
+        self._loaded_values = loaded_values
+
+
+class TaskHistoryChanges(models.Model):
+    """
+    Дополнительные поля исторической записи задачи.
+    Изменения относительно предыдущей записи считаются один раз при
+    создании записи (сигнал pre_create_historical_record), а не при каждом
+    просмотре истории. None — дифф еще не посчитан (записи, созданные
+    до появления поля); он досчитывается при первом обращении.
+    """
+
+    changes = models.JSONField("Изменения", null=True, blank=True)
+
+    class Meta:
+        # pylint: disable=too-few-public-methods
+        """Meta"""
+        abstract = True
+
+    def compute_changes(self, previous):
+        """Изменения полей относительно предыдущей исторической записи"""
+        if previous is None:
+            return []
+        delta = self.diff_against(previous, excluded_fields=["updated_at"])
+        # Сравниваем строки: у еще не сохраненной записи файл — FieldFile(None),
+        # а у прочитанной из базы — пустая строка
+        return [
+            {"field": change.field, "old": str(change.old), "new": str(change.new)}
+            for change in delta.changes
+            if str(change.old) != str(change.new)
+        ]
+
+    def get_changes(self):
+        """Посчитанные изменения; старые записи досчитываются и сохраняются"""
+        if self.changes is None:
+            self.changes = self.compute_changes(self.prev_record)
+            type(self).objects.filter(pk=self.pk).update(changes=self.changes)
+        return self.changes
+
+    def get_changes_display(self):
+        """Изменения в читаемом виде"""
+        return ", ".join(
+            f"{self.instance_type._meta.get_field(change['field']).verbose_name}: "
+            f"с '{change['old']}' на '{change['new']}'"
+            for change in self.get_changes()
+        )
+
+
 class TaskManager(models.Manager):
     """Модельный менеджер Класс TaskManager"""
 
     # pylint: disable=too-few-public-methods
     def get_overdue(self):
         """Возвращает список задач, которые должны быть выполнены срочно"""
-        return self.filter(
-            due_date__lt=timezone.now().date(),
-            status__in=["NEW", "BACKLOG", "IN_PROGRESS"],
-        )
+        # exclude(status="DONE"), а не status__in открытых статусов:
+        # так условие совпадает с частичными индексами по открытым задачам
+        return self.filter(due_date__lt=timezone.now().date()).exclude(status="DONE")
 
     def total_tasks(self):
         """Возвращает общее количество задач."""
         return self.aggregate(total=Count("id"))["total"]
 
+    def change_subtask_count(self, task_id, delta):
+        """
+        Атомарно меняет счетчик подзадач одним UPDATE с F().
+        Увеличение выполняется только если лимит не достигнут;
+        возвращает число обновленных строк (0 — лимит исчерпан).
+        """
+        tasks = self.filter(pk=task_id)
+        if delta > 0:
+            tasks = tasks.filter(subtask_count__lte=Task.MAX_SUBTASKS - delta)
+        else:
+            tasks = tasks.filter(subtask_count__gte=-delta)
+        return tasks.update(subtask_count=F("subtask_count") + delta)
+
+    def recount_subtasks(self):
+        """Пересчитывает счетчики подзадач всех задач одним запросом"""
+        counts = (
+            Subtask.objects.filter(task=OuterRef("pk"))
+            .order_by()
+            .values("task")
+            .annotate(count=Count("pk"))
+            .values("count")
+        )
+        return self.update(subtask_count=Coalesce(Subquery(counts), 0))
+
 
-class Task(models.Model):
+class Task(DirtyFieldsMixin, UniqueConstraintMessagesMixin, models.Model):
     """Модель Task"""
 
     STATUS_CHOICES = [
@@ -342,6 +587,15 @@ class Task(models.Model):
         related_name="assigned_tasks",
     )
     category = models.CharField("Категория", max_length=100)
+    # Меняется только через TaskManager.change_subtask_count (F()-выражения)
+    subtask_count = models.PositiveSmallIntegerField(
+        "Количество подзадач", default=0, editable=False
+    )
+
+    MAX_SUBTASKS = 5
+    # Счетчик подзадач меняется только F()-выражениями; обычное
+    # сохранение задачи не должно перезаписать его устаревшим значением
+    untracked_fields = ("subtask_count",)
 
     @property
     def get_subtasks(self):
@@ -351,37 +605,44 @@ class Task(models.Model):
         )  # используем related_name='subtasks' из модели Subtask
 
     def validate_subtasks_count(self):
-        """Проверка количества подзадач"""
-        subtask_count = self.subtasks.count()  # используем related_name='subtasks'
-        if subtask_count > 5:
+        """Проверка количества подзадач (по счетчику, без запроса)"""
+        if self.subtask_count > self.MAX_SUBTASKS:
             raise ValidationError({"subtasks": "Максимальное количество подзадач - 5"})
 
-    def get_history_changes(self):
-        """Метод для получения изменений в читаемом виде"""
+    def history_records(self):
+        """
+        Исторические записи с изменениями (новые сверху) вместе с автором.
+        Записи без посчитанного диффа (None) тоже попадают в выборку.
+        """
+        return (
+            self.history.filter(history_type="~")
+            .exclude(changes=[])
+            .select_related("history_user")
+        )
+
+    def get_history_changes(self, records=None):
+        """
+        Метод для получения изменений в читаемом виде.
+        records — страница из history_records(); по умолчанию вся история.
+        """
+        if records is None:
+            records = self.history_records()
         changes = []
-        records = self.history.all()
-        for i in range(len(records) - 1):
-            new_record = records[i]
-            old_record = records[i + 1]
-            delta = new_record.diff_against(old_record)
-
-            changes_list = []
-            for change in delta.changes:
-                if change.field == "updated_at":
-                    continue
-                field_name = self._meta.get_field(change.field).verbose_name
-                changes_list.append(f"{field_name}: с '{change.old}' на '{change.new}'")
-
-            if changes_list:
+        for record in records:
+            changes_display = record.get_changes_display()
+            if changes_display:
                 changes.append(
                     {
-                        "date": new_record.history_date,
-                        "changes": ", ".join(changes_list),
+                        "date": record.history_date,
+                        "user": record.history_user,
+                        "changes": changes_display,
                     }
                 )
         return changes
 
-    history = HistoricalRecords()
+    history = HistoricalRecords(
+        bases=[TaskHistoryChanges], excluded_fields=["subtask_count"]
+    )
 
     objects = TaskManager()
 
@@ -393,32 +654,14 @@ class Task(models.Model):
             if self.due_date < timezone.now().date():
                 raise ValidationError({"due_date": "Дата не может быть в прошлом"})
         elif self.pk:  # Для существующих задач
-            original_task = Task.objects.get(pk=self.pk)
-            # Проверяем дату только если она была изменена
+            # Проверяем дату только если она была изменена (по снимку, без запроса)
             if (
-                self.due_date != original_task.due_date
+                self.has_changed("due_date")
                 and self.due_date < timezone.now().date()
             ):
                 raise ValidationError({"due_date": "Дата не может быть в прошлом"})
 
-        # Проверка уникальности имени
-        if self.name:
-            exists_query = Task.objects.filter(
-                name=self.name,
-                project=self.project,  # Добавляем проверку в рамках проекта
-            )
-            if self.pk:
-                exists_query = exists_query.exclude(pk=self.pk)
-            if exists_query.exists():
-                raise ValidationError(
-                    {"name": "Задача с таким названием уже существует в данном проекте"}
-                )
-
-    def validate_subtasks_count(self):
-        """Проверка количества подзадач перед сохранением"""
-        subtask_count = self.subtask_set.count()
-        if subtask_count > 5:
-            raise ValidationError({"subtasks": "Максимальное количество подзадач - 5"})
+        # Уникальность названия проверяет база (Meta.constraints)
 
     def __str__(self):
         """Функция возвращает имя задачи"""
@@ -430,9 +673,62 @@ class Task(models.Model):
         verbose_name = "задачу"
         verbose_name_plural = "Задачи"
         ordering = ("due_date",)
+        constraints = [
+            # Индекс ограничения заодно обслуживает выборки задач проекта
+            models.UniqueConstraint(
+                fields=["project", "name"],
+                name="unique_task_name_per_project",
+                violation_error_message=(
+                    "Задача с таким названием уже существует в данном проекте"
+                ),
+            ),
+            models.UniqueConstraint(
+                fields=["assignee", "name"],
+                name="unique_task_name_per_assignee",
+                violation_error_message=(
+                    "Задача с таким названием уже существует для этого пользователя."
+                ),
+            ),
+            # NULL не конфликтуют друг с другом, поэтому задачи без исполнителя
+            # проверяет отдельный частичный индекс (nulls_distinct=False
+            # SQLite не поддерживает)
+            models.UniqueConstraint(
+                fields=["name"],
+                condition=models.Q(assignee__isnull=True),
+                name="unique_unassigned_task_name",
+                violation_error_message=(
+                    "Задача с таким названием уже существует для этого пользователя."
+                ),
+            ),
+        ]
+        indexes = [
+            # Дашборд, статистика и фильтры по исполнителю
+            models.Index(
+                fields=["assignee", "status"], name="task_assignee_status_idx"
+            ),
+            # Просроченные и срочные задачи пользователя
+            models.Index(
+                fields=["assignee", "due_date", "status"], name="task_assignee_due_idx"
+            ),
+            # Напоминания и удаление просроченных задач (Celery)
+            models.Index(fields=["due_date", "status"], name="task_due_status_idx"),
+            # Частичные индексы только по открытым задачам: завершенные
+            # копятся со временем, но в эти запросы не попадают.
+            # На бэкендах без поддержки условий Django их не создает.
+            models.Index(
+                fields=["assignee", "due_date"],
+                condition=~Q(status="DONE"),
+                name="task_open_assignee_due_idx",
+            ),
+            models.Index(
+                fields=["due_date"],
+                condition=~Q(status="DONE"),
+                name="task_open_due_idx",
+            ),
+        ]
 
 
-class Subtask(models.Model):
+class Subtask(UniqueConstraintMessagesMixin, models.Model):
     """Модель Subtask"""
 
     STATUS_CHOICES = [
@@ -450,22 +746,36 @@ class Subtask(models.Model):
         Task, on_delete=models.CASCADE, verbose_name="Задача", related_name="subtasks"
     )
 
+    LIMIT_MESSAGE = "Невозможно добавить подзадачу. Достигнут максимум (5 подзадач)."
+
     def clean(self):
-        """Проверка количества подзадач перед сохранением"""
-        if hasattr(self, "task") and self.task:
-            subtask_count = (
-                self.task.subtasks.count()
-            )  # используем related_name='subtasks'
-            if not self.pk and subtask_count >= 5:
-                raise ValidationError(
-                    "Невозможно добавить подзадачу. Достигнут максимум (5 подзадач)."
-                )
+        """Проверка количества подзадач перед сохранением (по счетчику задачи)"""
+        if self._state.adding and self.task_id:
+            if self.task.subtask_count >= Task.MAX_SUBTASKS:
+                raise ValidationError(self.LIMIT_MESSAGE)
         super().clean()
 
     def save(self, *args, **kwargs):
-        """Переопределение метода save для проверки количества подзадач"""
-        self.full_clean()
-        return super().save(*args, **kwargs)
+        """
+        Сохранение с учетом счетчика подзадач задачи.
+        Место под подзадачу занимается условным UPDATE в той же транзакции,
+        что и INSERT, поэтому лимит соблюдается и при параллельной записи.
+        """
+        # Уникальность названия проверяет база (Meta.constraints)
+        self.full_clean(validate_constraints=False)
+        loaded_task_id = getattr(self, "_loaded_task_id", None)
+        adding = self._state.adding
+        moved = not adding and loaded_task_id != self.task_id
+        with self.unique_violations():
+            if adding or moved:
+                if not Task.objects.change_subtask_count(self.task_id, 1):
+                    raise ValidationError(self.LIMIT_MESSAGE)
+            if moved and loaded_task_id:
+                Task.objects.change_subtask_count(loaded_task_id, -1)
+            super().save(*args, **kwargs)
+        if (adding or moved) and Subtask.task.is_cached(self):
+            self.task.subtask_count += 1
+        self._loaded_task_id = self.task_id
 
     def __str__(self):
         """Функция возвращает имя подзадачи"""
@@ -476,6 +786,15 @@ class Subtask(models.Model):
         """Meta"""
         verbose_name = "Подзадача"
         verbose_name_plural = "Подзадачи"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["task", "name"],
+                name="unique_subtask_name_per_task",
+                violation_error_message=(
+                    "Подзадача с таким именем уже существует для этой задачи."
+                ),
+            ),
+        ]
 
     history = HistoricalRecords()
 
@@ -504,3 +823,162 @@ class Comment(models.Model):
         verbose_name_plural = "Комментарии"
 
     history = HistoricalRecords()
+
+
+class ProjectStats(models.Model):
+    """
+    Счетчики проекта одной строкой: меняются сигналами на разницу (F()),
+    раз в сутки сверяются с данными задачей reconcile_project_stats.
+    Счетчики знаковые: временное расхождение не должно ломать запись.
+    """
+
+    project = models.OneToOneField(
+        Project,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="stats",
+        verbose_name="Проект",
+    )
+    tasks_total = models.IntegerField("Всего задач", default=0)
+    tasks_new = models.IntegerField("Новых", default=0)
+    tasks_backlog = models.IntegerField("В бэклоге", default=0)
+    tasks_in_progress = models.IntegerField("Выполняется", default=0)
+    tasks_done = models.IntegerField("Завершено", default=0)
+    priority_1 = models.IntegerField("1 приоритет", default=0)
+    priority_2 = models.IntegerField("2 приоритет", default=0)
+    priority_3 = models.IntegerField("3 приоритет", default=0)
+    priority_4 = models.IntegerField("4 приоритет", default=0)
+    priority_5 = models.IntegerField("5 приоритет", default=0)
+    # Относительно текущей даты: переход через полночь учитывает сверка
+    overdue_tasks = models.IntegerField("Просроченных", default=0)
+    subtasks_total = models.IntegerField("Подзадач", default=0)
+    members_count = models.IntegerField("Участников", default=0)
+    reconciled_at = models.DateTimeField("Дата сверки", null=True, blank=True)
+
+    def __str__(self):
+        return f"Статистика проекта {self.project_id}"
+
+    class Meta:
+        # pylint: disable=too-few-public-methods
+        """Meta"""
+        verbose_name = "Статистика проекта"
+        verbose_name_plural = "Статистика проектов"
+
+    @property
+    def tasks_by_status(self):
+        """Код статуса задачи -> количество"""
+        return {
+            code: getattr(self, f"tasks_{code.lower()}")
+            for code, _ in Task.STATUS_CHOICES
+        }
+
+    @property
+    def tasks_by_priority(self):
+        """Приоритет -> количество"""
+        return {
+            code: getattr(self, f"priority_{code}") for code, _ in Task.PRIORITY_CHOICES
+        }
+
+
+class AutocompleteTerm(models.Model):
+    """
+    Слово (или все название целиком) из подписи объекта в нижнем регистре
+    для автодополнения по префиксу: поиск идет диапазоном по индексу
+    (kind, term). Заполняется сигналами, см. autocomplete.py
+    """
+
+    KIND_CHOICES = [
+        ("users", "Пользователи"),
+        ("projects", "Проекты"),
+        ("tasks", "Задачи"),
+    ]
+
+    kind = models.CharField("Тип объекта", max_length=10, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField("ID объекта")
+    term = models.CharField("Слово", max_length=100)
+    label = models.CharField("Подпись", max_length=255)
+    # Проект, участникам которого виден объект (для пользователей — нет)
+    project = models.ForeignKey(
+        Project, on_delete=models.CASCADE, null=True, related_name="+"
+    )
+
+    def __str__(self):
+        return f"{self.kind}: {self.term}"
+
+    class Meta:
+        # pylint: disable=too-few-public-methods
+        """Meta"""
+        verbose_name = "Слово автодополнения"
+        verbose_name_plural = "Слова автодополнения"
+        indexes = [
+            models.Index(fields=["kind", "term"], name="autocomplete_kind_term_idx"),
+            models.Index(
+                fields=["kind", "object_id"], name="autocomplete_kind_object_idx"
+            ),
+        ]
+
+
+class TaskSearchEntry(SearchEntry):
+    """Документ поискового индекса задачи"""
+
+    task = models.OneToOneField(
+        Task,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column="rowid",
+        db_constraint=False,
+        related_name="search_entry",
+    )
+
+    title_field = "name"
+    body_field = "description"
+
+    class Meta(SearchEntry.Meta):
+        # pylint: disable=too-few-public-methods
+        """Meta"""
+        db_table = "todolist_search_task"
+
+
+class ProjectSearchEntry(SearchEntry):
+    """Документ поискового индекса проекта"""
+
+    project = models.OneToOneField(
+        Project,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column="rowid",
+        db_constraint=False,
+        related_name="search_entry",
+    )
+
+    title_field = "name"
+    body_field = "description"
+
+    class Meta(SearchEntry.Meta):
+        # pylint: disable=too-few-public-methods
+        """Meta"""
+        db_table = "todolist_search_project"
+
+
+class CommentSearchEntry(SearchEntry):
+    """Документ поискового индекса комментария"""
+
+    comment = models.OneToOneField(
+        Comment,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column="rowid",
+        db_constraint=False,
+        related_name="search_entry",
+    )
+
+    body_field = "text"
+
+    class Meta(SearchEntry.Meta):
+        # pylint: disable=too-few-public-methods
+        """Meta"""
+        db_table = "todolist_search_comment"
+
+
+# Модели с полнотекстовым индексом
+SEARCHABLE_MODELS = (Task, Project, Comment)
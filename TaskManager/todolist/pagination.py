@@ -0,0 +1,185 @@
+""" Пагинация API """
+
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+from .search import SEARCH_RANK
+
+
+class StandardResultsSetPagination(PageNumberPagination):
+    """Пагинация результатов"""
+
+    page_size = 10
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Курсорная (keyset) пагинация по стабильному порядку.
+
+    Следующая страница выбирается условием WHERE по ключу сортировки,
+    а не OFFSET, и без COUNT(*), поэтому глубокие страницы стоят столько же,
+    сколько первая. Порядок задает вьюсет: cursor_ordering по умолчанию
+    и cursor_orderings для отдельных действий; результаты полнотекстового
+    поиска сначала упорядочены по релевантности.
+
+    В отличие от CursorPagination DRF, которая хранит в курсоре только
+    первое поле сортировки и добирает одинаковые значения через OFFSET,
+    позиция — весь кортеж сортировки. Порядок всегда заканчивается
+    уникальным ключом, поэтому позиция уникальна и OFFSET не нужен даже
+    на полях с повторами (age, due_date). NULL считается меньше любого
+    значения на всех базах.
+
+    Если передан ?page=, работает обычная постраничная пагинация
+    с общим количеством (count) — для клиентов, которым нужны итоги.
+    """
+
+    page_size = 10
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ordering = ("id",)
+    page_number_class = StandardResultsSetPagination
+
+    def __init__(self):
+        self.page_number_paginator = None
+
+    def get_ordering(self, request, queryset, view):
+        default = getattr(view, "cursor_ordering", self.ordering)
+        orderings = getattr(view, "cursor_orderings", {})
+        ordering = orderings.get(getattr(view, "action", None), default)
+        ordering = (ordering,) if isinstance(ordering, str) else tuple(ordering)
+        # Результаты полнотекстового поиска — по релевантности
+        if SEARCH_RANK in queryset.query.annotations:
+            ordering = (f"-{SEARCH_RANK}", *ordering)
+        return ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.page_number_class.page_query_param in request.query_params:
+            self.page_number_paginator = self.page_number_class()
+            ordering = self.get_ordering(request, queryset, view)
+            return self.page_number_paginator.paginate_queryset(
+                queryset.order_by(*_order_by(ordering)), request, view
+            )
+        self.page_number_paginator = None
+
+        # pylint: disable=attribute-defined-outside-init
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse, position = False, None
+        if self.cursor is not None:
+            reverse, position = self.cursor.reverse, self.cursor.position
+
+        queryset = queryset.order_by(*_order_by(self.ordering, reverse))
+        if position is not None:
+            values = self._decode_position(position, queryset)
+            queryset = queryset.filter(_after_position(self.ordering, values, reverse))
+
+        # Лишняя строка — признак следующей страницы
+        results = list(queryset[: self.page_size + 1])
+        self.page = results[: self.page_size]
+        following = None
+        if len(results) > len(self.page):
+            following = self._get_position_from_instance(results[-1], self.ordering)
+
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.next_position = position is not None, position
+            self.has_previous, self.previous_position = following is not None, following
+        else:
+            self.has_next, self.next_position = following is not None, following
+            self.has_previous, self.previous_position = position is not None, position
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def _decode_position(self, position, queryset):
+        """
+        Значения полей сортировки из курсора, приведенные to_python полей:
+        подделанный курсор — 404, а не ошибка при построении запроса
+        """
+        try:
+            values = json.loads(position)
+        except ValueError as exc:
+            raise NotFound(self.invalid_cursor_message) from exc
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            return [
+                None if value is None else _ordering_field(queryset, order).to_python(
+                    value
+                )
+                for order, value in zip(self.ordering, values)
+            ]
+        except (TypeError, ValueError, ValidationError) as exc:
+            raise NotFound(self.invalid_cursor_message) from exc
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for order in ordering:
+            name = order.lstrip("-")
+            value = instance[name] if isinstance(instance, dict) else getattr(
+                instance, name
+            )
+            values.append(None if value is None else str(value))
+        return json.dumps(values, separators=(",", ":"))
+
+    def get_paginated_response(self, data):
+        if self.page_number_paginator is not None:
+            return self.page_number_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+def _ordering_field(queryset, order):
+    """Поле модели или аннотации, по которому идет сортировка"""
+    name = order.lstrip("-")
+    if name in queryset.query.annotations:
+        return queryset.query.annotations[name].output_field
+    if name == "pk":
+        return queryset.model._meta.pk
+    return queryset.model._meta.get_field(name)
+
+
+def _order_by(ordering, reverse=False):
+    """Выражения ORDER BY: NULL — меньше любого значения на всех базах"""
+    expressions = []
+    for order in ordering:
+        descending = order.startswith("-") != reverse
+        field = F(order.lstrip("-"))
+        expressions.append(
+            field.desc(nulls_last=True) if descending else field.asc(nulls_first=True)
+        )
+    return expressions
+
+
+def _after_position(ordering, values, reverse=False):
+    """
+    Условие «строка идет после позиции» для кортежа сортировки:
+    (a > x) OR (a = x AND b > y) OR ... с учетом направления и NULL
+    """
+    condition, equal = Q(pk__in=[]), Q()
+    for order, value in zip(ordering, values):
+        name = order.lstrip("-")
+        if order.startswith("-") != reverse:  # по убыванию: дальше — меньше
+            after = None if value is None else Q(**{f"{name}__lt": value}) | Q(
+                **{f"{name}__isnull": True}
+            )
+        else:
+            after = (
+                Q(**{f"{name}__isnull": False})
+                if value is None
+                else Q(**{f"{name}__gt": value})
+            )
+        if after is not None:
+            condition |= equal & after
+        equal &= Q(**{f"{name}__isnull": True} if value is None else {name: value})
+    return condition
@@ -0,0 +1,47 @@
+""" Быстрый JSON-рендерер на orjson """
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # без orjson рендерит стандартный json
+    orjson = None
+
+ORJSON_OPTIONS = (
+    orjson.OPT_NON_STR_KEYS
+    # Даты и dataclass — через JSONEncoder.default, как у DRF: ответ
+    # не зависит от того, установлен ли orjson
+    | orjson.OPT_PASSTHROUGH_DATETIME
+    | orjson.OPT_PASSTHROUGH_DATACLASS
+    if orjson
+    else 0
+)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer на orjson. Типы, которых orjson не знает (Decimal, ленивые
+    строки перевода, date/datetime, QuerySet и т.п.), приводятся тем же
+    JSONEncoder.default, что и в DRF. Отступы (Accept: ...; indent=4),
+    отсутствие orjson и ошибки orjson (целые больше 64 бит) — стандартный
+    рендеринг DRF
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            content = orjson.dumps(
+                data, default=JSONEncoder().default, option=ORJSON_OPTIONS
+            )
+        except TypeError:  # orjson.JSONEncodeError
+            return super().render(data, accepted_media_type, renderer_context)
+        # Как JSONRenderer: U+2028/U+2029 допустимы в JSON, но не в JavaScript
+        return content.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+            b"\xe2\x80\xa9", b"\\u2029"
+        )
@@ -0,0 +1,214 @@
+""" Полнотекстовый поиск по задачам, проектам и комментариям """
+
+from django.db import connection as default_connection, models, transaction
+from django.db.models import F, FloatField
+
+from .stemming import stem, stem_text, words
+
+SEARCH_RANK = "search_rank"
+SEARCH_CONFIG = "russian"  # конфигурация текстового поиска PostgreSQL
+# Вес заголовка в SQLite: заголовок повторяется в документе,
+# и BM25 считает его слова чаще встречающимися
+SQLITE_TITLE_REPEAT = 2
+
+
+class SearchDocumentField(models.TextField):
+    """
+    Поисковый документ.
+    SQLite: столбец таблицы FTS5 с основами слов (стемминг на стороне Python).
+    PostgreSQL: tsvector со словарем russian, заголовок с весом A, текст — B.
+    """
+
+    def db_type(self, connection):
+        if connection.vendor == "postgresql":
+            return "tsvector"
+        return super().db_type(connection)
+
+
+def sqlite_match_query(query):
+    """Запрос FTS5: все слова как префиксы основ (неявное AND)"""
+    return " ".join(f'"{stem(word)}"*' for word in words(query))
+
+
+def postgresql_tsquery(query):
+    """Запрос to_tsquery: все слова как префиксы"""
+    return " & ".join(f"{word}:*" for word in words(query))
+
+
+@SearchDocumentField.register_lookup
+class FullTextMatch(models.Lookup):
+    """search_entry__document__match="текст запроса" """
+
+    lookup_name = "match"
+    prepare_rhs = False
+
+    def as_sql(self, compiler, connection):
+        lhs, params = self.process_lhs(compiler, connection)
+        return f"{lhs} MATCH %s", [*params, sqlite_match_query(self.rhs)]
+
+    def as_postgresql(self, compiler, connection):
+        lhs, params = self.process_lhs(compiler, connection)
+        return (
+            f"{lhs} @@ to_tsquery('{SEARCH_CONFIG}', %s)",
+            [*params, postgresql_tsquery(self.rhs)],
+        )
+
+
+class SearchRank(models.Func):
+    """
+    Релевантность документа (чем больше, тем выше).
+    Используется в том же запросе, что и lookup match.
+    """
+
+    output_field = FloatField()
+
+    def __init__(self, expression, search_query):
+        super().__init__(expression)
+        self.search_query = search_query
+
+    def as_sql(self, compiler, connection, **extra_context):
+        # bm25() принимает имя (псевдоним) таблицы FTS5 и меньше — лучше
+        table = compiler.quote_name_unless_alias(self.source_expressions[0].alias)
+        return f"-bm25({table})", []
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        document, params = compiler.compile(self.source_expressions[0])
+        return (
+            f"ts_rank_cd({document}, to_tsquery('{SEARCH_CONFIG}', %s))",
+            [*params, postgresql_tsquery(self.search_query)],
+        )
+
+
+class SearchEntry(models.Model):
+    """
+    Запись поискового индекса. Таблицы создаются не миграциями,
+    а create_search_tables (post_migrate и команда rebuild_search_index):
+    в SQLite это виртуальная таблица FTS5, где первичный ключ — rowid.
+    """
+
+    document = SearchDocumentField()
+
+    # Поля исходной модели: заголовок весит больше текста
+    title_field = None
+    body_field = None
+
+    class Meta:
+        # pylint: disable=too-few-public-methods
+        """Meta"""
+        abstract = True
+        managed = False
+
+
+def search_entry_model(model):
+    """Модель индекса для исходной модели (по обратной связи search_entry)"""
+    return model._meta.get_field("search_entry").related_model
+
+
+def search_queryset(queryset, query):
+    """
+    Отбирает объекты, найденные в полнотекстовом индексе, и добавляет
+    релевантность search_rank. Текущая сортировка сохраняется, релевантность
+    становится последним ключом; без слов в запросе queryset не меняется
+    (как прежний icontains с пустой строкой).
+    """
+    if not words(query):
+        return queryset
+    ordering = queryset.query.order_by or queryset.model._meta.ordering
+    return (
+        queryset.filter(search_entry__document__match=query)
+        .annotate(**{SEARCH_RANK: SearchRank(F("search_entry__document"), query)})
+        .order_by(*ordering, f"-{SEARCH_RANK}")
+    )
+
+
+def _document_parts(entry_model, obj):
+    title = getattr(obj, entry_model.title_field) if entry_model.title_field else ""
+    return title or "", getattr(obj, entry_model.body_field) or ""
+
+
+def _sqlite_document(title, body):
+    return " ".join([stem_text(title)] * SQLITE_TITLE_REPEAT + [stem_text(body)])
+
+
+def index_objects(model, objects, connection=default_connection):
+    """Добавляет или обновляет документы объектов в индексе"""
+    entry_model = search_entry_model(model)
+    table = connection.ops.quote_name(entry_model._meta.db_table)
+    rows = [(obj.pk, *_document_parts(entry_model, obj)) for obj in objects]
+    if not rows:
+        return
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.executemany(
+                f"INSERT INTO {table} (rowid, document) VALUES (%s, "
+                f"setweight(to_tsvector('{SEARCH_CONFIG}', %s), 'A') || "
+                f"setweight(to_tsvector('{SEARCH_CONFIG}', %s), 'B')) "
+                "ON CONFLICT (rowid) DO UPDATE SET document = EXCLUDED.document",
+                rows,
+            )
+        else:
+            cursor.executemany(
+                f"INSERT OR REPLACE INTO {table} (rowid, document) VALUES (%s, %s)",
+                [(pk, _sqlite_document(title, body)) for pk, title, body in rows],
+            )
+
+
+def unindex_objects(model, pks, connection=default_connection):
+    """Удаляет документы объектов из индекса"""
+    pks = list(pks)
+    if not pks:
+        return
+    table = connection.ops.quote_name(search_entry_model(model)._meta.db_table)
+    placeholders = ", ".join(["%s"] * len(pks))
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {table} WHERE rowid IN ({placeholders})", pks)
+
+
+def create_search_tables(models_to_index, connection=default_connection):
+    """Создает таблицы индекса, если их нет"""
+    with connection.cursor() as cursor:
+        for model in models_to_index:
+            db_table = search_entry_model(model)._meta.db_table
+            table = connection.ops.quote_name(db_table)
+            if connection.vendor == "postgresql":
+                cursor.execute(
+                    f"CREATE TABLE IF NOT EXISTS {table} "
+                    "(rowid bigint PRIMARY KEY, document tsvector NOT NULL)"
+                )
+                cursor.execute(
+                    f"CREATE INDEX IF NOT EXISTS {db_table}_gin "
+                    f"ON {table} USING gin (document)"
+                )
+            else:
+                cursor.execute(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5("
+                    "document, tokenize = 'unicode61 remove_diacritics 2')"
+                )
+
+
+def rebuild_search_index(model, batch_size=1000, connection=default_connection):
+    """Полностью перестраивает индекс модели; возвращает число документов"""
+    entry_model = search_entry_model(model)
+    table = connection.ops.quote_name(entry_model._meta.db_table)
+    fields = [
+        name
+        for name in ("pk", entry_model.title_field, entry_model.body_field)
+        if name
+    ]
+    objects = model._default_manager.only(*fields).iterator(chunk_size=batch_size)
+
+    # В одной транзакции: до фиксации поиск работает по старому индексу
+    with transaction.atomic(using=connection.alias):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+        create_search_tables([model], connection)
+
+        batch, total = [], 0
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) >= batch_size:
+                index_objects(model, batch, connection)
+                total += len(batch)
+                batch = []
+        index_objects(model, batch, connection)
+    return total + len(batch)
@@ -1,21 +1,122 @@
 """ Сериализаторы """
 
+from contextlib import contextmanager
+
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.utils import timezone
 from rest_framework import serializers
+from rest_framework.validators import UniqueValidator
 
 from ..models import (
     Comment,
     Project,
+    ProjectStats,
     Subtask,
     Task,
     UserBIO,
     UserProfile,
     UserProfileProject,
 )
+from ..stats import get_project_stats
+
+
+class ExpandableFieldsMixin:
+    """
+    Раскрытие связей по запросу (?expand=project,assignee,...).
+
+    expandable_fields: имя раскрытия -> фабрика поля сериализатора.
+    Список запрошенных раскрытий вьюсет передает в context["expand"];
+    загрузку связанных данных (select_related/prefetch/аннотации)
+    выполняет вьюсет, сериализатор только подменяет представление.
+    """
+
+    expandable_fields = {}
+
+    def get_fields(self):
+        fields = super().get_fields()
+        for name in self.context.get("expand", ()):
+            if name in self.expandable_fields:
+                fields[name] = self.expandable_fields[name]()
+        return fields
+
+
+class SparseFieldsMixin:
+    """
+    Частичный ответ (?fields=a,b и ?omit=a,b).
+
+    Вьюсет передает запрошенные имена в context["fields"] и context["omit"];
+    неизвестные имена игнорируются. Сужается только корневой сериализатор
+    ответа (или элемент списка), вложенные представления отдаются целиком.
+    """
+
+    def _is_response_root(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self._is_response_root():
+            return fields
+        names = set(fields)
+        requested = names & set(self.context.get("fields", ()))
+        if requested:
+            names = requested
+        names -= set(self.context.get("omit", ()))
+        return {name: field for name, field in fields.items() if name in names}
+
+
+class UniqueConstraintsMixin:
+    """
+    Уникальность проверяет база, а не отдельные exists() перед записью.
+    Валидаторы DRF по UniqueConstraint отключаются: составные — в Meta
+    (validators = []), однопольные (UniqueValidator поля) — в get_fields,
+    а IntegrityError превращается в ошибку валидации с сообщением ограничения.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        for field in fields.values():
+            field.validators = [
+                validator
+                for validator in field.validators
+                if not isinstance(validator, UniqueValidator)
+            ]
+        return fields
+
+    @contextmanager
+    def unique_violations(self):
+        """Перевод ошибок уникальности модели в ValidationError DRF"""
+        try:
+            with self.Meta.model.unique_violations():
+                yield
+        except DjangoValidationError as exc:
+            detail = exc.message_dict if hasattr(exc, "error_dict") else exc.messages
+            raise serializers.ValidationError(detail) from exc
+
+    def create(self, validated_data):
+        with self.unique_violations():
+            return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        with self.unique_violations():
+            return super().update(instance, validated_data)
+
+
+class UserProfileShortSerializer(serializers.ModelSerializer):
+    """Краткое представление пользователя для вложения в другие объекты"""
+
+    class Meta:
+        """Meta"""
+
+        # pylint: disable=too-few-public-methods
+        model = UserProfile
+        fields = ["id", "username", "first_name", "last_name", "email"]
 
 
-class UserProfileSerializer(serializers.ModelSerializer):
+class UserProfileSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Сериализаторы для профилей пользователей"""
 
     class Meta:
@@ -26,7 +127,7 @@ class UserProfileSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
-class UserBiosSerializer(serializers.ModelSerializer):
+class UserBiosSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Сериализаторы для BIO пользователей"""
 
     user = serializers.PrimaryKeyRelatedField(
@@ -68,10 +169,31 @@ class UserBiosSerializer(serializers.ModelSerializer):
         return instance
 
 
-class ProjectSerializer(serializers.ModelSerializer):
+class ProjectStatsSerializer(serializers.ModelSerializer):
+    """Сериализатор счетчиков проекта"""
+
+    class Meta:
+        # pylint: disable=too-few-public-methods
+        """Meta"""
+        model = ProjectStats
+        exclude = ["project"]
+
+
+class ProjectSerializer(
+    SparseFieldsMixin, ExpandableFieldsMixin, serializers.ModelSerializer
+):
     """Сериализатор проектов"""
 
+    # Заглушка pk для построения шаблона URL проекта одним reverse()
+    URL_PK_PLACEHOLDER = 987654321
+
     absolute_url = serializers.SerializerMethodField()
+    stats = serializers.SerializerMethodField()
+
+    expandable_fields = {
+        "members": lambda: UserProfileShortSerializer(many=True, read_only=True),
+        "tasks_count": lambda: serializers.IntegerField(read_only=True),
+    }
 
     class Meta:
         """Meta"""
@@ -81,11 +203,27 @@ class ProjectSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
     def get_absolute_url(self, obj):
-        """Получение absolute_url"""
-        return obj.get_absolute_url()
+        """
+        Получение absolute_url.
+        При many=True экземпляр сериализатора общий для всех строк,
+        поэтому reverse() выполняется один раз на весь список.
+        """
+        # pylint: disable=attribute-defined-outside-init
+        url_template = getattr(self, "_url_template", None)
+        if url_template is None:
+            placeholder = str(self.URL_PK_PLACEHOLDER)
+            url_template = Project(pk=placeholder).get_absolute_url().replace(
+                placeholder, "{pk}"
+            )
+            self._url_template = url_template
+        return url_template.format(pk=obj.pk)
+
+    def get_stats(self, obj):
+        """Счетчики проекта: одна строка ProjectStats (select_related во вьюсете)"""
+        return ProjectStatsSerializer(get_project_stats(obj)).data
 
 
-class UserProfileProjectSerializer(serializers.ModelSerializer):
+class UserProfileProjectSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Сериализатор модели UserProfileProjectSerializer"""
 
     class Meta:
@@ -95,7 +233,9 @@ class UserProfileProjectSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
-class SubtaskSerializer(serializers.ModelSerializer):
+class SubtaskSerializer(
+    SparseFieldsMixin, UniqueConstraintsMixin, serializers.ModelSerializer
+):
     """Сериализатор подзадач"""
 
     class Meta:
@@ -103,9 +243,10 @@ class SubtaskSerializer(serializers.ModelSerializer):
         """Meta"""
         model = Subtask
         fields = "__all__"
+        validators = []
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Сериализатор комментариев"""
 
     class Meta:
@@ -115,16 +256,32 @@ class CommentSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
-class TaskSerializer(serializers.ModelSerializer):
+class TaskSerializer(
+    SparseFieldsMixin,
+    ExpandableFieldsMixin,
+    UniqueConstraintsMixin,
+    serializers.ModelSerializer,
+):
     """Сериализатор задач"""
 
     subtasks = SubtaskSerializer(many=True, read_only=True)
 
+    expandable_fields = {
+        "project": lambda: ProjectSerializer(read_only=True),
+        "assignee": lambda: UserProfileShortSerializer(read_only=True),
+        # Компактная форма: ?expand=subtask_ids&omit=subtasks
+        "subtask_ids": lambda: serializers.PrimaryKeyRelatedField(
+            source="subtasks", many=True, read_only=True
+        ),
+        "comments_count": lambda: serializers.IntegerField(read_only=True),
+    }
+
     class Meta:
         # pylint: disable=too-few-public-methods
         """Meta"""
         model = Task
         fields = "__all__"
+        validators = []
 
     def validate_due_date(self, value):
         """Проверка, что дата окончания не раньше текущей"""
@@ -139,71 +296,24 @@ class TaskSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Приоритет должен быть от 1 до 5.")
         return value
 
-    def validate(self, attrs):
-        # Проверяем, существует ли уже задача с таким же именем для этого
-        task_name = attrs.get("name")
-        user = attrs.get("assignee")
-
-        # Проверяем, является ли это обновлением существующей задачи
-        if self.instance:
-            # Если это обновление, проверяем, изменилось ли имя задачи
-            if "name" in attrs and attrs["name"] != self.instance.name:
-                print("check")
-                # Проверяем существование задачи с таким же именем для этого
-                # пользователя
-                existing_task = (
-                    Task.objects.filter(name=task_name, assignee=user)
-                    .exclude(pk=self.instance.pk)
-                    .exists()
-                )
-
-                if existing_task:
-                    raise serializers.ValidationError(
-                        "Задача с таким названием уже \
-                        существует для этого пользователя."
-                    )
-        # Если это создание новой задачи
-        else:
-            # Проверяем существование задачи с таким же именем для этого
-            # пользователя
-            existing_task = Task.objects.filter(name=task_name, assignee=user).exists()
-
-            if existing_task:
-                raise serializers.ValidationError(
-                    "Задача с таким названием уже существует для этого пользователя."
-                )
-
-        return attrs
-
-    def create(self, validated_data):
-        # Создаем задачу
-        task = super().create(validated_data)
-
-        # Проверяем количество подзадач при создании
-        self.validate_subtask_count(task)
 
-        return task
+class TaskBulkItemSerializer(TaskSerializer):
+    """
+    Элемент пакетной записи задач. Проект и исполнитель принимаются как id:
+    членство и уникальность проверяются сразу для всего пакета (bulk.py),
+    а не отдельными запросами на каждый элемент
+    """
 
-    def update(self, instance, validated_data):
-        # Обновляем задачу
-        updated_task = super().update(instance, validated_data)
-
-        # Проверяем количество подзадач при обновлении
-        self.validate_subtask_count(updated_task)
-
-        return updated_task
+    project = serializers.IntegerField()
+    assignee = serializers.IntegerField(required=False, allow_null=True)
 
-    def validate_subtask_count(self, task):
-        """Получаем количество подзадач для этой задачи"""
-        subtask_count = Subtask.objects.filter(task=task).count()
-        # Проверяем, не превышает ли количество подзадач 5
-        if subtask_count > 5:
-            raise serializers.ValidationError(
-                {"subtasks": "Максимальное количество подзадач - 5."}
-            )
+    class Meta(TaskSerializer.Meta):
+        # pylint: disable=too-few-public-methods
+        """Meta"""
+        read_only_fields = ["subtask_count"]
 
 
-class SubtaskCreateSerializer(serializers.ModelSerializer):
+class SubtaskCreateSerializer(UniqueConstraintsMixin, serializers.ModelSerializer):
     """Сериализатор для создания подзадачи с проверкой лимита"""
 
     class Meta:
@@ -211,42 +321,17 @@ class SubtaskCreateSerializer(serializers.ModelSerializer):
         """Meta"""
         model = Subtask
         fields = "__all__"
+        validators = []
 
     def validate(self, attrs):
         # Валидация создания подзадачи
         task = attrs.get("task")
-        subtask_name = attrs.get("name")
-
-        # Если это создание новой подзадачи
-        if not self.instance:
-            # Проверяем, не существует ли подзадача с таким же названием для
-            # этой задачи
-            existing_subtask = Subtask.objects.filter(
-                task=task, name=subtask_name
-            ).exists()
-            if existing_subtask:
-                raise serializers.ValidationError(
-                    {"name": "Подзадача с таким именем уже существует для этой задачи."}
-                )
-        else:
-            # Если это обновление, проверяем уникальность имени подзадачи в
-            # пределах задачи
-            subtask_pk = attrs.get("pk")
-            existing_subtask = (
-                Subtask.objects.filter(task=task, name=subtask_name)
-                .exclude(pk=subtask_pk)
-                .exists()
-            )
-            if existing_subtask:
-                raise serializers.ValidationError(
-                    {"name": "Подзадача с таким именем уже существует для этой задачи."}
-                )
 
-        # Получаем количество текущих подзадач
-        subtask_count = Subtask.objects.filter(task=task).count()
+        # Уникальность названия проверяет база при сохранении
 
-        # Проверяем, не превышает ли количество подзадач 5
-        if subtask_count >= 5:
+        # Лимит проверяем по счетчику задачи; окончательно его соблюдает
+        # условный UPDATE в Subtask.save
+        if not self.instance and task and task.subtask_count >= Task.MAX_SUBTASKS:
             raise serializers.ValidationError(
                 {
                     "task": "Невозможно добавить подзадачу. \
@@ -260,12 +345,18 @@ class SubtaskCreateSerializer(serializers.ModelSerializer):
 class HistoricalTaskSerializer(serializers.ModelSerializer):
     """Сериализатор истории изменений задач"""
 
+    history_user = serializers.StringRelatedField()
+    changes = serializers.SerializerMethodField()
+
     class Meta:
         # pylint: disable=too-few-public-methods
         """Meta"""
         model = Task.history.model
         fields = (
             "id",
+            "history_id",
+            "history_user",
+            "changes",
             "history_date",
             "history_change_reason",
             "history_type",
@@ -277,3 +368,7 @@ class HistoricalTaskSerializer(serializers.ModelSerializer):
             "project",
             "assignee",
         )
+
+    def get_changes(self, obj):
+        """Изменения, посчитанные при записи истории"""
+        return obj.get_changes()
@@ -0,0 +1,383 @@
+""" Сигналы """
+
+from django.db import connections
+from django.db.models import QuerySet
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_init,
+    post_migrate,
+    post_save,
+)
+from django.dispatch import receiver
+from simple_history.signals import pre_create_historical_record
+
+from .autocomplete import index_object, remove_object
+from .caching import (
+    PROJECTS_GENERATION_KEY,
+    bump_dashboard_versions,
+    bump_generation,
+    bump_task_generations,
+    invalidate_user_profile,
+)
+from .membership import invalidate_memberships
+from .models import (
+    SEARCHABLE_MODELS,
+    Comment,
+    Project,
+    ProjectStats,
+    Subtask,
+    Task,
+    UserProfile,
+    UserProfileProject,
+)
+from .search import (
+    create_search_tables,
+    index_objects,
+    search_entry_model,
+    unindex_objects,
+)
+from .stats import (
+    TASK_STATS_FIELDS,
+    apply_stats_delta,
+    recount_members,
+    track_task_delete,
+    track_task_save,
+)
+
+
+def _task_project_id(instance):
+    """project_id задачи, к которой относится подзадача или комментарий"""
+    if instance.__class__.task.is_cached(instance):
+        return instance.task.project_id
+    return (
+        Task.objects.filter(pk=instance.task_id)
+        .values_list("project_id", flat=True)
+        .first()
+    )
+
+
+def _deleted_with_project(origin):
+    """Удаление — каскад от удаления проекта (его статистика удаляется тоже)"""
+    if isinstance(origin, QuerySet):
+        return origin.model is Project
+    return isinstance(origin, Project)
+
+
+def _deleted_in_batch(origin):
+    """
+    Пакетное удаление задач (bulk.bulk_delete_tasks): счетчики, индексы
+    и кеши по задачам и их подзадачам оно обновляет само, одним запросом
+    """
+    return getattr(origin, "batch_delete", False)
+
+
+def _project_member_ids(*project_ids):
+    """id участников проектов"""
+    return UserProfileProject.objects.filter(project_id__in=project_ids).values_list(
+        "user_profile_id", flat=True
+    )
+
+
+@receiver(post_init, sender=Task)
+def remember_task_relations(sender, instance, **kwargs):
+    """
+    Запоминаем исходные проект и исполнителя, чтобы при переносе задачи
+    сбросить кеш и у старых, и у новых владельцев
+    """
+    # pylint: disable=unused-argument, protected-access
+    instance._loaded_project_id = instance.__dict__.get("project_id")
+    instance._loaded_assignee_id = instance.__dict__.get("assignee_id")
+
+
+@receiver(post_init, sender=Subtask)
+def remember_subtask_task(sender, instance, **kwargs):
+    """Запоминаем исходную задачу подзадачи для счетчика при переносе"""
+    # pylint: disable=unused-argument, protected-access
+    instance._loaded_task_id = instance.__dict__.get("task_id")
+
+
+@receiver(post_delete, sender=Subtask)
+def decrement_subtask_count(sender, instance, origin=None, **kwargs):
+    """Уменьшение счетчика подзадач (срабатывает и при удалении через QuerySet)"""
+    # pylint: disable=unused-argument
+    if _deleted_in_batch(origin):
+        return  # задача удаляется вместе с подзадачей
+    Task.objects.change_subtask_count(instance.task_id, -1)
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def invalidate_task_responses(sender, instance, origin=None, **kwargs):
+    """Сброс кеша списков задач и дашбордов при изменении задачи"""
+    # pylint: disable=unused-argument, protected-access
+    if _deleted_in_batch(origin):
+        return
+    project_ids = {instance.project_id, instance._loaded_project_id} - {None}
+    bump_task_generations(*project_ids)
+    bump_dashboard_versions(
+        [
+            instance.assignee_id,
+            instance._loaded_assignee_id,
+            *_project_member_ids(*project_ids),
+        ]
+    )
+    instance._loaded_project_id = instance.project_id
+    instance._loaded_assignee_id = instance.assignee_id
+
+
+@receiver(pre_create_historical_record, sender=Task.history.model)
+def compute_task_history_changes(sender, instance, history_instance, **kwargs):
+    """
+    Дифф новой исторической записи задачи считается сразу при ее создании
+    относительно предыдущей записи (одна выборка по id задачи)
+    """
+    # pylint: disable=unused-argument
+    previous = None
+    if history_instance.history_type == "~":
+        previous = instance.history.first()
+    history_instance.changes = history_instance.compute_changes(previous)
+
+
+@receiver(post_save, sender=Subtask)
+@receiver(post_delete, sender=Subtask)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_task_responses_by_child(sender, instance, origin=None, **kwargs):
+    """Сброс кеша списков задач при изменении подзадачи или комментария"""
+    # pylint: disable=unused-argument
+    if _deleted_in_batch(origin):
+        return
+    bump_task_generations(_task_project_id(instance))
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_user_profile_payloads(sender, instance, **kwargs):
+    """Сброс сериализованных профилей при изменении пользователя"""
+    # pylint: disable=unused-argument
+    invalidate_user_profile(instance.pk)
+
+
+@receiver(m2m_changed, sender=UserProfile.groups.through)
+@receiver(m2m_changed, sender=UserProfile.user_permissions.through)
+def invalidate_user_profile_permissions(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    """
+    Сброс сериализованных профилей при изменении групп и прав пользователя
+    (user.groups/user_permissions и group.user_set/permission.user_set)
+    """
+    # pylint: disable=unused-argument, too-many-arguments
+    if not reverse:
+        if action.startswith("post_"):
+            invalidate_user_profile(instance.pk)
+        return
+    # при reverse=True instance — группа или право, а pk_set — id пользователей
+    if action == "pre_clear":
+        user_ids = list(instance.user_set.values_list("pk", flat=True))
+    elif action in ("post_add", "post_remove"):
+        user_ids = pk_set
+    else:
+        return
+    if user_ids:
+        invalidate_user_profile(*user_ids)
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+@receiver(post_save, sender=UserProfileProject)
+@receiver(post_delete, sender=UserProfileProject)
+@receiver(m2m_changed, sender=Project.members.through)
+def invalidate_project_validators(sender, action=None, **kwargs):
+    """Сдвиг поколения проектов (в т.ч. при изменении состава участников)"""
+    # pylint: disable=unused-argument
+    if action is None or action.startswith("post_"):
+        bump_generation(PROJECTS_GENERATION_KEY)
+
+
+@receiver(post_save, sender=Project)
+def invalidate_project_dashboards(sender, instance, **kwargs):
+    """Сброс дашбордов участников при изменении проекта"""
+    # pylint: disable=unused-argument
+    bump_dashboard_versions(_project_member_ids(instance.pk))
+
+
+@receiver(post_save, sender=UserProfileProject)
+@receiver(post_delete, sender=UserProfileProject)
+def invalidate_member_caches(sender, instance, **kwargs):
+    """
+    Сброс дашборда и списка проектов пользователя при входе в проект
+    или выходе из него
+    """
+    # pylint: disable=unused-argument
+    bump_dashboard_versions([instance.user_profile_id])
+    invalidate_memberships([instance.user_profile_id])
+
+
+@receiver(m2m_changed, sender=Project.members.through)
+def invalidate_members_caches(sender, instance, action, reverse, pk_set, **kwargs):
+    """Сброс дашбордов и списков проектов при project.members.add()/remove()/clear()"""
+    # pylint: disable=unused-argument, too-many-arguments
+    if action == "pre_clear" and not reverse:
+        user_ids = list(_project_member_ids(instance.pk))
+    elif action in ("post_add", "post_remove"):
+        # при reverse=True instance — пользователь, а pk_set — id проектов
+        user_ids = [instance.pk] if reverse else pk_set
+    elif action == "post_clear" and reverse:
+        user_ids = [instance.pk]
+    else:
+        return
+    bump_dashboard_versions(user_ids)
+    invalidate_memberships(user_ids)
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_save, sender=Project)
+@receiver(post_save, sender=Comment)
+def update_search_index(sender, instance, update_fields=None, using=None, **kwargs):
+    """Переиндексация документа; сохранение без текстовых полей его не трогает"""
+    # pylint: disable=unused-argument
+    entry_model = search_entry_model(sender)
+    if update_fields is not None and not {
+        entry_model.title_field,
+        entry_model.body_field,
+    } & set(update_fields):
+        return
+    index_objects(sender, [instance], connections[using])
+
+
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=Comment)
+def remove_from_search_index(
+    sender, instance, using=None, origin=None, **kwargs
+):
+    """Удаление документа из поискового индекса"""
+    # pylint: disable=unused-argument
+    if sender is Task and _deleted_in_batch(origin):
+        return
+    unindex_objects(sender, [instance.pk], connections[using])
+
+
+@receiver(post_migrate)
+def create_search_index_tables(sender, using=None, **kwargs):
+    """Таблицы поискового индекса не описаны миграциями и создаются здесь"""
+    # pylint: disable=unused-argument
+    if sender.name == "todolist":
+        create_search_tables(SEARCHABLE_MODELS, connections[using])
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_save, sender=Project)
+@receiver(post_save, sender=Task)
+def update_autocomplete_terms(sender, instance, update_fields=None, **kwargs):
+    """Обновление слов автодополнения (вход в систему и т.п. их не трогают)"""
+    # pylint: disable=unused-argument
+    index_object(instance, update_fields)
+
+
+@receiver(post_delete, sender=UserProfile)
+@receiver(post_delete, sender=Task)
+def remove_autocomplete_terms(sender, instance, origin=None, **kwargs):
+    """Удаление слов автодополнения (термы проекта удаляет каскад по FK)"""
+    # pylint: disable=unused-argument
+    if _deleted_in_batch(origin):
+        return
+    remove_object(sender, instance.pk)
+
+
+@receiver(post_save, sender=Project)
+def create_project_stats(sender, instance, created, raw=False, **kwargs):
+    """Пустая строка статистики для нового проекта"""
+    # pylint: disable=unused-argument
+    if created and not raw:
+        ProjectStats.objects.get_or_create(project_id=instance.pk)
+
+
+@receiver(post_save, sender=Task)
+def update_project_stats_on_task_save(
+    sender, instance, created, update_fields=None, raw=False, **kwargs
+):
+    """Счетчики проекта меняются на разницу между прежней и новой задачей"""
+    # pylint: disable=unused-argument, too-many-arguments
+    if raw or (
+        update_fields is not None and not set(update_fields) & set(TASK_STATS_FIELDS)
+    ):
+        return
+    track_task_save(instance, created)
+
+
+@receiver(post_delete, sender=Task)
+def update_project_stats_on_task_delete(sender, instance, origin=None, **kwargs):
+    """Вычитание задачи из счетчиков (кроме удаления вместе с проектом)"""
+    # pylint: disable=unused-argument
+    if not _deleted_with_project(origin) and not _deleted_in_batch(origin):
+        track_task_delete(instance)
+
+
+@receiver(post_save, sender=Subtask)
+def update_project_stats_on_subtask_save(sender, instance, created, **kwargs):
+    """Подзадачи проекта: новая или перенесенная в задачу другого проекта"""
+    # pylint: disable=unused-argument, protected-access
+    loaded_task_id = instance._loaded_task_id
+    if created:
+        apply_stats_delta(_task_project_id(instance), {"subtasks_total": 1})
+    elif loaded_task_id and loaded_task_id != instance.task_id:
+        old_project_id = (
+            Task.objects.filter(pk=loaded_task_id)
+            .values_list("project_id", flat=True)
+            .first()
+        )
+        new_project_id = _task_project_id(instance)
+        if old_project_id != new_project_id:
+            apply_stats_delta(old_project_id, {"subtasks_total": -1})
+            apply_stats_delta(new_project_id, {"subtasks_total": 1})
+
+
+@receiver(post_delete, sender=Subtask)
+def update_project_stats_on_subtask_delete(sender, instance, origin=None, **kwargs):
+    """Вычитание подзадачи из счетчиков (кроме удаления вместе с проектом)"""
+    # pylint: disable=unused-argument
+    if not _deleted_with_project(origin) and not _deleted_in_batch(origin):
+        apply_stats_delta(_task_project_id(instance), {"subtasks_total": -1})
+
+
+@receiver(post_save, sender=UserProfileProject)
+def update_project_stats_on_member_save(sender, instance, created, **kwargs):
+    """Новый участник проекта"""
+    # pylint: disable=unused-argument
+    if created:
+        apply_stats_delta(instance.project_id, {"members_count": 1})
+
+
+@receiver(post_delete, sender=UserProfileProject)
+def update_project_stats_on_member_delete(sender, instance, origin=None, **kwargs):
+    """Участник вышел из проекта (кроме удаления вместе с проектом)"""
+    # pylint: disable=unused-argument
+    if not _deleted_with_project(origin):
+        apply_stats_delta(instance.project_id, {"members_count": -1})
+
+
+@receiver(m2m_changed, sender=Project.members.through)
+def update_project_stats_on_members_change(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    """
+    project.members.add()/remove()/clear() идут в обход post_save связи,
+    поэтому число участников затронутых проектов пересчитывается
+    """
+    # pylint: disable=unused-argument, too-many-arguments, protected-access
+    if action == "pre_clear" and reverse:
+        # instance — пользователь: его проекты запоминаем до очистки
+        instance._cleared_project_ids = list(
+            UserProfileProject.objects.filter(user_profile=instance).values_list(
+                "project_id", flat=True
+            )
+        )
+    elif action in ("post_add", "post_remove"):
+        recount_members(*(pk_set if reverse else [instance.pk]))
+    elif action == "post_clear" and reverse:
+        recount_members(*instance.__dict__.pop("_cleared_project_ids", []))
+    elif action == "post_clear":
+        recount_members(instance.pk)
@@ -0,0 +1,331 @@
+""" Статистика дашборда и счетчики проектов """
+
+from collections import Counter, defaultdict
+from dataclasses import asdict, dataclass, field
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .caching import get_dashboard_version
+from .models import Project, ProjectStats, Subtask, Task, UserProfileProject
+
+ACTIVE_PROJECT_STATUSES = ["NEW", "IN_PROGRESS"]
+URGENT_TASK_STATUSES = ["NEW", "IN_PROGRESS"]
+
+TASK_STATUS_COLUMNS = {code: f"tasks_{code.lower()}" for code, _ in Task.STATUS_CHOICES}
+TASK_PRIORITY_COLUMNS = {code: f"priority_{code}" for code, _ in Task.PRIORITY_CHOICES}
+# Поля задачи, от которых зависят счетчики проекта
+TASK_STATS_FIELDS = ("status", "priority", "due_date", "project")
+PROJECT_STATS_COUNTERS = [
+    "tasks_total",
+    *TASK_STATUS_COLUMNS.values(),
+    *TASK_PRIORITY_COLUMNS.values(),
+    "overdue_tasks",
+    "subtasks_total",
+    "members_count",
+]
+
+
+def urgent_tasks_q(today):
+    """Условие срочной задачи (срок — через 3 дня и позже, как раньше в шаблонах)"""
+    return Q(due_date__gte=today + timedelta(days=3), status__in=URGENT_TASK_STATUSES)
+
+
+def overdue_tasks_q(today):
+    """Условие просроченной незавершенной задачи (совпадает с частичными индексами)"""
+    return Q(due_date__lt=today) & ~Q(status="DONE")
+
+
+@dataclass(frozen=True)
+class DashboardStats:
+    """Числа для дашборда пользователя"""
+
+    tasks_by_status: dict = field(default_factory=dict)  # код статуса -> количество
+    assigned_tasks: int = 0
+    urgent_tasks: int = 0
+    overdue_tasks: int = 0
+    total_projects: int = 0
+    active_projects: int = 0
+    completed_projects: int = 0
+    total_tasks: int = 0  # задачи во всех проектах пользователя
+
+    def count_by_display(self, status_display):
+        """Количество задач по отображаемому названию статуса"""
+        status_dict = {v: k for k, v in Task.STATUS_CHOICES}
+        return self.tasks_by_status.get(status_dict.get(status_display), 0)
+
+    def as_dict(self):
+        """Словарь для JSON-ответа"""
+        return asdict(self)
+
+
+def get_dashboard_stats(user):
+    """
+    Считает статистику дашборда постоянным числом запросов: одна условная
+    агрегация по назначенным задачам и одна по проектам (со счетчиками
+    ProjectStats), независимо от количества статусов и проектов.
+    Результат запоминается на объекте пользователя вместе с версией
+    дашборда, поэтому все теги шаблона в рамках запроса читают один и тот же
+    объект, а запись в том же запросе (сигналы сдвигают версию) приводит
+    к пересчету.
+    """
+    version = get_dashboard_version(user.pk)
+    memo = getattr(user, "_dashboard_stats", None)
+    if memo is not None and memo[0] == version:
+        return memo[1]
+
+    today = timezone.now().date()
+    member_projects = UserProfileProject.objects.filter(user_profile=user).values(
+        "project_id"
+    )
+    assigned = Q(assignee=user)
+
+    task_counts = (
+        Task.objects.filter(assigned)
+        .order_by()
+        .aggregate(
+            assigned_tasks=Count("pk", filter=assigned),
+            urgent_tasks=Count("pk", filter=assigned & urgent_tasks_q(today)),
+            overdue_tasks=Count("pk", filter=assigned & overdue_tasks_q(today)),
+            **{
+                f"status_{code}": Count("pk", filter=assigned & Q(status=code))
+                for code, _ in Task.STATUS_CHOICES
+            },
+        )
+    )
+    project_counts = (
+        Project.objects.filter(pk__in=member_projects)
+        .order_by()
+        .aggregate(
+            total_projects=Count("pk"),
+            active_projects=Count(
+                "pk", filter=Q(status__in=ACTIVE_PROJECT_STATUSES)
+            ),
+            completed_projects=Count("pk", filter=Q(status="DONE")),
+            # Задачи проектов — из счетчиков ProjectStats, без обхода задач
+            total_tasks=Coalesce(Sum("stats__tasks_total"), 0),
+        )
+    )
+
+    stats = DashboardStats(
+        tasks_by_status={
+            code: task_counts.pop(f"status_{code}") for code, _ in Task.STATUS_CHOICES
+        },
+        **task_counts,
+        **project_counts,
+    )
+    user._dashboard_stats = (version, stats)  # pylint: disable=protected-access
+    return stats
+
+
+def task_stats_columns(status, priority, due_date, today=None):
+    """Вклад одной задачи в счетчики проекта: поле -> 1"""
+    today = today or timezone.now().date()
+    due_date = Task._meta.get_field("due_date").to_python(due_date)
+    columns = Counter(tasks_total=1)
+    if status in TASK_STATUS_COLUMNS:
+        columns[TASK_STATUS_COLUMNS[status]] += 1
+    if priority in TASK_PRIORITY_COLUMNS:
+        columns[TASK_PRIORITY_COLUMNS[priority]] += 1
+    if due_date and due_date < today and status != "DONE":
+        columns["overdue_tasks"] += 1
+    return columns
+
+
+def apply_stats_delta(project_id, delta):
+    """
+    Прибавляет разницу к счетчикам проекта одним UPDATE с F().
+    Возвращает число обновленных строк (0 — строки статистики еще нет,
+    ее посчитает get_project_stats или ночная сверка)
+    """
+    changes = {column: F(column) + value for column, value in delta.items() if value}
+    if project_id is None or not changes:
+        return 0
+    return ProjectStats.objects.filter(pk=project_id).update(**changes)
+
+
+def task_stats_deltas(task, created):
+    """
+    Разница в счетчиках от сохранения задачи: project_id -> Counter.
+    None — прежние значения неизвестны (экземпляр без снимка)
+    """
+    new = task_stats_columns(task.status, task.priority, task.due_date)
+    if created:
+        return {task.project_id: new}
+    loaded = getattr(task, "_loaded_values", None)
+    if loaded is None:
+        return None
+    old_project_id = loaded.get("project_id", task.project_id)
+    old = task_stats_columns(
+        loaded.get("status", task.status),
+        loaded.get("priority", task.priority),
+        loaded.get("due_date", task.due_date),
+    )
+    if old_project_id == task.project_id:
+        new.subtract(old)
+        return {task.project_id: new}
+    # Подзадачи переезжают вместе с задачей
+    old["subtasks_total"] = new["subtasks_total"] = task.subtask_count
+    old_project_delta = Counter()
+    old_project_delta.subtract(old)
+    return {old_project_id: old_project_delta, task.project_id: new}
+
+
+def track_task_save(task, created):
+    """Учет создания или изменения задачи (по снимку загруженных значений)"""
+    deltas = task_stats_deltas(task, created)
+    if deltas is None:
+        # Прежние значения неизвестны: считаем проект заново
+        reconcile_project_stats([task.project_id])
+        return
+    for project_id, delta in deltas.items():
+        apply_stats_delta(project_id, delta)
+
+
+def track_tasks_save(tasks, created):
+    """Учет пакета задач: один UPDATE на проект"""
+    totals = defaultdict(Counter)
+    for task in tasks:
+        for project_id, delta in (task_stats_deltas(task, created) or {}).items():
+            totals[project_id].update(delta)
+    for project_id, delta in totals.items():
+        apply_stats_delta(project_id, delta)
+
+
+def track_task_delete(task):
+    """Учет удаления задачи"""
+    delta = Counter()
+    delta.subtract(task_stats_columns(task.status, task.priority, task.due_date))
+    apply_stats_delta(task.project_id, delta)
+
+
+def track_tasks_delete(tasks):
+    """
+    Учет удаления пакета задач вместе с их подзадачами: один UPDATE на проект
+    (сигналы подзадач при пакетном удалении счетчики не трогают)
+    """
+    totals = defaultdict(Counter)
+    for task in tasks:
+        totals[task.project_id].subtract(
+            task_stats_columns(task.status, task.priority, task.due_date)
+        )
+        totals[task.project_id]["subtasks_total"] -= task.subtask_count
+    for project_id, delta in totals.items():
+        apply_stats_delta(project_id, delta)
+
+
+def recount_members(*project_ids):
+    """Пересчитывает members_count проектов одним UPDATE"""
+    counts = (
+        UserProfileProject.objects.filter(project=OuterRef("pk"))
+        .order_by()
+        .values("project")
+        .annotate(count=Count("pk"))
+        .values("count")
+    )
+    ProjectStats.objects.filter(pk__in=project_ids).update(
+        members_count=Coalesce(Subquery(counts), 0)
+    )
+
+
+def compute_project_stats(project_ids=None, today=None):
+    """
+    Счетчики, посчитанные заново по данным: project_id -> {поле: значение}.
+    По запросу на задачи, подзадачи и участников с группировкой по проекту
+    """
+    today = today or timezone.now().date()
+    projects, tasks = Project.objects.all(), Task.objects.all()
+    subtasks, members = Subtask.objects.all(), UserProfileProject.objects.all()
+    if project_ids is not None:
+        projects = projects.filter(pk__in=project_ids)
+        tasks = tasks.filter(project_id__in=project_ids)
+        subtasks = subtasks.filter(task__project_id__in=project_ids)
+        members = members.filter(project_id__in=project_ids)
+
+    counts = {
+        pk: dict.fromkeys(PROJECT_STATS_COUNTERS, 0)
+        for pk in projects.values_list("pk", flat=True)
+    }
+    task_rows = (
+        tasks.order_by()
+        .values("project_id")
+        .annotate(
+            tasks_total=Count("pk"),
+            overdue_tasks=Count("pk", filter=overdue_tasks_q(today)),
+            **{
+                column: Count("pk", filter=Q(status=code))
+                for code, column in TASK_STATUS_COLUMNS.items()
+            },
+            **{
+                column: Count("pk", filter=Q(priority=code))
+                for code, column in TASK_PRIORITY_COLUMNS.items()
+            },
+        )
+    )
+    for row in task_rows:
+        counts.get(row.pop("project_id"), {}).update(row)
+    for project_id, subtasks_total in (
+        subtasks.order_by()
+        .values("task__project_id")
+        .annotate(count=Count("pk"))
+        .values_list("task__project_id", "count")
+    ):
+        counts.get(project_id, {})["subtasks_total"] = subtasks_total
+    for project_id, members_count in (
+        members.order_by()
+        .values("project_id")
+        .annotate(count=Count("pk"))
+        .values_list("project_id", "count")
+    ):
+        counts.get(project_id, {})["members_count"] = members_count
+    return counts
+
+
+def reconcile_project_stats(project_ids=None):
+    """
+    Сверяет счетчики с данными и исправляет расхождения (недостающие строки
+    создаются). Без project_ids — все проекты. Возвращает (исправлено, создано)
+    """
+    counts = compute_project_stats(project_ids)
+    existing = ProjectStats.objects.in_bulk(list(counts))
+    now = timezone.now()
+    to_create, to_update = [], []
+    for project_id, values in counts.items():
+        stats = existing.get(project_id)
+        if stats is None:
+            to_create.append(
+                ProjectStats(project_id=project_id, reconciled_at=now, **values)
+            )
+        elif any(getattr(stats, name) != value for name, value in values.items()):
+            for name, value in values.items():
+                setattr(stats, name, value)
+            stats.reconciled_at = now
+            to_update.append(stats)
+    with transaction.atomic():
+        ProjectStats.objects.bulk_create(to_create, ignore_conflicts=True)
+        ProjectStats.objects.bulk_update(
+            to_update, [*PROJECT_STATS_COUNTERS, "reconciled_at"], batch_size=500
+        )
+    return len(to_update), len(to_create)
+
+
+def get_project_stats(project):
+    """
+    Статистика проекта — одна строка ProjectStats (у проекта, выбранного
+    с select_related("stats"), без запроса). Если строки нет, она
+    считается по данным и сохраняется
+    """
+    if isinstance(project, Project):
+        try:
+            return project.stats
+        except ProjectStats.DoesNotExist:
+            project = project.pk
+    else:
+        stats = ProjectStats.objects.filter(pk=project).first()
+        if stats is not None:
+            return stats
+    reconcile_project_stats([project])
+    return ProjectStats.objects.get(pk=project)
@@ -0,0 +1,123 @@
+""" Стемминг русских слов (алгоритм Snowball / Портера для русского языка) """
+
+import re
+
+VOWELS = "аеиоуыэюя"
+
+PERFECTIVE_GERUND = (
+    ("ившись", "ывшись", "ивши", "ывши", "ив", "ыв"),
+    ("вшись", "вши", "в"),
+)
+ADJECTIVE = (
+    "ими", "ыми", "его", "ого", "ему", "ому", "ее", "ие", "ые", "ое", "ей",
+    "ий", "ый", "ой", "ем", "им", "ым", "ом", "их", "ых", "ую", "юю", "ая",
+    "яя", "ою", "ею",
+)
+PARTICIPLE = (("ивш", "ывш", "ующ"), ("ем", "нн", "вш", "ющ", "щ"))
+REFLEXIVE = ("ся", "сь")
+VERB = (
+    (
+        "уйте", "ейте", "ила", "ыла", "ена", "ите", "или", "ыли", "ило", "ыло",
+        "ено", "ует", "уют", "ены", "ить", "ыть", "ишь", "ей", "уй", "ил", "ыл",
+        "им", "ым", "ен", "ят", "ит", "ыт", "ую", "ю",
+    ),
+    (
+        "ете", "йте", "ешь", "нно", "ла", "на", "ли", "ем", "ло", "но", "ет",
+        "ют", "ны", "ть", "й", "л", "н",
+    ),
+)
+NOUN = (
+    "иями", "ями", "ами", "ией", "иям", "ием", "иях", "ев", "ов", "ие", "ье",
+    "еи", "ии", "ей", "ой", "ий", "ям", "ем", "ам", "ом", "ах", "ях", "ию",
+    "ью", "ия", "ья", "а", "е", "и", "й", "о", "у", "ы", "ь", "ю", "я",
+)
+SUPERLATIVE = ("ейше", "ейш")
+DERIVATIONAL = ("ость", "ост")
+
+WORD_RE = re.compile(r"[^\W_]+")
+
+
+def _region_after_vowel_pair(word, start):
+    """Начало области после первой согласной, следующей за гласной"""
+    for i in range(start + 1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            return i + 1
+    return len(word)
+
+
+def _strip(word, endings, after_a_or_ya=False):
+    """
+    Отрезает самое длинное из окончаний. Для групп, которые по алгоритму
+    должны стоять после «а» или «я», эта буква остается в основе.
+    Возвращает (основа, найдено ли окончание)
+    """
+    for ending in sorted(endings, key=len, reverse=True):
+        if word.endswith(ending):
+            stem = word[: -len(ending)]
+            if after_a_or_ya and not stem.endswith(("а", "я")):
+                return word, False
+            return stem, True
+    return word, False
+
+
+def _strip_grouped(word, groups):
+    """Окончание из первой группы или из второй (после «а»/«я»)"""
+    first, second = groups
+    stem, found = _strip(word, first)
+    if found:
+        return stem, True
+    return _strip(word, second, after_a_or_ya=True)
+
+
+def stem(word):
+    """Основа слова; слова не на кириллице возвращаются в нижнем регистре"""
+    word = word.lower().replace("ё", "е")
+    rv_start = next(
+        (i + 1 for i, char in enumerate(word) if char in VOWELS), len(word)
+    )
+    r2_start = _region_after_vowel_pair(word, _region_after_vowel_pair(word, 0))
+    prefix, rv = word[:rv_start], word[rv_start:]
+
+    # Шаг 1: деепричастие, иначе возвратная частица и прилагательное,
+    # глагол или существительное
+    rv, found = _strip_grouped(rv, PERFECTIVE_GERUND)
+    if not found:
+        rv, _ = _strip(rv, REFLEXIVE)
+        rv, found = _strip(rv, ADJECTIVE)
+        if found:
+            rv, _ = _strip_grouped(rv, PARTICIPLE)
+        else:
+            rv, found = _strip_grouped(rv, VERB)
+            if not found:
+                rv, _ = _strip(rv, NOUN)
+
+    # Шаг 2
+    if rv.endswith("и"):
+        rv = rv[:-1]
+
+    # Шаг 3: словообразовательное окончание в области R2
+    stripped, found = _strip(rv, DERIVATIONAL)
+    if found and rv_start + len(stripped) >= r2_start:
+        rv = stripped
+
+    # Шаг 4
+    if rv.endswith("нн"):
+        rv = rv[:-1]
+    else:
+        rv, found = _strip(rv, SUPERLATIVE)
+        if found and rv.endswith("нн"):
+            rv = rv[:-1]
+        elif not found and rv.endswith("ь"):
+            rv = rv[:-1]
+
+    return prefix + rv
+
+
+def words(text):
+    """Слова текста (буквы и цифры, без знаков препинания)"""
+    return WORD_RE.findall(text or "")
+
+
+def stem_text(text):
+    """Текст из основ слов через пробел"""
+    return " ".join(stem(word) for word in words(text))
@@ -11,7 +11,10 @@ from django.utils.dateparse import parse_datetime
 from django.utils.timezone import timedelta
 from django_redis import get_redis_connection
 
+from .caching import pop_page_visits
+from .db_routers import replica_reads
 from .models import Task, UserProfile, UserPageVisit  # локальные модули
+from .stats import reconcile_project_stats as reconcile_stats
 
 logger = logging.getLogger(__name__)
 # pylint: disable=logging-fstring-interpolation
@@ -28,6 +31,7 @@ def delete_expired_tasks():
 
 
 @shared_task(bind=True)
+@replica_reads()
 def send_task_reminders(_self):
     """Отправляет письма о сроке выполнения задач, которые наступят в течение дня"""
     # logger.info("Задача send_task_reminders начата")
@@ -69,6 +73,19 @@ def send_task_reminders(_self):
         raise
 
 
+@shared_task
+def reconcile_project_stats():
+    """
+    Ночная сверка счетчиков ProjectStats с данными: исправляет расхождения
+    (запись в обход сигналов, переход просроченных задач через полночь)
+    """
+    fixed, created = reconcile_stats()
+    logger.info(
+        f"Сверка статистики проектов: исправлено {fixed}, создано {created}."
+    )
+    return {"fixed": fixed, "created": created}
+
+
 @shared_task
 def archive_completed_tasks():
     """Архивирует завершенные задачи"""
@@ -104,8 +121,22 @@ def delete_inactive_users():
     UserProfile.objects.filter(last_login__lt=six_months_ago, is_staff=False).delete()
 
 
+def _build_page_visit(visit_data):
+    return UserPageVisit(
+        user_id=visit_data['user_id'],
+        path=visit_data['path'],
+        ip_address=visit_data['ip_address']
+    )
+
+
 @shared_task
 def process_page_visits():
+    if not settings.USE_REDIS:
+        # Буфер в общем кеше (см. PageVisitMiddleware)
+        visits = [_build_page_visit(visit) for visit in pop_page_visits()]
+        UserPageVisit.objects.bulk_create(visits, batch_size=100)
+        return
+
     redis_client = get_redis_connection("default")
     visits_to_create = []
 
@@ -122,11 +153,7 @@ def process_page_visits():
 
             visit_data = json.loads(raw_visit)
 
-            visits_to_create.append(UserPageVisit(
-                user_id=visit_data['user_id'],
-                path=visit_data['path'],
-                ip_address=visit_data['ip_address']
-            ))
+            visits_to_create.append(_build_page_visit(visit_data))
 
             # Записываем батчами по 100 записей
             if len(visits_to_create) >= 100:
@@ -1,51 +1,43 @@
 from django import template
-from django.db.models import Count
 from django.utils import timezone
-from ..models import Task, Project
+from ..models import Task
+from ..stats import get_dashboard_stats, overdue_tasks_q, urgent_tasks_q
 
 register = template.Library()
 
 
+def pluralize_tasks(count):
+    """Количество задач с правильным окончанием"""
+    if count % 10 == 1 and count % 100 != 11:
+        word = "задача"
+    elif 2 <= count % 10 <= 4 and (count % 100 < 10 or count % 100 >= 20):
+        word = "задачи"
+    else:
+        word = "задач"
+    return f"{count} {word}"
+
+
+@register.simple_tag
+def dashboard_stats(user):
+    """Статистика дашборда пользователя (считается один раз за запрос)"""
+    return get_dashboard_stats(user)
+
+
 @register.simple_tag
 def count_tasks_by_status(status_display, user):
     """
     Подсчитывает количество задач для определенного статуса
-    status_display - отображаемое имя статуса (например "В работе")
+    status_display - отображаемое имя статуса (например "Выполняется")
     """
-    # Получаем словарь статусов в обратном порядке (имя: код) # k = "NEW", v = "Новая"
-    status_dict = {v: k for k, v in Task.STATUS_CHOICES}
-    #     status_dict = {
-    #     "Новая": "NEW",
-    #     "В работе": "IN_PROGRESS",
-    #     "Завершена": "DONE"
-    # }
-    # Получаем код статуса по отображаемому имени
-    # Например, если status_display = "В работе" ернет "IN_PROGRESS"
-    status_code = status_dict.get(status_display)
-
-    if status_code:
-        count = Task.objects.filter(status=status_code, assignee=user).count()
-
-        # Определяем правильное окончание
-        if count % 10 == 1 and count % 100 != 11:
-            word = "задача"
-        elif 2 <= count % 10 <= 4 and (count % 100 < 10 or count % 100 >= 20):
-            word = "задачи"
-        else:
-            word = "задач"
-
-        return f"{count} {word}"
-    return "0 задач"
+    return pluralize_tasks(get_dashboard_stats(user).count_by_display(status_display))
 
 
 @register.simple_tag
 def get_overdue_tasks(user):
     """Возвращает просроченные задачи пользователя"""
     return Task.objects.filter(
-        assignee=user,
-        due_date__lt=timezone.now().date(),
-        status__in=["NEW", "BACKLOG", "IN_PROGRESS"],
-    )
+        overdue_tasks_q(timezone.now().date()), assignee=user
+    ).select_related("project")
 
 
 @register.filter
@@ -75,12 +67,11 @@ def days_overdue(due_date):
 @register.simple_tag
 def get_urgent_tasks(user):
     """Получить срочные задачи пользователя"""
-    today = timezone.now()
-    return Task.objects.filter(
-        assignee=user,
-        due_date__gte=today + timezone.timedelta(days=3),  # задачи со сроком до 3 дней
-        status__in=['NEW', 'IN_PROGRESS']  # только новые и в процессе
-    ).order_by('due_date')
+    return (
+        Task.objects.filter(urgent_tasks_q(timezone.now().date()), assignee=user)
+        .select_related("project")
+        .order_by("due_date")
+    )
 
 
 @register.inclusion_tag("dashboard/project_stats.html", takes_context=True)
@@ -88,18 +79,4 @@ def show_project_stats(context):
     """
     Показывает статистику по проектам пользователя
     """
-    user = context["request"].user
-    projects = Project.objects.filter(members=user)
-
-    stats = {
-        "total_projects": projects.count(),
-        "active_projects": projects.filter(status__in=["NEW", "IN_PROGRESS"]).count(),
-        "completed_projects": projects.filter(status="DONE").count(),
-        "total_tasks": Task.objects.filter(project__in=projects).count(),
-        "urgent_tasks": Task.objects.filter(
-        assignee=user,
-        due_date__gte=timezone.now() + timezone.timedelta(days=3),  # задачи со сроком до 3 дней
-        status__in=['NEW', 'IN_PROGRESS']).order_by('due_date').count(),
-    }
-
-    return stats
+    return get_dashboard_stats(context["request"].user).as_dict()
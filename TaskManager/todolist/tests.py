@@ -1,3 +1,990 @@
 """ тестирование """
 
-# Create your tests here.
+import base64
+import json
+import os
+import tempfile
+from datetime import timedelta
+from urllib.parse import urlencode
+
+from django.core.cache import cache, caches
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .bulk import BULK_MAX_ITEMS
+from .cache_backends import _MISSING, SQLiteCache, TwoTierCache
+
+from .models import (
+    Project,
+    ProjectStats,
+    Subtask,
+    Task,
+    TaskSearchEntry,
+    UserProfile,
+    UserProfileProject,
+)
+from .search import search_queryset
+from .stats import (
+    PROJECT_STATS_COUNTERS,
+    compute_project_stats,
+    reconcile_project_stats,
+    track_task_save,
+)
+
+LOCMEM_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TodolistTestCase(TestCase):
+    """
+    Общие данные: пользователь, проект с ним в участниках и задача.
+    Кеш — в памяти процесса и очищается перед каждым тестом
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = UserProfile.objects.create(
+            username="owner", password="secret", email="owner@example.com"
+        )
+        self.project = self.create_project("Проект")
+        self.task = self.create_task("Задача")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_project(self, name, member=True):
+        """Проект; по умолчанию пользователь теста в нем состоит"""
+        project = Project.objects.create(name=name, description="Описание")
+        if member:
+            UserProfileProject.objects.create(user_profile=self.user, project=project)
+        return project
+
+    def create_task(self, name, **fields):
+        """Задача в проекте теста со сроком через неделю"""
+        fields.setdefault("project", self.project)
+        fields.setdefault("due_date", timezone.now().date() + timedelta(days=7))
+        return Task.objects.create(
+            name=name, description="Описание задачи", category="Разработка", **fields
+        )
+
+
+class TaskHistoryChangesTest(TodolistTestCase):
+    """Дифф исторической записи задачи считается при ее создании"""
+
+    def test_created_record_has_no_changes(self):
+        self.assertEqual(self.task.history.get().changes, [])
+
+    def test_update_stores_diff(self):
+        self.task.name = "Новое название"
+        self.task.status = "IN_PROGRESS"
+        self.task.save()
+
+        record = self.task.history.first()
+        self.assertEqual(record.history_type, "~")
+        self.assertCountEqual(
+            record.changes,
+            [
+                {"field": "name", "old": "Задача", "new": "Новое название"},
+                {"field": "status", "old": "NEW", "new": "IN_PROGRESS"},
+            ],
+        )
+
+    def test_history_changes_read_without_extra_queries(self):
+        for index in range(5):
+            self.task.priority = str(index + 1)
+            self.task.save()
+
+        # Одна выборка записей вместе с авторами, без запроса на каждую запись
+        with self.assertNumQueries(1):
+            changes = self.task.get_history_changes()
+        self.assertEqual(len(changes), 4)  # приоритет 1 -> 1 ничего не меняет
+
+    def test_missing_diff_is_computed_once(self):
+        self.task.name = "Новое название"
+        self.task.save()
+        record = self.task.history.first()
+        type(record).objects.filter(pk=record.pk).update(changes=None)
+
+        record = self.task.history.first()
+        self.assertEqual(
+            record.get_changes(),
+            [{"field": "name", "old": "Задача", "new": "Новое название"}],
+        )
+        record.refresh_from_db()
+        self.assertIsNotNone(record.changes)
+
+
+class DirtyFieldsTest(TodolistTestCase):
+    """Сохранение задачи пишет только измененные поля и пропускает пустые save()"""
+
+    def history_count(self):
+        return self.task.history.count()
+
+    def test_fresh_instance_is_clean(self):
+        self.assertEqual(self.task.get_dirty_fields(), [])  # после create()
+        task = Task.objects.get(pk=self.task.pk)
+        self.assertEqual(task.get_dirty_fields(), [])
+        task.name = "Новое название"
+        self.assertEqual(task.get_dirty_fields(), ["name"])
+        task.save()
+        self.assertEqual(task.get_dirty_fields(), [])
+
+    def test_noop_save_skips_database_and_history(self):
+        before = self.history_count()
+        task = Task.objects.get(pk=self.task.pk)
+        task.name = task.name  # то же значение — не изменение
+        with self.assertNumQueries(0):
+            task.save()
+        self.assertEqual(self.history_count(), before)
+
+    def test_noop_patch_writes_no_history(self):
+        before = self.history_count()
+        response = self.client.patch(
+            f"/api/task/{self.task.pk}/", {"name": self.task.name}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.history_count(), before)
+
+        response = self.client.patch(
+            f"/api/task/{self.task.pk}/", {"status": "IN_PROGRESS"}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.history_count(), before + 1)
+        self.assertEqual(
+            [change["field"] for change in self.task.history.first().changes],
+            ["status"],
+        )
+
+    def test_partial_change_updates_only_dirty_columns(self):
+        task = Task.objects.get(pk=self.task.pk)
+        task.name = "Новое название"
+        with CaptureQueriesContext(connection) as queries:
+            task.save()
+        (update,) = [
+            query["sql"]
+            for query in queries.captured_queries
+            if query["sql"].startswith('UPDATE "todolist_task"')
+        ]
+        self.assertIn('"name"', update)
+        self.assertIn('"updated_at"', update)  # auto_now пишется вместе с правкой
+        self.assertNotIn('"description"', update)
+        self.assertNotIn('"subtask_count"', update)
+
+        # Соседнее изменение в базе не затирается устаревшим значением
+        Task.objects.filter(pk=task.pk).update(description="Изменено другим")
+        task.priority = "5"
+        task.save()
+        task.refresh_from_db()
+        self.assertEqual(task.description, "Изменено другим")
+        self.assertEqual(task.name, "Новое название")
+
+
+class SubtaskCountTest(TodolistTestCase):
+    """Счетчик подзадач задачи и лимит Task.MAX_SUBTASKS"""
+
+    def add_subtasks(self, task, count):
+        """count подзадач задачи"""
+        for index in range(count):
+            Subtask.objects.create(
+                task=task, name=f"Подзадача {index}", description="Описание"
+            )
+
+    def subtask_count(self, task):
+        """Счетчик из базы"""
+        return Task.objects.values_list("subtask_count", flat=True).get(pk=task.pk)
+
+    def test_counter_follows_create_and_delete(self):
+        self.add_subtasks(self.task, 3)
+        self.assertEqual(self.subtask_count(self.task), 3)
+
+        Subtask.objects.filter(task=self.task).first().delete()
+        self.assertEqual(self.subtask_count(self.task), 2)
+
+    def test_limit_checked_by_conditional_update(self):
+        self.add_subtasks(self.task, Task.MAX_SUBTASKS)
+        # Экземпляр с устаревшим счетчиком проходит clean(), но место
+        # под подзадачу занимает условный UPDATE — он и не дает превысить лимит
+        stale_task = Task.objects.get(pk=self.task.pk)
+        stale_task.subtask_count = 0
+        with self.assertRaisesMessage(ValidationError, Subtask.LIMIT_MESSAGE):
+            Subtask.objects.create(
+                task=stale_task, name="Лишняя", description="Описание"
+            )
+
+        self.assertEqual(self.subtask_count(self.task), Task.MAX_SUBTASKS)
+        self.assertEqual(self.task.subtasks.count(), Task.MAX_SUBTASKS)
+
+    def test_change_subtask_count_is_single_guarded_update(self):
+        Task.objects.filter(pk=self.task.pk).update(subtask_count=Task.MAX_SUBTASKS)
+        with self.assertNumQueries(1):
+            updated = Task.objects.change_subtask_count(self.task.pk, 1)
+        self.assertEqual(updated, 0)
+        self.assertEqual(Task.objects.change_subtask_count(self.task.pk, -1), 1)
+        self.assertEqual(self.subtask_count(self.task), Task.MAX_SUBTASKS - 1)
+
+    def test_moving_subtask_updates_both_counters(self):
+        other = self.create_task("Другая задача")
+        self.add_subtasks(self.task, 2)
+        subtask = self.task.subtasks.first()
+        subtask.task = other
+        subtask.save()
+
+        self.assertEqual(self.subtask_count(self.task), 1)
+        self.assertEqual(self.subtask_count(other), 1)
+
+    def test_task_save_keeps_counter(self):
+        task = Task.objects.get(pk=self.task.pk)  # счетчик 0 в экземпляре
+        self.add_subtasks(self.task, 2)
+        task.name = "Новое название"
+        task.save()
+        self.assertEqual(self.subtask_count(self.task), 2)
+
+    def test_api_rejects_subtask_over_limit(self):
+        self.add_subtasks(self.task, Task.MAX_SUBTASKS)
+        response = self.client.post(
+            "/api/subtask/",
+            {"task": self.task.pk, "name": "Лишняя", "description": "Описание"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Достигнут максимум", str(response.data["task"]))
+        self.assertEqual(self.subtask_count(self.task), Task.MAX_SUBTASKS)
+
+
+class FullTextSearchTest(TodolistTestCase):
+    """Полнотекстовый индекс задач и проектов"""
+
+    def search(self, query):
+        """id найденных задач в порядке выдачи"""
+        return list(
+            search_queryset(Task.objects.order_by(), query).values_list("pk", flat=True)
+        )
+
+    def test_word_forms_match(self):
+        self.task.description = "Проверить отчеты клиентов"
+        self.task.save()
+        self.assertEqual(self.search("отчет клиента"), [self.task.pk])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.task.description = "Обновить документацию"
+        self.task.save()
+        self.assertEqual(self.search("документация"), [self.task.pk])
+
+        self.task.description = "Подготовить релиз"
+        self.task.save()
+        self.assertEqual(self.search("документация"), [])
+        self.assertEqual(self.search("релиз"), [self.task.pk])
+
+        self.task.delete()
+        self.assertEqual(self.search("релиз"), [])
+
+    def test_title_ranks_above_description(self):
+        in_body = self.create_task("Встреча")
+        in_body.description = "Обсудить интеграцию"
+        in_body.save()
+        in_title = self.create_task("Интеграция с сервером")
+        self.assertEqual(self.search("интеграция"), [in_title.pk, in_body.pk])
+
+    def test_project_search_parameter(self):
+        found = self.create_project("Мобильное приложение")
+        response = self.client.get("/api/project/", {"search": "приложения"})
+        self.assertEqual(
+            [project["id"] for project in response.data["results"]], [found.pk]
+        )
+
+
+class ProjectStatsTest(TodolistTestCase):
+    """Счетчики ProjectStats меняются на разницу и сверяются с данными"""
+
+    def stored_stats(self, project):
+        """Счетчики из строки ProjectStats"""
+        stats = ProjectStats.objects.get(pk=project.pk)
+        return {name: getattr(stats, name) for name in PROJECT_STATS_COUNTERS}
+
+    def assertStatsConsistent(self, *projects):
+        """Счетчики совпадают с посчитанными заново по данным"""
+        expected = compute_project_stats([project.pk for project in projects])
+        for project in projects:
+            self.assertEqual(self.stored_stats(project), expected[project.pk])
+
+    def test_task_changes_adjust_counters(self):
+        stats = self.stored_stats(self.project)
+        self.assertEqual(stats["tasks_total"], 1)
+        self.assertEqual(stats["tasks_new"], 1)
+        self.assertEqual(stats["members_count"], 1)
+
+        self.task.status = "DONE"
+        self.task.priority = "5"
+        self.task.save()
+        stats = self.stored_stats(self.project)
+        self.assertEqual((stats["tasks_new"], stats["tasks_done"]), (0, 1))
+        self.assertEqual((stats["priority_1"], stats["priority_5"]), (0, 1))
+        self.assertStatsConsistent(self.project)
+
+    def test_overdue_and_subtasks(self):
+        overdue = self.create_task("Просроченная")
+        Task.objects.filter(pk=overdue.pk).update(
+            due_date=timezone.now().date() - timedelta(days=1)
+        )
+        reconcile_project_stats([self.project.pk])
+        Subtask.objects.create(task=self.task, name="Подзадача", description="Описание")
+
+        stats = self.stored_stats(self.project)
+        self.assertEqual(stats["overdue_tasks"], 1)
+        self.assertEqual(stats["subtasks_total"], 1)
+
+        overdue = Task.objects.get(pk=overdue.pk)
+        overdue.status = "DONE"
+        overdue.save()
+        self.assertEqual(self.stored_stats(self.project)["overdue_tasks"], 0)
+        self.assertStatsConsistent(self.project)
+
+    def test_moving_task_between_projects(self):
+        other = self.create_project("Другой проект")
+        Subtask.objects.create(task=self.task, name="Подзадача", description="Описание")
+        self.task.project = other
+        self.task.save()
+
+        self.assertEqual(self.stored_stats(self.project)["tasks_total"], 0)
+        self.assertEqual(self.stored_stats(self.project)["subtasks_total"], 0)
+        self.assertEqual(self.stored_stats(other)["tasks_total"], 1)
+        self.assertEqual(self.stored_stats(other)["subtasks_total"], 1)
+        self.assertStatsConsistent(self.project, other)
+
+    def test_delete_task(self):
+        Subtask.objects.create(task=self.task, name="Подзадача", description="Описание")
+        self.task.delete()
+        self.assertStatsConsistent(self.project)
+        self.assertEqual(self.stored_stats(self.project)["tasks_total"], 0)
+
+    def test_reconcile_fixes_drift_and_missing_rows(self):
+        ProjectStats.objects.filter(pk=self.project.pk).update(
+            tasks_total=10, tasks_new=-3
+        )
+        other = self.create_project("Другой проект")
+        ProjectStats.objects.filter(pk=other.pk).delete()
+
+        self.assertEqual(reconcile_project_stats(), (1, 1))
+        self.assertStatsConsistent(self.project, other)
+        # Повторная сверка ничего не меняет
+        self.assertEqual(reconcile_project_stats(), (0, 0))
+
+    def test_task_save_updates_counters_in_one_query(self):
+        task = Task.objects.get(pk=self.task.pk)
+        task.status = "IN_PROGRESS"
+        # Только UPDATE с F(): без чтения строки статистики и пересчета
+        with self.assertNumQueries(1):
+            track_task_save(task, created=False)
+        self.assertEqual(self.stored_stats(self.project)["tasks_in_progress"], 1)
+
+
+class TaskNameUniquenessTest(TodolistTestCase):
+    """Название задачи уникально для исполнителя, в том числе для задач без него"""
+
+    def create(self, name, **fields):
+        """POST /api/task/ в отдельный проект (ограничение проекта не мешает)"""
+        return self.client.post(
+            "/api/task/",
+            {
+                "name": name,
+                "description": "Описание",
+                "due_date": (timezone.now().date() + timedelta(days=3)).isoformat(),
+                "category": "Разработка",
+                "project": self.create_project(f"Проект {Project.objects.count()}").pk,
+                **fields,
+            },
+            format="json",
+        )
+
+    def test_unassigned_duplicate_rejected(self):
+        self.assertEqual(self.create("Без исполнителя").status_code, 201)
+        response = self.create("Без исполнителя")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("name", response.data)
+
+    def test_assigned_duplicate_rejected(self):
+        self.assertEqual(self.create("Моя", assignee=self.user.pk).status_code, 201)
+        response = self.create("Моя", assignee=self.user.pk)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("name", response.data)
+        # Другой исполнитель и задача без исполнителя — не конфликт
+        other = UserProfile.objects.create(username="other", email="other@example.com")
+        self.assertEqual(self.create("Моя", assignee=other.pk).status_code, 201)
+        self.assertEqual(self.create("Моя").status_code, 201)
+
+    def test_bulk_create_reports_unassigned_duplicate(self):
+        item = {
+            "description": "Описание",
+            "due_date": (timezone.now().date() + timedelta(days=3)).isoformat(),
+            "category": "Разработка",
+            "project": self.create_project("Другой").pk,
+        }
+        response = self.client.post(
+            "/api/task/bulk/",
+            [{**item, "name": self.task.name}, {**item, "name": "Новая"}],
+            format="json",
+        )
+        results = response.data["results"]
+        self.assertEqual([result["status"] for result in results], ["error", "created"])
+        self.assertIn("name", results[0]["errors"])
+
+    def test_full_clean_reports_unassigned_duplicate(self):
+        task = Task(
+            name=self.task.name,
+            description="Описание",
+            due_date=self.task.due_date,
+            category="Разработка",
+            project=self.create_project("Другой"),
+        )
+        with self.assertRaises(ValidationError):
+            task.full_clean()
+
+
+class BulkTasksTest(TodolistTestCase):
+    """Пакетное создание, изменение и удаление задач (/api/task/bulk/)"""
+
+    url = "/api/task/bulk/"
+
+    def item(self, name, **fields):
+        """Элемент пакета создания"""
+        return {
+            "name": name,
+            "description": "Описание",
+            "due_date": (timezone.now().date() + timedelta(days=3)).isoformat(),
+            "category": "Разработка",
+            "project": self.project.pk,
+            **fields,
+        }
+
+    def count_queries(self, method, data):
+        """Число запросов к базе на один пакетный запрос (с пустым кешем)"""
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(self.url, data, format="json")
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_create_reports_each_item(self):
+        foreign = self.create_project("Чужой проект", member=False)
+        response = self.client.post(
+            self.url,
+            [
+                self.item("Первая"),
+                self.item("Первая"),  # повтор внутри пакета
+                self.item("Задача"),  # уже есть в проекте
+                self.item("Чужая", project=foreign.pk),
+                self.item("Приоритет", priority="9"),
+                self.item("Вторая", priority="3"),
+            ],
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        results = response.data["results"]
+        self.assertEqual(
+            [item["status"] for item in results],
+            ["created", "error", "error", "error", "error", "created"],
+        )
+        self.assertIn("name", results[1]["errors"])
+        self.assertIn("name", results[2]["errors"])
+        self.assertIn("project", results[3]["errors"])
+        self.assertIn("priority", results[4]["errors"])
+        self.assertEqual(response.data["counts"], {"created": 2, "error": 4})
+
+        created = Task.objects.get(pk=results[0]["id"])
+        self.assertEqual(created.history.get().history_type, "+")
+        self.assertEqual(
+            ProjectStats.objects.get(pk=self.project.pk).tasks_total, 3
+        )
+
+    def test_create_queries_do_not_grow_with_batch(self):
+        small = self.count_queries("post", [self.item(f"Малая {i}") for i in range(3)])
+        large = self.count_queries(
+            "post", [self.item(f"Большая {i}") for i in range(30)]
+        )
+        self.assertEqual(small, large)
+
+    def test_update_writes_only_changed_tasks(self):
+        other = self.create_task("Вторая")
+        response = self.client.patch(
+            self.url,
+            [
+                {"id": self.task.pk, "name": "Переименована", "priority": "4"},
+                {"id": other.pk, "name": "Вторая"},  # без изменений
+                {"id": 999999, "name": "Нет такой"},
+                {"id": other.pk, "priority": "2"},  # повтор id
+            ],
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        results = response.data["results"]
+        self.assertEqual(
+            [item["status"] for item in results],
+            ["updated", "unchanged", "error", "error"],
+        )
+        self.assertEqual(results[2]["errors"], {"id": ["Задача не найдена"]})
+
+        record = self.task.history.first()
+        self.assertEqual(record.history_type, "~")
+        self.assertCountEqual(
+            record.changes,
+            [
+                {"field": "name", "old": "Задача", "new": "Переименована"},
+                {"field": "priority", "old": "1", "new": "4"},
+            ],
+        )
+        self.assertEqual(other.history.count(), 1)  # только создание
+
+    def test_update_checks_uniqueness_against_existing_tasks(self):
+        other = self.create_task("Вторая")
+        response = self.client.patch(
+            self.url, [{"id": other.pk, "name": "Задача"}], format="json"
+        )
+        self.assertEqual(response.data["results"][0]["status"], "error")
+        self.assertIn("name", response.data["results"][0]["errors"])
+        self.assertEqual(Task.objects.get(pk=other.pk).name, "Вторая")
+
+    def test_update_queries_do_not_grow_with_batch(self):
+        tasks = [self.create_task(f"Задача {i}") for i in range(30)]
+        small = self.count_queries(
+            "patch", [{"id": task.pk, "priority": "2"} for task in tasks[:3]]
+        )
+        large = self.count_queries(
+            "patch", [{"id": task.pk, "priority": "3"} for task in tasks]
+        )
+        self.assertEqual(small, large)
+
+    def test_delete(self):
+        foreign_task = self.create_task(
+            "Чужая", project=self.create_project("Чужой проект", member=False)
+        )
+        Subtask.objects.create(task=self.task, name="Подзадача", description="Описание")
+        response = self.client.delete(
+            self.url, {"ids": [self.task.pk, foreign_task.pk]}, format="json"
+        )
+
+        self.assertEqual(
+            [item["status"] for item in response.data["results"]],
+            ["deleted", "error"],
+        )
+        self.assertFalse(Task.objects.filter(pk=self.task.pk).exists())
+        self.assertTrue(Task.objects.filter(pk=foreign_task.pk).exists())
+        self.assertEqual(
+            compute_project_stats([self.project.pk])[self.project.pk]["tasks_total"],
+            ProjectStats.objects.get(pk=self.project.pk).tasks_total,
+        )
+        self.assertEqual(
+            ProjectStats.objects.get(pk=self.project.pk).subtasks_total, 0
+        )
+        self.assertEqual(
+            list(TaskSearchEntry.objects.values_list("pk", flat=True)),
+            [foreign_task.pk],
+        )
+
+    def test_batch_limits(self):
+        response = self.client.post(self.url, [], format="json")
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(
+            self.url,
+            [self.item(f"Задача {i}") for i in range(BULK_MAX_ITEMS + 1)],
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.data, {"detail": f"Не больше {BULK_MAX_ITEMS} элементов за запрос."}
+        )
+        self.assertEqual(Task.objects.count(), 1)
+
+
+class BulkChangeStatusTest(TodolistTestCase):
+    """Пакетная смена статуса задач (/api/task/bulk/status/)"""
+
+    url = "/api/task/bulk/status/"
+
+    def test_reports_each_id(self):
+        done = self.create_task("Готовая", status="DONE")
+        foreign_task = self.create_task(
+            "Чужая", project=self.create_project("Чужой проект", member=False)
+        )
+        response = self.client.post(
+            self.url,
+            {"ids": [self.task.pk, done.pk, foreign_task.pk, "x"], "status": "done"},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [item["status"] for item in response.data["results"]],
+            ["updated", "unchanged", "error", "error"],
+        )
+        self.assertEqual(
+            response.data["results"][2]["errors"], {"id": ["Задача не найдена"]}
+        )
+        self.assertEqual(Task.objects.get(pk=self.task.pk).status, "DONE")
+        self.assertEqual(Task.objects.get(pk=foreign_task.pk).status, "NEW")
+
+    def test_any_status_change_is_allowed(self):
+        self.task.status = "IN_PROGRESS"
+        self.task.save()
+        response = self.client.post(
+            self.url, {"ids": [self.task.pk], "status": "NEW"}, format="json"
+        )
+        self.assertEqual(response.data["results"][0]["status"], "updated")
+
+        # Одиночный маршрут тоже не ограничивает переходы
+        Task.objects.filter(pk=self.task.pk).update(status="IN_PROGRESS")
+        response = self.client.post(f"/api/task/{self.task.pk}/change_status/new")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Task.objects.get(pk=self.task.pk).status, "NEW")
+
+    def test_writes_history_and_stats(self):
+        self.client.post(
+            self.url, {"ids": [self.task.pk], "status": "IN_PROGRESS"}, format="json"
+        )
+        record = self.task.history.first()
+        self.assertEqual(
+            record.changes, [{"field": "status", "old": "NEW", "new": "IN_PROGRESS"}]
+        )
+        self.assertEqual(record.history_change_reason, "status: NEW -> IN_PROGRESS")
+        self.assertEqual(
+            compute_project_stats([self.project.pk])[self.project.pk],
+            {
+                name: getattr(ProjectStats.objects.get(pk=self.project.pk), name)
+                for name in PROJECT_STATS_COUNTERS
+            },
+        )
+
+    def test_single_update_for_any_number_of_tasks(self):
+        tasks = [self.create_task(f"Задача {i}") for i in range(30)]
+
+        def count_queries(ids, new_status):
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                self.client.post(
+                    self.url, {"ids": ids, "status": new_status}, format="json"
+                )
+            updates = [
+                query
+                for query in queries
+                if query["sql"].startswith('UPDATE "todolist_task"')
+            ]
+            self.assertEqual(len(updates), 1)
+            return len(queries)
+
+        small = count_queries([task.pk for task in tasks[:3]], "BACKLOG")
+        large = count_queries([task.pk for task in tasks], "DONE")
+        self.assertEqual(small, large)
+
+    def test_invalid_requests(self):
+        for data, detail in [
+            ({"ids": [], "status": "DONE"}, "Ожидается непустой список ids."),
+            ({"ids": [self.task.pk], "status": "CANCELED"}, "Неверный статус."),
+            (
+                {"ids": list(range(BULK_MAX_ITEMS + 1)), "status": "DONE"},
+                f"Не больше {BULK_MAX_ITEMS} элементов за запрос.",
+            ),
+        ]:
+            response = self.client.post(self.url, data, format="json")
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.data, {"detail": detail})
+
+
+class SparseFieldsTest(TodolistTestCase):
+    """Частичный ответ ?fields= / ?omit= и сужение запросов"""
+
+    def get(self, url, params):
+        """Ответ и выполненные запросы"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response, [query["sql"] for query in queries]
+
+    def task_select(self, queries):
+        """Выборка страницы задач"""
+        return next(
+            sql
+            for sql in queries
+            if sql.startswith('SELECT "todolist_task"."id"') and "LIMIT" in sql
+        )
+
+    def test_fields_narrow_payload_and_columns(self):
+        Subtask.objects.create(task=self.task, name="Подзадача", description="Описание")
+        full, full_queries = self.get("/api/task/", {})
+        sparse, sparse_queries = self.get("/api/task/", {"fields": "id,name,bogus"})
+
+        self.assertEqual(set(sparse.data["results"][0]), {"id", "name"})
+        self.assertIn('"todolist_task"."description"', self.task_select(full_queries))
+        self.assertNotIn(
+            '"todolist_task"."description"', self.task_select(sparse_queries)
+        )
+        # Подзадачи не запрашиваются, если их нет в ответе
+        self.assertTrue(any('FROM "todolist_subtask"' in sql for sql in full_queries))
+        self.assertFalse(
+            any('FROM "todolist_subtask"' in sql for sql in sparse_queries)
+        )
+
+    def test_omit(self):
+        response, _ = self.get("/api/task/", {"omit": "description,subtasks"})
+        result = response.data["results"][0]
+        self.assertNotIn("description", result)
+        self.assertNotIn("subtasks", result)
+        self.assertEqual(result["name"], "Задача")
+
+    def test_unrequested_expansion_is_not_loaded(self):
+        response, queries = self.get(
+            "/api/task/", {"fields": "id,name", "expand": "project"}
+        )
+        self.assertEqual(set(response.data["results"][0]), {"id", "name"})
+        self.assertNotIn('"todolist_project"', self.task_select(queries))
+
+        response, queries = self.get(
+            "/api/task/", {"fields": "id,project", "expand": "project"}
+        )
+        self.assertEqual(response.data["results"][0]["project"]["name"], "Проект")
+        self.assertIn('"todolist_project"', self.task_select(queries))
+
+    def test_method_field_sources_keep_related_rows(self):
+        _, one_project = self.get("/api/project/", {"fields": "id,stats"})
+        for index in range(5):
+            self.create_project(f"Проект {index}")
+        cache.clear()
+        response, many_projects = self.get("/api/project/", {"fields": "id,stats"})
+
+        self.assertEqual(len(response.data["results"]), 6)
+        self.assertEqual(response.data["results"][0]["stats"]["tasks_total"], 1)
+        self.assertEqual(len(one_project), len(many_projects))
+
+    def test_writes_return_full_payload(self):
+        response = self.client.patch(
+            f"/api/task/{self.task.pk}/?fields=id",
+            {"priority": "2"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("description", response.data)
+
+
+class ExpandCachingTest(TodolistTestCase):
+    """ETag и кеш ответов учитывают данные раскрытых связей"""
+
+    def test_project_rename_invalidates_expanded_tasks(self):
+        url = "/api/task/?expand=project"
+        etag = self.client.get(url)["ETag"]
+        self.project.name = "Новое название"
+        self.project.save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["results"][0]["project"]["name"], "Новое название")
+
+    def test_assignee_change_invalidates_expanded_tasks(self):
+        self.task.assignee = self.user
+        self.task.save()
+        url = "/api/task/?expand=assignee"
+        etag = self.client.get(url)["ETag"]
+        self.user.first_name = "Иван"
+        self.user.save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["results"][0]["assignee"]["first_name"], "Иван")
+
+    def test_expand_project_query_count(self):
+        for index in range(4):
+            self.create_task(f"Задача {index}", project=self.create_project(f"П{index}"))
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get("/api/task/?expand=project")
+        expected = len(queries)
+
+        for index in range(4, 12):
+            self.create_task(f"Задача {index}", project=self.create_project(f"П{index}"))
+        cache.clear()
+        # Запросов столько же, сколько при 5 проектах: без запроса на проект
+        with self.assertNumQueries(expected):
+            response = self.client.get("/api/task/?expand=project")
+        self.assertEqual(len(response.data["results"]), 10)
+        self.assertIn("stats", response.data["results"][0]["project"])
+
+    def test_subtasks_nested_by_default(self):
+        subtask = Subtask.objects.create(
+            task=self.task, name="Подзадача", description="Описание"
+        )
+        result = self.client.get("/api/task/").data["results"][0]
+        self.assertEqual(result["subtasks"][0]["name"], "Подзадача")
+
+        result = self.client.get(
+            "/api/task/", {"expand": "subtask_ids", "omit": "subtasks"}
+        ).data["results"][0]
+        self.assertEqual(result["subtask_ids"], [subtask.pk])
+        self.assertNotIn("subtasks", result)
+
+
+class KeysetPaginationTest(TodolistTestCase):
+    """Курсор хранит весь кортеж сортировки и не использует OFFSET"""
+
+    def setUp(self):
+        super().setUp()
+        for index in range(5):
+            self.create_task(f"Просроченная {index}")
+        # Срок в прошлом: save() не дает его поставить, поэтому update()
+        yesterday = timezone.now().date() - timedelta(days=1)
+        Task.objects.update(due_date=yesterday)
+        Task.objects.filter(pk=self.task.pk).update(
+            due_date=yesterday - timedelta(days=1)
+        )
+
+    def walk(self, url):
+        """id задач на всех страницах по ссылкам next, затем обратно по previous"""
+        forward, pages = [], []
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                data = self.client.get(url).data
+            self.assertFalse(
+                any("OFFSET" in query["sql"] for query in queries.captured_queries)
+            )
+            pages.append([task["id"] for task in data["results"]])
+            forward += pages[-1]
+            url = data["next"]
+        return forward, pages
+
+    def test_walk_over_ties(self):
+        expected = list(
+            Task.objects.get_overdue().order_by("due_date", "id").values_list(
+                "id", flat=True
+            )
+        )
+        forward, pages = self.walk("/api/task/overdue_tasks/?page_size=2")
+        self.assertEqual(forward, expected)
+        self.assertEqual(len(pages), 3)
+
+        # Назад с последней страницы — те же страницы в обратном порядке
+        url = self.client.get("/api/task/overdue_tasks/?page_size=2").data["next"]
+        url = self.client.get(url).data["next"]
+        previous = self.client.get(self.client.get(url).data["previous"]).data
+        self.assertEqual([task["id"] for task in previous["results"]], pages[1])
+
+    def test_invalid_cursor(self):
+        response = self.client.get("/api/task/overdue_tasks/", {"cursor": "мусор"})
+        self.assertEqual(response.status_code, 404)
+
+    def test_wrong_typed_cursor(self):
+        for position in (["abc", 1], ["2024-01-01", "abc"], [[1], 1]):
+            cursor = base64.b64encode(
+                urlencode({"p": json.dumps(position)}).encode()
+            ).decode()
+            response = self.client.get("/api/task/overdue_tasks/", {"cursor": cursor})
+            self.assertEqual(response.status_code, 404, position)
+
+
+@override_settings(
+    CACHES={
+        **LOCMEM_CACHES,
+        "remote": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "two-tier-remote",
+        },
+    }
+)
+class TwoTierCacheTest(SimpleTestCase):
+    """Инвалидация локального уровня по ключам через журнал в удаленном кеше"""
+
+    def setUp(self):
+        caches["remote"].clear()
+        # Два «процесса»: у каждого свой LRU, удаленный кеш общий
+        self.first, self.second = (self.two_tier(name) for name in ("first", "second"))
+
+    def two_tier(self, name):
+        """TwoTierCache со своим LRU, сверяющий журнал при каждом чтении"""
+        return TwoTierCache(
+            f"{self.id()}:{name}",
+            {
+                "OPTIONS": {
+                    "REMOTE_ALIAS": "remote",
+                    "SYNC_INTERVAL": 0,
+                    "REMOTE_ONLY_PREFIXES": ("cache_stats:",),
+                }
+            },
+        )
+
+    def cached_locally(self, tier, key):
+        return tier.local.get(tier.make_key(key)) is not _MISSING
+
+    def test_write_invalidates_only_changed_key(self):
+        self.first.set("changed", 1)
+        self.first.set("kept", 1)
+        self.second.set("changed", 2)
+
+        self.assertEqual(self.first.get("changed"), 2)
+        self.assertTrue(self.cached_locally(self.first, "kept"))
+
+    def test_clear_empties_other_local_tiers(self):
+        self.first.set("key", 1)
+        self.first.get("key")
+        self.second.clear()
+        self.first.get("other")
+        self.assertFalse(self.cached_locally(self.first, "key"))
+
+    def test_lost_log_clears_local_tier(self):
+        self.first.set("key", 1)
+        self.first.get("key")
+        self.second.set("other", 1)
+        version = caches["remote"].get(TwoTierCache.version_key)
+        caches["remote"].delete(TwoTierCache.log_key.format(version=version))
+        self.first.get("other")
+        self.assertFalse(self.cached_locally(self.first, "key"))
+
+    def test_remote_only_keys_skip_local_tier(self):
+        self.first.set("kept", 1)
+        version = caches["remote"].get(TwoTierCache.version_key)
+        self.second.add("cache_stats:tasks:hits", 0)
+        self.second.incr("cache_stats:tasks:hits")
+
+        self.assertEqual(caches["remote"].get(TwoTierCache.version_key), version)
+        self.assertEqual(self.first.get("cache_stats:tasks:hits"), 1)
+        self.assertFalse(self.cached_locally(self.first, "cache_stats:tasks:hits"))
+        self.assertTrue(self.cached_locally(self.first, "kept"))
+
+
+class SQLiteCacheTest(SimpleTestCase):
+    """Счетчик записей SQLiteCache и соблюдение MAX_ENTRIES"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache = SQLiteCache(
+            os.path.join(directory.name, "cache.sqlite3"),
+            {"OPTIONS": {"MAX_ENTRIES": 10, "CULL_FREQUENCY": 3}},
+        )
+        self.addCleanup(lambda: self.cache.connection.close())
+
+    def assert_count_matches(self):
+        connection = self.cache.connection
+        self.assertEqual(
+            self.cache._count(connection),
+            connection.execute("SELECT COUNT(*) FROM cache").fetchone()[0],
+        )
+
+    def test_count_tracks_writes(self):
+        self.cache.set("key", 1)
+        self.cache.set("key", 2)  # INSERT OR REPLACE: та же строка
+        self.cache.add("key", 3)
+        self.cache.set_many({"a": 1, "b": 2})
+        self.cache.delete("a")
+        self.assert_count_matches()
+        self.assertEqual(self.cache._count(self.cache.connection), 2)
+        self.cache.clear()
+        self.assert_count_matches()
+
+    def test_max_entries(self):
+        for index in range(25):
+            self.cache.set(f"key:{index}", index)
+            self.assertLessEqual(self.cache._count(self.cache.connection), 10)
+        self.cache.set_many({f"many:{index}": index for index in range(8)})
+        self.assertLessEqual(self.cache._count(self.cache.connection), 10)
+        self.assert_count_matches()
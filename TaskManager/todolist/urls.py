@@ -5,6 +5,7 @@ from rest_framework.routers import DefaultRouter
 
 # Импортируем все необходимые viewsets
 from .views.view_sets import (
+    AutocompleteView,
     CommentViewSet,
     ProjectViewSet,
     SubtaskViewSet,
@@ -31,6 +32,7 @@ router.register(r"userprofileproject", UserProfileProjectViewSet)
 
 urlpatterns = [
     path("", include(router.urls)),
+    path("autocomplete/", AutocompleteView.as_view(), name="autocomplete"),
     path("task/status/<str:status>/", TaskViewSet.as_view({"get": "list"})),
     path(
         "task/<int:pk>/history/",
@@ -0,0 +1,317 @@
+""" Миксины вьюсетов """
+
+import hashlib
+from functools import partial
+
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Count, DateTimeField, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework import status
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+from ..caching import (
+    RESPONSE_CACHE_TIMEOUT,
+    get_generation,
+    normalize_query_params,
+    record_cache_hit,
+    record_cache_miss,
+    task_response_cache_key,
+)
+
+
+class ConditionalGetMixin:
+    """
+    Условные GET-запросы (ETag / Last-Modified) для list и retrieve.
+
+    Валидатор считается одним агрегатным запросом по отфильтрованному
+    набору: max(last_modified_field), количество строк и max(pk). Если
+    клиент прислал совпадающий If-None-Match или If-Modified-Since,
+    отдается 304 без сериализации.
+    """
+
+    last_modified_field = "updated_at"
+    # Поколения из кеша, которые сдвигаются сигналами при изменениях,
+    # не отражающихся на last_modified_field (подзадачи, участники и т.п.)
+    validator_generation_keys = ()
+
+    def get_validator_queryset(self):
+        """Набор строк, от которого зависит ответ"""
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        if lookup_url_kwarg in self.kwargs:
+            queryset = queryset.filter(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            )
+        return queryset
+
+    def get_last_modified_field(self):
+        """
+        Поле для Last-Modified. DateField (как Task.updated_at) не годится:
+        правки в течение дня не меняют дату, поэтому учитываются только в ETag.
+        """
+        if not self.last_modified_field:
+            return None
+        field = self.get_queryset().model._meta.get_field(self.last_modified_field)
+        return field if isinstance(field, DateTimeField) else None
+
+    def get_validator_generation_keys(self):
+        """Поколения для ETag, включая данные раскрытых связей (ExpandMixin)"""
+        keys = list(self.validator_generation_keys)
+        if isinstance(self, ExpandMixin):
+            keys.extend(self.get_expand_generation_keys())
+        return keys
+
+    def get_validators(self, request):
+        """Возвращает (etag, last_modified) для текущего запроса"""
+        aggregates = {"rows": Count("pk"), "max_pk": Max("pk")}
+        if self.last_modified_field:
+            aggregates["updated"] = Max(self.last_modified_field)
+        values = self.get_validator_queryset().order_by().aggregate(**aggregates)
+
+        etag_source = "|".join(
+            [
+                self.action,
+                request.path,
+                request.accepted_renderer.format,
+                normalize_query_params(request.query_params),
+                str(request.user.pk or "anon"),
+                str(values["rows"]),
+                str(values["max_pk"]),
+                str(values.get("updated")),
+                *(
+                    str(get_generation(key))
+                    for key in self.get_validator_generation_keys()
+                ),
+            ]
+        )
+        etag = quote_etag(hashlib.md5(etag_source.encode("utf-8")).hexdigest())
+
+        last_modified = None
+        if self.get_last_modified_field() and values.get("updated"):
+            last_modified = int(values["updated"].timestamp())
+        return etag, last_modified
+
+    def conditional_response(self, request, build_response):
+        """Отдает 304, если данные не изменились, иначе строит ответ"""
+        etag, last_modified = self.get_validators(request)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = build_response()
+        if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            response["ETag"] = etag
+            if last_modified:
+                response["Last-Modified"] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        """Список с поддержкой условных запросов"""
+        return self.conditional_response(
+            request, partial(super().list, request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        """Объект с поддержкой условных запросов"""
+        return self.conditional_response(
+            request, partial(super().retrieve, request, *args, **kwargs)
+        )
+
+
+class TaskResponseCacheMixin:
+    """
+    Кеш ответов со списками задач.
+    Ключ зависит от поколения задач, поэтому запись никогда не ищет
+    и не удаляет ключи явно — достаточно сдвинуть поколение.
+    """
+
+    def cached_response(self, scope, build_response):
+        """
+        Отдает ответ из кеша либо строит его и кеширует.
+        Через get_or_set: при двухуровневом кеше ответ после инвалидации
+        пересчитывает только один воркер.
+        """
+        generation_keys = ()
+        if isinstance(self, ExpandMixin):
+            generation_keys = self.get_expand_generation_keys()
+        key = task_response_cache_key(scope, self.request, generation_keys)
+        computed = []
+
+        def build_data():
+            record_cache_miss(scope, key)
+            computed.append(True)
+            return build_response().data
+
+        data = cache.get_or_set(key, build_data, timeout=RESPONSE_CACHE_TIMEOUT)
+        if not computed:
+            record_cache_hit(scope, key)
+        return Response(data)
+
+    def list(self, request, *args, **kwargs):
+        """Список задач из кеша ответов"""
+        return self.cached_response(
+            "task_list", partial(super().list, request, *args, **kwargs)
+        )
+
+
+class ExpandMixin:
+    """
+    Раскрытие связей по ?expand=a,b для чтения.
+
+    expand_querysets: имя раскрытия -> функция, которая добавляет к queryset
+    нужные select_related/prefetch_related/аннотации. Так страница из 100
+    объектов стоит фиксированное число запросов при любом наборе раскрытий.
+    Для записи раскрытия не применяются: вложенные поля только для чтения.
+    expand_generation_keys: имя раскрытия -> поколения кеша, которые
+    сдвигаются при изменении раскрытых данных (для ETag и кеша ответов).
+    """
+
+    expand_query_param = "expand"
+    expand_querysets = {}
+    expand_generation_keys = {}
+
+    def get_expand(self):
+        """Запрошенные и поддерживаемые раскрытия"""
+        request = getattr(self, "request", None)
+        if request is None or request.method not in SAFE_METHODS:
+            return set()
+        raw = request.query_params.get(self.expand_query_param, "")
+        return {name.strip() for name in raw.split(",")} & set(self.expand_querysets)
+
+    def get_expand_generation_keys(self):
+        """Поколения данных запрошенных раскрытий"""
+        return sorted(
+            {
+                key
+                for name in self.get_expand()
+                for key in self.expand_generation_keys.get(name, ())
+            }
+        )
+
+    def expand_queryset(self, queryset):
+        """Добавляет к queryset загрузку данных для раскрытий"""
+        for name in sorted(self.get_expand()):
+            queryset = self.expand_querysets[name](queryset)
+        return queryset
+
+    def get_queryset(self):
+        return self.expand_queryset(super().get_queryset())
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["expand"] = self.get_expand()
+        return context
+
+
+def _select_related_paths(tree, prefix=""):
+    """Пути select_related из дерева query.select_related"""
+    paths = []
+    for name, subtree in tree.items():
+        path = f"{prefix}{name}"
+        paths.append(path)
+        paths.extend(_select_related_paths(subtree, f"{path}__"))
+    return paths
+
+
+class SparseFieldsMixin:
+    """
+    Частичный ответ по ?fields=a,b и ?omit=a,b для чтения.
+
+    Имена передаются сериализатору (SparseFieldsMixin сериализаторов), а
+    queryset читает только столбцы оставшихся полей (.only()) и не загружает
+    связи (select_related/prefetch_related), которых нет в ответе.
+    sparse_field_sources: поле ответа, которого нет в модели
+    (SerializerMethodField и т.п.), -> поля модели, из которых оно строится.
+    Поле без источника в модели отключает .only(), связи сужаются все равно.
+    Должен стоять в MRO раньше ExpandMixin: сужает уже раскрытый queryset.
+    """
+
+    fields_query_param = "fields"
+    omit_query_param = "omit"
+    sparse_field_sources = {}
+
+    def _query_param_names(self, param):
+        raw = self.request.query_params.get(param, "")
+        return {name.strip() for name in raw.split(",") if name.strip()}
+
+    def get_sparse_params(self):
+        """Запрошенные имена: {"fields": ..., "omit": ...} или {} — весь ответ"""
+        request = getattr(self, "request", None)
+        if request is None or request.method not in SAFE_METHODS:
+            return {}
+        params = {
+            "fields": self._query_param_names(self.fields_query_param),
+            "omit": self._query_param_names(self.omit_query_param),
+        }
+        return params if params["fields"] or params["omit"] else {}
+
+    def get_sparse_fields(self):
+        """Поля сериализатора, которые попадут в ответ, или None — все"""
+        if not self.get_sparse_params():
+            return None
+        serializer = self.get_serializer_class()(context=self.get_serializer_context())
+        return serializer.fields
+
+    def _field_sources(self, model, name, field):
+        """Поля модели, из которых строится поле ответа; None — неизвестно"""
+        if name in self.sparse_field_sources:
+            return self.sparse_field_sources[name]
+        source = field.source.split(".")[0]
+        try:
+            model._meta.get_field(source)
+        except FieldDoesNotExist:
+            return None
+        return (source,)
+
+    def sparse_queryset(self, queryset):
+        """Сужает queryset до полей ответа"""
+        fields = self.get_sparse_fields()
+        if fields is None:
+            return queryset
+        model, annotations = queryset.model, queryset.query.annotations
+        columns, relations, narrow = {model._meta.pk.name}, set(), True
+        for name, field in fields.items():
+            if name in annotations:
+                continue
+            sources = self._field_sources(model, name, field)
+            if sources is None:
+                narrow = False
+                continue
+            for source in sources:
+                model_field = model._meta.get_field(source)
+                relations.add(source)
+                # Обратная OneToOne тоже: ее select_related требует места в .only()
+                if model_field.one_to_one or (
+                    model_field.concrete and not model_field.many_to_many
+                ):
+                    columns.add(source)
+
+        # pylint: disable=protected-access
+        prefetches = [
+            lookup
+            for lookup in queryset._prefetch_related_lookups
+            if getattr(lookup, "prefetch_through", lookup).split("__")[0] in relations
+        ]
+        queryset = queryset.prefetch_related(None).prefetch_related(*prefetches)
+        select_related = queryset.query.select_related
+        if isinstance(select_related, dict):
+            paths = [
+                path
+                for path in _select_related_paths(select_related)
+                if path.split("__")[0] in relations
+            ]
+            queryset = queryset.select_related(None)
+            if paths:  # select_related() без аргументов — все связи
+                queryset = queryset.select_related(*paths)
+        return queryset.only(*columns) if narrow else queryset
+
+    def get_queryset(self):
+        return self.sparse_queryset(super().get_queryset())
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context.update(self.get_sparse_params())
+        return context
@@ -2,12 +2,16 @@
 
 # pylint: disable=too-many-ancestors
 # pylint: disable=logging-fstring-interpolation
+import json
 import logging
 from datetime import timedelta
+from functools import partial
 
 import django_filters
 from django.core.cache import cache
-from django.db.models import Q
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Count, Q
+from django.http import HttpResponse
 from django.shortcuts import get_object_or_404, render
 from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
@@ -15,16 +19,42 @@ from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
-from rest_framework.filters import SearchFilter
-from rest_framework.pagination import PageNumberPagination
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import authenticate
-from simple_history.utils import update_change_reason
 
-from ..filters import TaskFilter, UserBIOFilter
+from ..autocomplete import (
+    AUTOCOMPLETE_DEFAULT_LIMIT,
+    AUTOCOMPLETE_MAX_LIMIT,
+    SOURCES as AUTOCOMPLETE_SOURCES,
+    autocomplete,
+)
+from ..bulk import (
+    BULK_MAX_ITEMS,
+    bulk_change_status,
+    bulk_create_tasks,
+    bulk_delete_tasks,
+    bulk_update_tasks,
+)
+from ..caching import (
+    PROJECTS_GENERATION_KEY,
+    RESPONSE_CACHE_TIMEOUT,
+    TASKS_GENERATION_KEY,
+    USER_PROFILES_GENERATION_KEY,
+    get_cache_stats,
+    user_profile_cache_key,
+    user_profile_list_cache_key,
+)
+from ..export import (
+    DEFAULT_EXPORT_FORMAT,
+    EXPORT_FORMATS,
+    ExportContentNegotiation,
+    export_response,
+)
+from ..filters import FullTextSearchFilter, TaskFilter, UserBIOFilter
+from ..membership import is_project_member
 from ..models import (
     Comment,
     Project,
@@ -34,11 +64,15 @@ from ..models import (
     UserProfile,
     UserProfileProject,
 )
+from ..renderers import FastJSONRenderer
+from ..search import search_queryset
+from ..stats import get_dashboard_stats, get_project_stats
 from ..serializers.RegisterSerializer import RegisterSerializer
 from ..serializers.todolists import (
     CommentSerializer,
     HistoricalTaskSerializer,
     ProjectSerializer,
+    ProjectStatsSerializer,
     SubtaskCreateSerializer,
     SubtaskSerializer,
     TaskSerializer,
@@ -46,42 +80,65 @@ from ..serializers.todolists import (
     UserProfileProjectSerializer,
     UserProfileSerializer,
 )
+from .mixins import (
+    ConditionalGetMixin,
+    ExpandMixin,
+    SparseFieldsMixin,
+    TaskResponseCacheMixin,
+)
 
 logger = logging.getLogger("todolist")
 
-
-class UserProfileViewSet(viewsets.ModelViewSet):
+SPARSE_PARAMETERS = [
+    openapi.Parameter(
+        "fields",
+        openapi.IN_QUERY,
+        description="Только эти поля ответа (через запятую)",
+        type=openapi.TYPE_STRING,
+    ),
+    openapi.Parameter(
+        "omit",
+        openapi.IN_QUERY,
+        description="Поля ответа, которые не нужны (через запятую)",
+        type=openapi.TYPE_STRING,
+    ),
+]
+
+
+class UserProfileViewSet(SparseFieldsMixin, viewsets.ModelViewSet):
     """Вьюсет профилей"""
 
-    queryset = UserProfile.objects.all()
+    # Группы и права — по запросу на страницу; не запрошенные в ?fields= не читаются
+    queryset = UserProfile.objects.prefetch_related("groups", "user_permissions")
     serializer_class = UserProfileSerializer
 
-    def get_queryset(self):
+    def cached_payload(self, key, build_data):
         """
-        Получение списка профилей с использованием кеширования
+        Отдает готовый JSON из кеша; при промахе сериализует и кеширует байты.
+        Кеш сбрасывается сигналами post_save/post_delete модели UserProfile.
         """
-        cache_key = "all_user_profiles"
-        queryset = cache.get(cache_key)
-        if queryset is None:
-            queryset = UserProfile.objects.all()
-            cache.set(
-                cache_key, list(queryset), timeout=60 * 15
-            )  # Кэшируем список на 15 минут
-        else:
-            # Преобразуем кэшированный список обратно в QuerySet
-            queryset = UserProfile.objects.filter(
-                id__in=[profile.id for profile in queryset]
-            )
+        payload = cache.get_or_set(
+            key,
+            lambda: FastJSONRenderer().render(build_data()),
+            timeout=RESPONSE_CACHE_TIMEOUT,
+        )
 
-        return queryset
+        if self.request.accepted_renderer.format == "json":
+            return HttpResponse(payload, content_type="application/json")
+        # Для browsable API отдаем данные через стандартный рендеринг
+        return Response(json.loads(payload))
 
     @swagger_auto_schema(
         operation_summary="Получение всех профилей пользователей",
+        manual_parameters=SPARSE_PARAMETERS,
         responses={200: UserProfileSerializer(many=True)},
     )
     def list(self, request, *args, **kwargs):
         """Отображение пользователей"""
-        return super().list(request, *args, **kwargs)
+        build_response = partial(super().list, request, *args, **kwargs)
+        return self.cached_payload(
+            user_profile_list_cache_key(request), lambda: build_response().data
+        )
 
     @swagger_auto_schema(
         operation_summary="Создание нового профиля пользователя",
@@ -90,11 +147,7 @@ class UserProfileViewSet(viewsets.ModelViewSet):
     )
     def create(self, request, *args, **kwargs):
         """Создание нового профиля"""
-        response = super().create(request, *args, **kwargs)
-        # Инвалидируем кеш после создания
-        if response.status_code == status.HTTP_201_CREATED:
-            cache.delete("all_user_profiles")
-        return response
+        return super().create(request, *args, **kwargs)
 
     @swagger_auto_schema(
         operation_summary="Обновление профиля пользователя",
@@ -103,11 +156,7 @@ class UserProfileViewSet(viewsets.ModelViewSet):
     )
     def update(self, request, *args, **kwargs):
         """Обновление информации о пользователе"""
-        response = super().update(request, *args, **kwargs)
-        # Инвалидируем кеш после обновления
-        if response.status_code == status.HTTP_200_OK:
-            cache.delete("all_user_profiles")
-        return response
+        return super().update(request, *args, **kwargs)
 
     @swagger_auto_schema(
         operation_summary="Частичное обновление профиля пользователя",
@@ -116,46 +165,34 @@ class UserProfileViewSet(viewsets.ModelViewSet):
     )
     def partial_update(self, request, *args, **kwargs):
         """Частичное обновление информации о пользователе"""
-        response = super().partial_update(request, *args, **kwargs)
-        # Инвалидируем кеш после частичного обновления
-        cache.delete("all_user_profiles")
-        cache.delete(f'user_profile_{kwargs.get("pk")}')
-        return response
+        return super().partial_update(request, *args, **kwargs)
 
     @swagger_auto_schema(
         operation_summary="Удаление профиля пользователя", responses={204: "No Content"}
     )
     def destroy(self, request, *args, **kwargs):
         """Удаление функции"""
-        # Инвалидируем кеш перед удалением
-        response = super().destroy(request, *args, **kwargs)
-        if response.status_code == status.HTTP_204_NO_CONTENT:
-            cache.delete("all_user_profiles")
-        return response
+        return super().destroy(request, *args, **kwargs)
 
     def retrieve(self, request, *args, **kwargs):
         """
         Получение конкретного профиля с использованием кеширования
         """
-        pk = kwargs.get("pk")
-        cache_key = f"user_profile_{pk}"
-
-        # Пытаемся получить данные из кеша
-        instance = cache.get(cache_key)
-
-        if instance is None:
-            instance = self.get_object()
-            # Кешируем на 15 минут
-            cache.set(cache_key, instance, timeout=60 * 15)
-
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+        if self.get_sparse_params():
+            # Кеш профиля сбрасывается по одному ключу: частичный ответ
+            # в нем не хранится
+            return Response(self.get_serializer(self.get_object()).data)
+        return self.cached_payload(
+            user_profile_cache_key(kwargs.get("pk")),
+            lambda: self.get_serializer(self.get_object()).data,
+        )
 
 
-class UserBIOViewSet(viewsets.ModelViewSet):
+class UserBIOViewSet(SparseFieldsMixin, viewsets.ModelViewSet):
     """Вьюсет BIO пользователя"""
 
     queryset = UserBIO.objects.all().order_by("age")
+    cursor_ordering = ("age", "id")
     serializer_class = UserBiosSerializer
     filter_backends = [
         DjangoFilterBackend,
@@ -164,6 +201,7 @@ class UserBIOViewSet(viewsets.ModelViewSet):
 
     @swagger_auto_schema(
         operation_summary="Получение всех биографий пользователей",
+        manual_parameters=SPARSE_PARAMETERS,
         responses={200: UserBiosSerializer(many=True)},
     )
     def list(self, request, *args, **kwargs):
@@ -206,16 +244,44 @@ class UserBIOViewSet(viewsets.ModelViewSet):
         return super().destroy(request, *args, **kwargs)
 
 
-class ProjectViewSet(viewsets.ModelViewSet):
+EXPAND_PARAMETER = openapi.Parameter(
+    "expand",
+    openapi.IN_QUERY,
+    description="Раскрываемые связи через запятую",
+    type=openapi.TYPE_STRING,
+)
+EXPORT_OUTPUT_PARAMETER = openapi.Parameter(
+    "output",
+    openapi.IN_QUERY,
+    description="Формат выгрузки",
+    type=openapi.TYPE_STRING,
+    enum=list(EXPORT_FORMATS),
+    default=DEFAULT_EXPORT_FORMAT,
+)
+
+
+class ProjectViewSet(
+    ConditionalGetMixin, SparseFieldsMixin, ExpandMixin, viewsets.ModelViewSet
+):
     """Вьюсет проектов"""
 
-    queryset = Project.objects.all()
+    # members без раскрытия отдаются списком id — тоже одним запросом,
+    # счетчики stats — из той же выборки
+    queryset = Project.objects.select_related("stats").prefetch_related("members")
     serializer_class = ProjectSerializer
-    filter_backends = [SearchFilter]
-    search_fields = ["name", "description"]
+    filter_backends = [FullTextSearchFilter]
+    # Счетчики в ответе меняются вместе с задачами
+    validator_generation_keys = (PROJECTS_GENERATION_KEY, TASKS_GENERATION_KEY)
+    expand_querysets = {
+        "members": lambda queryset: queryset,  # уже в prefetch_related
+        "tasks_count": lambda queryset: queryset.annotate(tasks_count=Count("tasks")),
+    }
+    expand_generation_keys = {"members": (USER_PROFILES_GENERATION_KEY,)}
+    sparse_field_sources = {"absolute_url": (), "stats": ("stats",)}
 
     @swagger_auto_schema(
         operation_summary="Получение всех проектов",
+        manual_parameters=[EXPAND_PARAMETER, *SPARSE_PARAMETERS],
         responses={200: ProjectSerializer(many=True)},
     )
     def list(self, request, *args, **kwargs):
@@ -257,16 +323,32 @@ class ProjectViewSet(viewsets.ModelViewSet):
         return super().destroy(request, *args, **kwargs)
 
     def retrieve(self, request, *args, **kwargs):
-        project = self.get_object()
-        if not project.members.filter(pk=request.user.pk).exists():
+        lookup = str(kwargs.get(self.lookup_url_kwarg or self.lookup_field))
+        if not lookup.isdigit() or not is_project_member(request, int(lookup)):
+            self.get_object()  # 404, если проекта нет
             return Response(
                 {"error": "У вас нет доступа к этому проекту"},
                 status=status.HTTP_403_FORBIDDEN,
             )
         return super().retrieve(request, *args, **kwargs)
 
+    @swagger_auto_schema(
+        operation_summary="Статистика проекта",
+        responses={200: ProjectStatsSerializer()},
+    )
+    @action(detail=True, methods=["get"])
+    def stats(self, request, pk=None):
+        """Счетчики проекта — чтение одной строки ProjectStats"""
+        if not str(pk).isdigit() or not is_project_member(request, int(pk)):
+            self.get_object()  # 404, если проекта нет
+            return Response(
+                {"error": "У вас нет доступа к этому проекту"},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+        return Response(ProjectStatsSerializer(get_project_stats(int(pk))).data)
 
-class UserProfileProjectViewSet(viewsets.ModelViewSet):
+
+class UserProfileProjectViewSet(SparseFieldsMixin, viewsets.ModelViewSet):
     """Вьюсет связей между пользователями и проектами"""
 
     queryset = UserProfileProject.objects.all()
@@ -274,6 +356,7 @@ class UserProfileProjectViewSet(viewsets.ModelViewSet):
 
     @swagger_auto_schema(
         operation_summary="Получение всех связей между пользователями и проектами",
+        manual_parameters=SPARSE_PARAMETERS,
         responses={200: UserProfileProjectSerializer(many=True)},
     )
     def list(self, request, *args, **kwargs):
@@ -316,40 +399,41 @@ class UserProfileProjectViewSet(viewsets.ModelViewSet):
         return super().destroy(request, *args, **kwargs)
 
 
-class StandardResultsSetPagination(PageNumberPagination):
-    """Пагинация результатов"""
-
-    page_size = 10
-    page_size_query_param = "page_size"
-    max_page_size = 100
-
-
-class TaskViewSet(viewsets.ModelViewSet):
+class TaskViewSet(
+    ConditionalGetMixin,
+    TaskResponseCacheMixin,
+    SparseFieldsMixin,
+    ExpandMixin,
+    viewsets.ModelViewSet,
+):
     """Вьюсет задач"""
 
-    queryset = Task.objects.all().order_by("id")
+    # Подзадачи в ответе всегда (вложенными объектами или id)
+    queryset = Task.objects.prefetch_related("subtasks").order_by("id")
     serializer_class = TaskSerializer
     filter_backends = (django_filters.rest_framework.DjangoFilterBackend,)
     filterset_class = TaskFilter
-    pagination_class = StandardResultsSetPagination
-
-    def get_queryset(self):
-        cache_key = "all_tasks"
-        task_ids = cache.get(cache_key)
-
-        if task_ids:
-            logger.debug(f"[CACHE HIT] Получены задачи из кеша: {task_ids}")
-            queryset = Task.objects.filter(id__in=task_ids).order_by("id")
-        else:
-            logger.debug("[CACHE MISS] Кеш пуст. Загружаем из базы данных.")
-            queryset = Task.objects.all().order_by("id")
-            task_ids = list(queryset.values_list("id", flat=True))
-            cache.set(cache_key, task_ids, timeout=60 * 15)
-            logger.debug(
-                f"[CACHE SET] Ключ '{cache_key}' установлен со значением: {task_ids}"
-            )
-            logger.debug(f"[CACHE SET] Задачи сохранены в кеш: {task_ids}")
-        return queryset
+    validator_generation_keys = (TASKS_GENERATION_KEY,)
+    cursor_orderings = {
+        "overdue_tasks": ("due_date", "id"),
+        "history": ("-history_date", "-history_id"),
+    }
+    expand_querysets = {
+        # project__stats: счетчики проекта в ProjectSerializer.stats без N+1
+        "project": lambda queryset: queryset.select_related(
+            "project", "project__stats"
+        ).prefetch_related("project__members"),
+        "assignee": lambda queryset: queryset.select_related("assignee"),
+        "subtask_ids": lambda queryset: queryset,  # уже в prefetch_related
+        "comments_count": lambda queryset: queryset.annotate(
+            comments_count=Count("comments")
+        ),
+    }
+    # Проект и исполнитель меняются без сдвига поколения задач
+    expand_generation_keys = {
+        "project": (PROJECTS_GENERATION_KEY,),
+        "assignee": (USER_PROFILES_GENERATION_KEY,),
+    }
 
     @action(detail=True, methods=["get"])
     def get_task_details(self, _request, pk=None):
@@ -359,6 +443,7 @@ class TaskViewSet(viewsets.ModelViewSet):
 
     @swagger_auto_schema(
         operation_summary="Получение всех задач",
+        manual_parameters=[EXPAND_PARAMETER, *SPARSE_PARAMETERS],
         responses={200: TaskSerializer(many=True)},
     )
     def list(self, request, *args, **kwargs):
@@ -378,9 +463,6 @@ class TaskViewSet(viewsets.ModelViewSet):
         if response.status_code == status.HTTP_201_CREATED:
             logger.debug("[DEBUG] Задача успешно создана.")
             logger.debug(f"[DEBUG] Данные созданной задачи: {response.data}")
-            # Инвалидируем кэш после создания задачи
-            cache.delete("all_tasks")
-            logger.debug("[DEBUG] Кэш задач сброшен.")
         else:
             logger.debug(
                 f"[DEBUG] Ошибка при создании задачи. Статус: {response.status_code}"
@@ -395,26 +477,32 @@ class TaskViewSet(viewsets.ModelViewSet):
     )
     def update(self, request, *args, **kwargs):
         """Обновление задачи"""
+        partial = kwargs.pop("partial", False)
         instance = self.get_object()
+        serializer = self.get_serializer(instance, data=request.data, partial=partial)
+        serializer.is_valid(raise_exception=True)
 
         # Проверка измененных данных
         changes = []
-        for field, value in request.data.items():
-            if hasattr(instance, field) and getattr(instance, field) != value:
-                changes.append(f"{field}: {getattr(instance, field)} -> {value}")
-
-        # Записываем причину изменения
+        for field, value in serializer.validated_data.items():
+            # Для связей сравниваем id, не загружая связанные объекты
+            attname = instance._meta.get_field(field).attname
+            old_value, value = getattr(instance, attname), getattr(value, "pk", value)
+            if old_value != value:
+                changes.append(f"{field}: {old_value} -> {value}")
+
+        # Причину simple_history возьмет из экземпляра при создании записи;
+        # если значения не изменились, Task.save не пишет ни строку, ни историю
         reason = "; ".join(changes) if changes else "Изменение данных"
-
-        # Сохраняем изменения
-        response = super().update(request, *args, **kwargs)
-
-        # Обновляем причину изменения после сохранения
-        if response.status_code == 200:
-            updated_instance = self.get_object()
-            update_change_reason(updated_instance, reason)
-
-        return response
+        max_length = instance.history.model._meta.get_field(
+            "history_change_reason"
+        ).max_length
+        instance._change_reason = reason[:max_length]
+
+        self.perform_update(serializer)
+        if getattr(instance, "_prefetched_objects_cache", None):
+            instance._prefetched_objects_cache = {}
+        return Response(serializer.data)
 
     @swagger_auto_schema(
         operation_summary="Частичное обновление задачи",
@@ -430,25 +518,19 @@ class TaskViewSet(viewsets.ModelViewSet):
     )
     def destroy(self, request, *args, **kwargs):
         """Удаление задачи"""
-        task = self.get_object()
-        response = super().destroy(request, *args, **kwargs)
-        # Инвалидируем кеш после удаления
-        if task.assignee:
-            cache.delete("all_tasks")
-            logger.debug("[DEBUG] Кэш задач сброшен.")
-        return response
+        return super().destroy(request, *args, **kwargs)
 
     @swagger_auto_schema(
         operation_summary="Получение истории задачи",
         responses={200: TaskSerializer(many=True)},
     )
     @action(methods=["get"], detail=True)
-    def history(self, _request, _pk=None):
+    def history(self, _request, **_kwargs):
         """Получение истории задачи"""
         task = self.get_object()
-        history = task.history.all()  # Получаем историю задачи
+        history = self.paginate_queryset(task.history.select_related("history_user"))
         serializer = HistoricalTaskSerializer(history, many=True)  # Сериализуем историю
-        return Response(serializer.data)
+        return self.get_paginated_response(serializer.data)
 
     @swagger_auto_schema(
         operation_summary="Изменение статуса задачи",
@@ -480,12 +562,169 @@ class TaskViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=["GET"])
     def overdue_tasks(self, _request):
         """Получение просроченных задач"""
-        today = timezone.now().date()
-        overdue_tasks = Task.objects.filter(
-            due_date__lt=today, status__in=["NEW", "BACKLOG", "IN_PROGRESS"]
-        )
-        serializer = self.get_serializer(overdue_tasks, many=True)
-        return Response(serializer.data)
+
+        def build_response():
+            overdue_tasks = self.sparse_queryset(
+                self.expand_queryset(
+                    Task.objects.get_overdue().prefetch_related("subtasks")
+                )
+            )
+            page = self.paginate_queryset(overdue_tasks)
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
+        return self.cached_response("task_overdue", build_response)
+
+    @swagger_auto_schema(
+        operation_summary="Потоковая выгрузка задач (NDJSON или CSV)",
+        manual_parameters=[EXPORT_OUTPUT_PARAMETER],
+        responses={200: "Файл выгрузки", 400: "Неизвестный формат"},
+    )
+    @action(
+        detail=False,
+        methods=["GET"],
+        permission_classes=[IsAuthenticated],
+        content_negotiation_class=ExportContentNegotiation,
+    )
+    def export(self, request):
+        """
+        Все задачи, отобранные фильтрами TaskFilter, потоком без пагинации:
+        для синхронизации и выгрузок любого объема
+        """
+        output = request.query_params.get("output", DEFAULT_EXPORT_FORMAT)
+        if output not in EXPORT_FORMATS:
+            return Response(
+                {"detail": f"Неизвестный формат: {output}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        # Без prefetch_related из queryset вьюсета: строки читаются через values()
+        queryset = self.filter_queryset(Task.objects.order_by("id"))
+        return export_response(queryset, output, filename="tasks")
+
+    @swagger_auto_schema(
+        methods=["post"],
+        operation_summary="Пакетное создание задач",
+        request_body=TaskSerializer(many=True),
+        responses={200: "Результат по каждому элементу", 400: "Неверный пакет"},
+    )
+    @swagger_auto_schema(
+        methods=["patch"],
+        operation_summary="Пакетное изменение задач (элементы с id)",
+        request_body=TaskSerializer(many=True),
+        responses={200: "Результат по каждому элементу", 400: "Неверный пакет"},
+    )
+    @swagger_auto_schema(
+        methods=["delete"],
+        operation_summary="Пакетное удаление задач",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                "ids": openapi.Schema(
+                    type=openapi.TYPE_ARRAY,
+                    items=openapi.Schema(type=openapi.TYPE_INTEGER),
+                )
+            },
+        ),
+        responses={200: "Результат по каждому элементу", 400: "Неверный пакет"},
+    )
+    @action(
+        detail=False,
+        methods=["post", "patch", "delete"],
+        url_path="bulk",
+        permission_classes=[IsAuthenticated],
+    )
+    def bulk(self, request):
+        """
+        Создание, изменение и удаление до BULK_MAX_ITEMS задач одним запросом.
+        Проверки выполняются сразу для всего пакета, запись — одной
+        транзакцией; ошибочные элементы пропускаются и возвращаются
+        в results со статусом error, остальные записываются
+        """
+        items = request.data
+        if request.method == "DELETE" and isinstance(items, dict):
+            items = items.get("ids")
+        if not isinstance(items, list) or not items:
+            return Response(
+                {"detail": "Ожидается непустой список элементов."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(items) > BULK_MAX_ITEMS:
+            return Response(
+                {"detail": f"Не больше {BULK_MAX_ITEMS} элементов за запрос."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        handlers = {
+            "POST": bulk_create_tasks,
+            "PATCH": bulk_update_tasks,
+            "DELETE": bulk_delete_tasks,
+        }
+        try:
+            results = handlers[request.method](request, items)
+        except DjangoValidationError as exc:
+            # Гонка с параллельной записью: пакет откатывается целиком
+            return Response(exc.message_dict, status=status.HTTP_400_BAD_REQUEST)
+        return Response(results.as_dict())
+
+    @swagger_auto_schema(
+        operation_summary="Пакетное изменение статуса задач",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            required=["ids", "status"],
+            properties={
+                "ids": openapi.Schema(
+                    type=openapi.TYPE_ARRAY,
+                    items=openapi.Schema(type=openapi.TYPE_INTEGER),
+                ),
+                "status": openapi.Schema(
+                    type=openapi.TYPE_STRING,
+                    enum=[code for code, _ in Task.STATUS_CHOICES],
+                ),
+            },
+        ),
+        responses={200: "Результат по каждому id", 400: "Неверный запрос"},
+    )
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="bulk/status",
+        permission_classes=[IsAuthenticated],
+    )
+    def bulk_change_status(self, request):
+        """
+        Перевод до BULK_MAX_ITEMS задач в один статус одним UPDATE
+        (например, перенос колонки на доске) вместо запроса change_status
+        на каждую задачу. Ненайденные и чужие задачи возвращаются
+        в results со статусом error
+        """
+        ids = request.data.get("ids") if isinstance(request.data, dict) else None
+        new_status = str(request.data.get("status", "")).upper() if ids else ""
+        if not isinstance(ids, list) or not ids:
+            return Response(
+                {"detail": "Ожидается непустой список ids."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if new_status not in dict(Task.STATUS_CHOICES):
+            return Response(
+                {"detail": "Неверный статус."}, status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(ids) > BULK_MAX_ITEMS:
+            return Response(
+                {"detail": f"Не больше {BULK_MAX_ITEMS} элементов за запрос."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(bulk_change_status(request, ids, new_status).as_dict())
+
+    @swagger_auto_schema(operation_summary="Статистика кеша ответов по задачам")
+    @action(detail=False, methods=["GET"], permission_classes=[IsAdminUser])
+    def cache_stats(self, _request):
+        """Счетчики попаданий и промахов кеша ответов"""
+        return Response(get_cache_stats("task_list", "task_search", "task_overdue"))
+
+    @swagger_auto_schema(operation_summary="Статистика дашборда пользователя")
+    @action(detail=False, methods=["GET"], permission_classes=[IsAuthenticated])
+    def dashboard_stats(self, request):
+        """Те же числа, что и на дашборде: задачи по статусам, проекты и т.д."""
+        return Response(get_dashboard_stats(request.user).as_dict())
 
     @swagger_auto_schema(
         operation_summary="Поиск задач по описанию",
@@ -502,47 +741,53 @@ class TaskViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=["GET"], url_path="search")
     def get_search(self, _request):
         """Поиск задач по описанию"""
-        queryset = self.get_queryset()
-        # Получение задач, которые должны быть выполнены в ближайшие 7 дней
-        if "due_soon" in self.request.query_params:
-            today = timezone.now().date()
-            seven_days_later = today + timedelta(days=7)
-            queryset = queryset.filter(
-                due_date__gte=today, due_date__lte=seven_days_later
-            )
 
-        # Фильтрация задач с высоким приоритетом или с датой выполнения завтра
-        if "priority_or_due_tomorrow" in self.request.query_params:
-            tomorrow = timezone.now().date() + timedelta(days=1)
-            queryset = queryset.filter(Q(priority="5") | Q(due_date=tomorrow))
-
-        # Фильтрация задач, которые не выполнены и имеют высокий приоритет
-        if "high_priority" in self.request.query_params:
-            queryset = queryset.filter(~Q(status="DONE") & Q(priority="5"))
-
-        # Задачи, которые не принадлежат текущему пользователю и имеют статус
-        # "в процессе" или "отменены"
-        if "not_assigned_to_user" in self.request.query_params:
-            user = self.request.user
-            queryset = queryset.filter(
-                ~Q(assignee=user) & Q(status__in=["IN_PROGRESS", "CANCELED"])
-            )
-
-        # Фильтрация по параметру 'search' (по title или description)
-        if "search_term" in self.request.query_params:
-            search_term = self.request.query_params.get("search_term", "")
-            queryset = queryset.filter(
-                Q(name__icontains=search_term) | Q(description__icontains=search_term)
-            )
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
-
-
-class SubtaskViewSet(viewsets.ModelViewSet):
+        def build_response():
+            queryset = self.get_queryset()
+            # Получение задач, которые должны быть выполнены в ближайшие 7 дней
+            if "due_soon" in self.request.query_params:
+                today = timezone.now().date()
+                seven_days_later = today + timedelta(days=7)
+                queryset = queryset.filter(
+                    due_date__gte=today, due_date__lte=seven_days_later
+                )
+
+            # Фильтрация задач с высоким приоритетом или с датой выполнения завтра
+            if "priority_or_due_tomorrow" in self.request.query_params:
+                tomorrow = timezone.now().date() + timedelta(days=1)
+                queryset = queryset.filter(Q(priority="5") | Q(due_date=tomorrow))
+
+            # Фильтрация задач, которые не выполнены и имеют высокий приоритет
+            if "high_priority" in self.request.query_params:
+                queryset = queryset.filter(~Q(status="DONE") & Q(priority="5"))
+
+            # Задачи, которые не принадлежат текущему пользователю и имеют статус
+            # "в процессе" или "отменены"
+            if "not_assigned_to_user" in self.request.query_params:
+                user = self.request.user
+                queryset = queryset.filter(
+                    ~Q(assignee=user) & Q(status__in=["IN_PROGRESS", "CANCELED"])
+                )
+
+            # Полнотекстовый поиск по названию и описанию, по релевантности
+            if "search_term" in self.request.query_params:
+                search_term = self.request.query_params.get("search_term", "")
+                queryset = search_queryset(queryset, search_term)
+            page = self.paginate_queryset(queryset)
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
+        return self.cached_response("task_search", build_response)
+
+
+class SubtaskViewSet(ConditionalGetMixin, SparseFieldsMixin, viewsets.ModelViewSet):
     """ViewSet для работы с подзадачами"""
 
     queryset = Subtask.objects.all()
     serializer_class = SubtaskSerializer
+    # У подзадач нет updated_at: изменения ловит поколение задач
+    last_modified_field = None
+    validator_generation_keys = (TASKS_GENERATION_KEY,)
 
     def get_serializer_class(self):
         """В зависимости от текущего действия выбираем соответствующий сериализатор"""
@@ -554,6 +799,7 @@ class SubtaskViewSet(viewsets.ModelViewSet):
 
     @swagger_auto_schema(
         operation_summary="Получение всех подзадач",
+        manual_parameters=SPARSE_PARAMETERS,
         responses={200: SubtaskSerializer(many=True)},
     )
     def list(self, request, *args, **kwargs):
@@ -595,14 +841,17 @@ class SubtaskViewSet(viewsets.ModelViewSet):
         return super().destroy(request, *args, **kwargs)
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(ConditionalGetMixin, SparseFieldsMixin, viewsets.ModelViewSet):
     """ViewSet для работы с комментариями"""
 
     queryset = Comment.objects.all()
     serializer_class = CommentSerializer
+    filter_backends = [FullTextSearchFilter]
+    validator_generation_keys = (TASKS_GENERATION_KEY,)
 
     @swagger_auto_schema(
         operation_summary="Получение всех комментариев",
+        manual_parameters=SPARSE_PARAMETERS,
         responses={200: CommentSerializer(many=True)},
     )
     def list(self, request, *args, **kwargs):
@@ -643,6 +892,66 @@ class CommentViewSet(viewsets.ModelViewSet):
         return super().destroy(request, *args, **kwargs)
 
 
+class AutocompleteView(APIView):
+    """Автодополнение по префиксу для ленивых списков выбора"""
+
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_summary="Автодополнение: пользователи, проекты и задачи",
+        manual_parameters=[
+            openapi.Parameter(
+                "q",
+                openapi.IN_QUERY,
+                description="Начало любого слова названия или имени",
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                "type",
+                openapi.IN_QUERY,
+                description="Типы через запятую: users, projects, tasks (все)",
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                "limit",
+                openapi.IN_QUERY,
+                description=f"Не больше {AUTOCOMPLETE_MAX_LIMIT} на тип",
+                type=openapi.TYPE_INTEGER,
+            ),
+            openapi.Parameter(
+                "exclude_project",
+                openapi.IN_QUERY,
+                description="Пользователи, которых еще нет в проекте",
+                type=openapi.TYPE_INTEGER,
+            ),
+        ],
+    )
+    def get(self, request):
+        """Top-N совпадений каждого типа, видимых пользователю"""
+        params = request.query_params
+        kinds = [kind for kind in params.get("type", "").split(",") if kind]
+        unknown = set(kinds) - set(AUTOCOMPLETE_SOURCES)
+        if unknown:
+            return Response(
+                {"type": f"Неизвестные типы: {', '.join(sorted(unknown))}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            limit = int(params.get("limit", AUTOCOMPLETE_DEFAULT_LIMIT))
+        except ValueError:
+            limit = AUTOCOMPLETE_DEFAULT_LIMIT
+        exclude_project = params.get("exclude_project", "")
+        return Response(
+            autocomplete(
+                request,
+                params.get("q", ""),
+                kinds or list(AUTOCOMPLETE_SOURCES),
+                min(max(limit, 1), AUTOCOMPLETE_MAX_LIMIT),
+                int(exclude_project) if exclude_project.isdigit() else None,
+            )
+        )
+
+
 class RegisterView(APIView):
     permission_classes = [AllowAny]
 
@@ -1,12 +1,10 @@
 import os
 
-from django.db.models import Q
 from django.db.models.functions import Lower
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from django.http import HttpResponseForbidden, JsonResponse, HttpResponseRedirect
 from django.views.decorators.csrf import csrf_exempt
-from rest_framework.exceptions import ValidationError
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
@@ -18,7 +16,14 @@ from django.contrib.auth import login
 
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.core.paginator import Paginator
 
+from ..caching import get_dashboard_version
+from ..membership import (
+    get_member_project_ids,
+    get_member_project_or_404,
+    get_member_task_or_404,
+)
 from ..forms import UserProfileForm, UserBIOForm, SubtaskForm
 from ..models import (
     Project,
@@ -29,6 +34,8 @@ from ..models import (
     UserBIO,
     Subtask,
 )
+from ..search import search_queryset
+from ..stats import get_project_stats
 from ..serializers.RegisterSerializer import RegisterSerializer
 from datetime import datetime
 
@@ -36,6 +43,8 @@ from django import template
 
 register = template.Library()
 
+TASK_HISTORY_PAGE_SIZE = 20
+
 
 @register.filter(name="strip")
 def strip_spaces(value):
@@ -156,22 +165,20 @@ def dashboard(request):
         .select_related("project", "assignee") \
         .order_by('status') \
 
-    if search_query:
-        tasks = tasks.filter(
-            Q(name__icontains=search_query) | Q(description__icontains=search_query)
-        )
+    # Внутри статуса найденные задачи идут по релевантности
+    tasks = search_queryset(tasks, search_query)
 
+    # Querysets ленивые: при попадании во фрагментный кеш шаблона
+    # запросы за проектами и пользователями не выполняются
     context = {
-        "projects": Project.objects.filter(members=request.user).prefetch_related(
-            "members"
-        ),
+        "projects": Project.objects.filter(members=request.user),
         "tasks": tasks,
-        "users": UserProfile.objects.all().order_by("username"),
         "task_statuses": dict(Task.STATUS_CHOICES),
         "task_priorities": dict(Task.PRIORITY_CHOICES),
         "project_statuses": dict(Project.STATUS_CHOICES),
         "today": timezone.now().date(),
         "search_query": search_query,
+        "dashboard_version": get_dashboard_version(request.user.pk),
     }
 
     return render(request, "dashboard/dashboard.html", context)
@@ -179,14 +186,18 @@ def dashboard(request):
 
 @login_required
 def project_detail(request, pk):
-    project = get_object_or_404(Project, pk=pk, members=request.user)
+    project = get_member_project_or_404(request, pk)
+    stats = get_project_stats(project)
     context = {
         "project": project,
+        "stats": stats,
+        # Разделы задач по статусам с числом задач из счетчиков проекта
+        "status_sections": [
+            (code, name, stats.tasks_by_status[code])
+            for code, name in Task.STATUS_CHOICES
+        ],
         "tasks": Task.objects.filter(project=project),
         "project_members": project.members.all(),
-        "users": UserProfile.objects.exclude(
-            userprofileproject__project=project
-        ),  # Доступные пользователи
         "project_statuses": dict(Project.STATUS_CHOICES),
         "task_statuses": dict(Task.STATUS_CHOICES),
         "task_priorities": dict(Task.PRIORITY_CHOICES),
@@ -196,7 +207,7 @@ def project_detail(request, pk):
 
 @login_required
 def update_project(request, pk):
-    project = get_object_or_404(Project, pk=pk, members=request.user)
+    project = get_member_project_or_404(request, pk)
     if request.method == "POST":
         name = request.POST.get("name")
         description = request.POST.get("description")
@@ -221,7 +232,7 @@ def update_project(request, pk):
 
 @login_required
 def add_comment(request, task_id):
-    task = get_object_or_404(Task, pk=task_id, project__members=request.user)
+    task = get_member_task_or_404(request, task_id)
     if request.method == "POST":
         text = request.POST.get("comment_text").strip()
         if text:
@@ -304,11 +315,6 @@ def create_task(request):
                 messages.error(request, "Дата выполнения не может быть в прошлом")
                 return HttpResponseRedirect(request.META.get("HTTP_REFERER"))
 
-            # Проверяем уникальность названия задачи для пользователя
-            if Task.objects.filter(name=name, assignee_id=assignee_id).exists():
-                messages.error(request, "У вас уже есть задача с таким названием")
-                return HttpResponseRedirect(request.META.get("HTTP_REFERER"))
-
             # Создаем задачу
             task = Task(
                 name=name,
@@ -321,11 +327,13 @@ def create_task(request):
                 category=category,
             )
 
-            # Вызываем полную валидацию модели
-            task.full_clean()
+            # Вызываем полную валидацию модели; уникальность названия
+            # проверяет база при сохранении
+            task.full_clean(validate_constraints=False)
 
             # Сохраняем задачу
-            task.save()
+            with Task.unique_violations():
+                task.save()
 
             response = HttpResponseRedirect(request.META.get("HTTP_REFERER"))
             messages.success(request, "Задача успешно создана")
@@ -348,10 +356,10 @@ def create_task(request):
 
 @login_required
 def task_detail(request, pk):
-    task = get_object_or_404(Task, pk=pk, project__members=request.user)
+    task = get_member_task_or_404(request, pk)
     subtasks = task.subtasks.all()
-    subtasks_count = subtasks.count()
-    has_subtasks = subtasks.exists()
+    subtasks_count = task.subtask_count
+    has_subtasks = subtasks_count > 0
     subtask_names = subtasks.values_list("name", flat=True)
 
     # Поиск подзадач
@@ -364,17 +372,25 @@ def task_detail(request, pk):
         if form.is_valid():
             subtask = form.save(commit=False)
             subtask.task = task
-            subtask.save()
-            messages.success(request, "Подзадача успешно добавлена")
-            return HttpResponseRedirect(request.path)
+            try:
+                subtask.save()
+            except ValidationError as e:
+                messages.error(request, ", ".join(e.messages))
+            else:
+                messages.success(request, "Подзадача успешно добавлена")
+                return HttpResponseRedirect(request.path)
         else:
             messages.error(request, "Пожалуйста, исправьте ошибки в форме")
     else:
         form = SubtaskForm()
 
+    history_page = Paginator(task.history_records(), TASK_HISTORY_PAGE_SIZE).get_page(
+        request.GET.get("history_page")
+    )
+
     context = {
         "task": task,
-        "projects": Project.objects.filter(members=request.user),
+        "projects": Project.objects.filter(pk__in=get_member_project_ids(request)),
         "users": task.project.members.all(),
         "task_statuses": dict(Task.STATUS_CHOICES),
         "task_priorities": dict(Task.PRIORITY_CHOICES),
@@ -384,7 +400,8 @@ def task_detail(request, pk):
         "subtasks_count": subtasks_count,
         "has_subtasks": has_subtasks,
         "subtask_names": subtask_names,
-        "history": task.get_history_changes(),
+        "history": task.get_history_changes(history_page),
+        "history_page": history_page,
     }
     return render(request, "dashboard/task_detail.html", context)
 
@@ -412,7 +429,7 @@ def delete_subtask(request, subtask_id):
 
 @login_required
 def update_task(request, pk):
-    task = get_object_or_404(Task, pk=pk, project__members=request.user)
+    task = get_member_task_or_404(request, pk)
     if request.method == "POST":
         name = request.POST.get("name")
         description = request.POST.get("description")
@@ -453,9 +470,14 @@ def update_task(request, pk):
             if assignee_id:
                 task.assignee = get_object_or_404(UserProfile, pk=assignee_id)
 
-            task.save()
+            with Task.unique_violations():
+                task.save()
             messages.success(request, "Задача успешно обновлена")
 
+        except ValidationError as e:
+            messages.error(
+                request, f"Ошибка при обновлении задачи: {', '.join(e.messages)}"
+            )
         except Exception as e:
             messages.error(request, f"Ошибка при обновлении задачи: {str(e)}")
 
@@ -464,8 +486,8 @@ def update_task(request, pk):
 
 @login_required
 def delete_task(request, pk):
-    task = get_object_or_404(Task, pk=pk, project__members=request.user)
-    project_id = task.project.id
+    task = get_member_task_or_404(request, pk)
+    project_id = task.project_id
     task.delete()
     messages.success(request, "Задача успешно удалена")
     return redirect("project_detail", pk=project_id)
@@ -473,7 +495,7 @@ def delete_task(request, pk):
 
 @login_required
 def add_member(request, project_id):
-    project = get_object_or_404(Project, pk=project_id, members=request.user)
+    project = get_member_project_or_404(request, project_id)
     if request.method == "POST":
         user_id = request.POST.get("user")  # Форма должна передавать 'user'
         try:
@@ -494,7 +516,7 @@ def add_member(request, project_id):
 
 @login_required
 def remove_member(request, project_id, user_id):
-    project = get_object_or_404(Project, pk=project_id, members=request.user)
+    project = get_member_project_or_404(request, project_id)
     user = get_object_or_404(UserProfile, pk=user_id)
     UserProfileProject.objects.filter(project=project, user_profile=user).delete()
     messages.success(request, "Участник успешно удален из проекта.")